@@ -7,7 +7,8 @@ from langgraph.checkpoint.sqlite import SqliteSaver
 from src.agent.chitchat import ChitchatReactAgent
 from src.agent.database import DatabaseReactAgent
 from src.agent.general import GeneralReactAgent
-from src.agent.tools.chat_history import get_chat_history
+from src.agent.tools.answer_cache import answer_cache
+from src.agent.tools.chat_history import ChatHistoryBuilder
 from src.agent.tools.classifier import QueryClassifier
 from src.data_dictionary.extract import explanations
 # from src.schemas.chat_request import ChatRequest
@@ -17,60 +18,75 @@ from src.schemas.chat_response import ResponseSchemaMod
 data_dictionary = explanations()
 
 class MultiAgentChatSystem:
-    """Main orchestrator that follows the exact steps: 1. Classify 2. Route to React Agent 3. Compose Response"""
+    """Main orchestrator that follows the exact steps: 1. Classify 2. Route to React Agent 3. Compose Response
+
+    One instance is shared by every request in the process, so converse() only
+    keeps per-request state (thread config, chat history) in local variables.
+    """
     
 
-    def __init__(self, llm, sql_db, system_message, payload, memory, conn):
+    def __init__(self, llm, sql_db, system_message, memory, conn, tools=None):
         self.llm = llm     
         self.db = sql_db
-        self.payload = payload
         self.system_prompt = system_message
         
-        # Initialize memory and chat history
+        # Initialize memory
         self.memory = memory
         self.conn = conn
 
-        self.config = self.get_config()
-        self.state = self.memory.get(self.config)
-        self.chat_history = get_chat_history(self.state["channel_values"]["messages"]) if self.state else ""
         print("Creating agents....")
         
         self.query_classifier = QueryClassifier(
             data_dictionary=data_dictionary, 
-            chat_history=self.chat_history, 
+            chat_history="", 
             model=self.llm
         )
         print("Query classififer initialized...")
+        self.history_builder = ChatHistoryBuilder()
         print("Creating chitchat, general and db agents...")
         self.chitchat_react_agent = ChitchatReactAgent(llm)
         self.general_react_agent = GeneralReactAgent(llm)
         self.database_react_agent = DatabaseReactAgent(llm=llm, 
                                                        db=self.db, 
                                                        system_prompt=self.system_prompt, 
-                                                       request_payload=self.payload,
                                                        memory=self.memory,
                                                        conn=self.conn,
-                                                       data_dictionary=data_dictionary)
+                                                       data_dictionary=data_dictionary,
+                                                       tools=tools)
         print("All agents initialized...")
 
-    def get_config(self):
+    @staticmethod
+    def get_config(session_id):
         return {
             "recursion_limit": 15,
             "configurable": {
-                "thread_id": self.payload.session_id,
+                "thread_id": session_id,
             }
         }
 
-    def converse(self, query):
+    def _chat_history_from_state(self, state, session_id):
+        return self.history_builder.render(session_id, state["channel_values"]["messages"]) if state else ""
+
+    def converse(self, query, session_id):
         """
         Main entry point following exact steps:
         1. Classify query
         2. Route to appropriate React Agent
         3. Compose ResponseSchema
         """
+        chat_history = self._chat_history_from_state(self.memory.get(self.get_config(session_id)), session_id)
+
+        if (cached := answer_cache.lookup(query)) is not None:
+            print("---Answer cache hit: skipping classification and the React Agent---")
+            response = self.database_react_agent.execute_cached(query=query,
+                                                                chat_history=chat_history,
+                                                                session_id=session_id,
+                                                                cached=cached)
+            if response is not None:
+                return response
         
         # Step 1: Classify query
-        classification = self.query_classifier.classify_query(query)
+        classification = self.query_classifier.classify_query(query, chat_history=chat_history)
         query_type = classification.query_type
         # user_asking_csv = classification.user_asking_csv # True or False
         # user_query_top_k = classification.top_k
@@ -80,26 +96,65 @@ class MultiAgentChatSystem:
         if query_type == "chitchat":
             print("---Step 2: Using Chitchat React Agent---")
             response = self.chitchat_react_agent.execute(query=query, 
-                                                         chat_history=self.chat_history)
-            print("---Step 3: Composed ResponseSchemaChitchat---")
-            # Convert to ResponseSchemaMod for backward compatibility
-            return ResponseSchemaMod(
-                sql_query=response.sql_query,
-                suggested_visualization_type=response.suggested_visualization_type,
-                answer=response.answer,
-                query_type="chitchat",
-                model_error=False
-            )
+                                                         chat_history=chat_history)
+            return self._chitchat_response(response)
             
         elif query_type == "database":
             print("---Step 2: Using Database React Agent---")
             response = self.database_react_agent.execute(query=query, 
-                                                         chat_history=self.chat_history, 
-                                                         )
+                                                         chat_history=chat_history, 
+                                                         session_id=session_id)
             print("---Step 3: Composed ResponseSchemaDatabase---")
             return response
-            
-        elif query_type == "general":
+
+        return self._static_response(query_type)
+
+    async def aconverse(self, query, session_id):
+        """Async twin of converse: every LLM, graph and database call is awaited."""
+        chat_history = self._chat_history_from_state(await self.memory.aget(self.get_config(session_id)), session_id)
+
+        if (cached := answer_cache.lookup(query)) is not None:
+            print("---Answer cache hit: skipping classification and the React Agent---")
+            response = await self.database_react_agent.aexecute_cached(query=query,
+                                                                       chat_history=chat_history,
+                                                                       session_id=session_id,
+                                                                       cached=cached)
+            if response is not None:
+                return response
+
+        classification = await self.query_classifier.aclassify_query(query, chat_history=chat_history)
+        query_type = classification.query_type
+        print(f"---Step 1: Query Classified as {query_type} ---")
+
+        if query_type == "chitchat":
+            print("---Step 2: Using Chitchat React Agent---")
+            response = await self.chitchat_react_agent.aexecute(query=query, 
+                                                                chat_history=chat_history)
+            return self._chitchat_response(response)
+
+        elif query_type == "database":
+            print("---Step 2: Using Database React Agent---")
+            response = await self.database_react_agent.aexecute(query=query, 
+                                                                chat_history=chat_history,
+                                                                session_id=session_id)
+            print("---Step 3: Composed ResponseSchemaDatabase---")
+            return response
+
+        return self._static_response(query_type)
+
+    def _chitchat_response(self, response):
+        print("---Step 3: Composed ResponseSchemaChitchat---")
+        # Convert to ResponseSchemaMod for backward compatibility
+        return ResponseSchemaMod(
+            sql_query=response.sql_query,
+            suggested_visualization_type=response.suggested_visualization_type,
+            answer=response.answer,
+            query_type="chitchat",
+            model_error=False
+        )
+
+    def _static_response(self, query_type):
+        if query_type == "general":
             print("---Step 2: Using General React Agent---")
             # response = self.general_react_agent.execute(query)
             print("---Step 3: Composed ResponseSchemaGeneral---")
@@ -124,8 +179,8 @@ class MultiAgentChatSystem:
 
 class ChatAgent(MultiAgentChatSystem):
     """Backward compatibility wrapper""" 
-    def __init__(self, llm, sql_db, system_message, payload, memory, conn):
-        super().__init__(llm, sql_db, system_message, payload, memory, conn)
+    def __init__(self, llm, sql_db, system_message, memory, conn, tools=None):
+        super().__init__(llm, sql_db, system_message, memory, conn, tools=tools)
         print("ChatAgent initialized with multi-agent React system")
 
 
@@ -21,26 +21,41 @@ class ChitchatReactAgent:
             """
         )
 
+    def _build_messages(self, query, chat_history):
+        return self.prompt_template.format_prompt(
+            query=query,
+            chat_history=chat_history or "No previous conversation."
+        ).to_messages()
+
+    def _fallback_response(self):
+        return ResponseSchemaMod(
+            answer="Hey! How can I help you today?",
+            sql_query='',
+            suggested_visualization_type=[],
+            model_error=True,
+            query_type='chitchat'
+        )
+
     def execute(self, query, chat_history):
         """Execute chitchat response and return ResponseSchemaChitchat"""
         try:
             # Use structured output for chitchat
             structured_llm = self.llm.with_structured_output(ResponseSchemaChitchat)
-            prompt_messages = self.prompt_template.format_prompt(
-                query=query,
-                chat_history=chat_history or "No previous conversation."
-            ).to_messages()
-            
-            response = structured_llm.invoke(prompt_messages)
+            response = structured_llm.invoke(self._build_messages(query, chat_history))
             return response
             
         except Exception as e:
             print(f"Chitchat agent error: {e}")
-            return ResponseSchemaMod(
-                answer="Hey! How can I help you today?",
-                sql_query='',
-                suggested_visualization_type=[],
-                model_error=True,
-                query_type='chitchat'
-            )
+            return self._fallback_response()
+
+    async def aexecute(self, query, chat_history):
+        """Async variant of execute that does not block the event loop."""
+        try:
+            structured_llm = self.llm.with_structured_output(ResponseSchemaChitchat)
+            response = await structured_llm.ainvoke(self._build_messages(query, chat_history))
+            return response
+
+        except Exception as e:
+            print(f"Chitchat agent error: {e}")
+            return self._fallback_response()
         
\ No newline at end of file
@@ -1,4 +1,7 @@
-from langchain_core.messages import ToolMessage
+import json
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langgraph.prebuilt import create_react_agent
 from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.prebuilt.chat_agent_executor import AgentState
@@ -7,22 +10,34 @@ from langmem.short_term import SummarizationNode
 
 from src.configs.settings import settings
 from src.agent.tools.sql_toolkit import SQLDatabaseToolkit
-from src.agent.tools.graph_parser import recommend_graph_object
+from src.agent.tools.answer_cache import answer_cache
+from src.agent.tools.query_capture import QueryCapture, capture_queries
+from src.agent.tools.graph_parser import recommend_graph_object, arecommend_graph_object
 from src.schemas.chat_response import (
     StructuredResponseSchema, 
     ResponseSchemaMod
 )
-from src.db.db import fetch_data_from_db 
+from src.db.cost_guard import QueryTooExpensiveError
+from src.db.db import (
+    BoundedResult,
+    acheck_query,
+    afetch_bounded,
+    ahas_rows,
+    async_database,
+    check_query,
+    fetch_bounded,
+    fetch_data_from_db,
+    fetch_data_from_db_async,
+    has_rows,
+    stream_copy_csv,
+)
+from src.db.sql_utils import strip_trailing_limit, wrap_with_limit
 from typing import Any, Optional
-import re
-import pandas as pd
-from src.agent.compose_csv import stream_csv
 from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
 # Configuration constants
 TOP_K = settings.TOP_K  # Default limit for queries (e.g., 19)
 MAX_DISPLAY_ROWS = settings.MAX_DISPLAY_ROWS   # Maximum rows to display in UI response
-SAMPLE_SIZE_FOR_GRAPH = settings.SAMPLE_SIZE_FOR_GRAPH # Sample size for graph recommendations
 
 
 class AgentExecutionError(Exception):
@@ -43,6 +58,9 @@ class AgentValidationError(Exception):
 def build_sql_query_with_limit(sql_query: str, limit: int, remove: bool = False) -> str:
     """
     Build SQL query with appropriate LIMIT clause.
+
+    The trailing LIMIT/FETCH FIRST of the model's query is stripped and the new limit is applied
+    by wrapping the query as a subquery, which also works for CTEs and trailing comments.
     
     Args:
         sql_query: Original SQL query
@@ -52,31 +70,21 @@ def build_sql_query_with_limit(sql_query: str, limit: int, remove: bool = False)
     Returns:
         SQL query with or without LIMIT clause
     """
-    # Remove any existing LIMIT clause
-    sql_query = re.sub(r'\bLIMIT\s+\d+\s*;?\s*$', '', sql_query, flags=re.IGNORECASE).strip()
-    
-    # Add semicolon if not present
-    if not sql_query.endswith(';'):
-        sql_query += ';'
-    
-    # Remove semicolon to add LIMIT before it
-    sql_query = sql_query.rstrip(';')
+    sql_query, _ = strip_trailing_limit(sql_query)
     
     if remove or limit == 0:
         return sql_query
     
-    return f"{sql_query} LIMIT {limit}"
+    return wrap_with_limit(sql_query, limit)
 
 
 
 
 
-def compose_csv_response(db_data: list) -> StreamingResponse:
-    """Create CSV response for download."""
-    print(f"Composing CSV response for {len(db_data)} rows")
-    df = pd.DataFrame(db_data)
+def compose_csv_response(chunks) -> StreamingResponse:
+    """Create CSV response for download from a (sync or async) iterator of CSV bytes."""
     return StreamingResponse(
-        stream_csv(df),
+        chunks,
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=data.csv"}
     )
@@ -90,14 +98,16 @@ class SQLAgentState(AgentState):
 class DatabaseReactAgent:
     """React Agent specifically for handling database queries with clear row handling logic."""
 
-    def __init__(self, llm, db, system_prompt, request_payload, conn, memory, data_dictionary):
+    def __init__(self, llm, db, system_prompt, conn, memory, data_dictionary, tools=None):
+        # Built once per process: nothing request specific may be stored on the instance
         self.llm = llm
         self.db = db
-        self.payload = request_payload
         self.conn = conn
         self.memory = memory
-        self.tools = SQLDatabaseToolkit(db=self.db, llm=self.llm).get_tools()
+        self.tools = tools or SQLDatabaseToolkit(db=self.db, llm=self.llm).get_tools()
         self.data_dictionary = data_dictionary
+        # Answered questions become few-shot examples of the prompt they were answered with
+        self.example_store = getattr(system_prompt, "examples", None)
         # self.summarization_node = SummarizationNode(
         #     model=self.llm,
         #     token_counter=count_tokens_approximately,
@@ -117,177 +127,349 @@ class DatabaseReactAgent:
             # state_schema=SQLAgentState,
         )
 
-    def get_config(self):
+    @staticmethod
+    def get_config(session_id):
         return {
             "recursion_limit": 20,
             "configurable": {
-                "thread_id": self.payload.session_id,
+                "thread_id": session_id,
             }
         }
 
-    def execute(self, query, chat_history, **kwargs):
+    def execute(self, query, chat_history, session_id, **kwargs):
         """Execute database query and return appropriate response."""
-        config = self.get_config()
+        config = self.get_config(session_id)
         input_data = {"messages": [{"role": "user", "content": query}]}
 
         try:
             return self._attempt_converse(query, config, input_data, chat_history, **kwargs)
-        
-        except AgentValidationError as e:
-            print("Validation error")
-            print(f"Database agent failure: {e.original_exception}")
-            print("Original Failure Message:", e.message)
-            print("Data Extracted:", e.data)        
+        except (AgentValidationError, AgentExecutionError) as e:
+            return self._error_response(e)
 
+    async def aexecute(self, query, chat_history, session_id, **kwargs):
+        """Async variant of execute: streams the graph and fetches data without blocking the event loop."""
+        config = self.get_config(session_id)
+        input_data = {"messages": [{"role": "user", "content": query}]}
+
+        try:
+            return await self._aattempt_converse(query, config, input_data, chat_history, **kwargs)
+        except (AgentValidationError, AgentExecutionError) as e:
+            return self._error_response(e)
+
+    def _error_response(self, e):
+        if isinstance(e.original_exception, QueryTooExpensiveError):
+            print(f"Database agent refused an expensive query: {e.original_exception.reason}")
             return ResponseSchemaMod(
                 sql_query="",
                 suggested_visualization_type=[],
-                answer="Looks like Nova model couldn’t format your response this time. A quick reload and re-prompt usually does the trick.",
+                answer="Answering this would need a query too large to run right now. Try narrowing it down, "
+                       "for example with a date range or a filter, or ask for a summary instead of every row.",
                 model_error=True
             )
-            
-        except AgentExecutionError as e:
+
+        if isinstance(e, AgentValidationError):
+            print("Validation error")
             print(f"Database agent failure: {e.original_exception}")
             print("Original Failure Message:", e.message)
-            print("Data Extracted:", e.data)
+            print("Data Extracted:", e.data)        
+
             return ResponseSchemaMod(
                 sql_query="",
                 suggested_visualization_type=[],
-                answer="I couldn't find an exact match for your question in our data. Try rephrasing your question, or let us know if you'd like help.",
+                answer="Looks like Nova model couldn’t format your response this time. A quick reload and re-prompt usually does the trick.",
                 model_error=True
             )
+            
+        print(f"Database agent failure: {e.original_exception}")
+        print("Original Failure Message:", e.message)
+        print("Data Extracted:", e.data)
+        return ResponseSchemaMod(
+            sql_query="",
+            suggested_visualization_type=[],
+            answer="I couldn't find an exact match for your question in our data. Try rephrasing your question, or let us know if you'd like help.",
+            model_error=True
+        )
+
+    def _wrap_exception(self, e, message=None, data=None):
+        print("\n...Exception Occured...")
+        print(type(e), str(e))
+        if isinstance(e, ValidationError):
+            print("\n\nValidationError Occured Recomposing response")
+            return AgentValidationError(e, message=message, data=data)
+        return AgentExecutionError(e, message=message, data=data)
 
     def _attempt_converse(self, query, config, input_data, chat_history, **kwargs):
         """Main conversation logic with improved row handling."""
         data = None
-        output = None
         message = None
 
         try:
             # Execute agent
-            for s in self.agent_executor.stream(input_data, stream_mode="values", config=config, debug=False, checkpoint_during=True):
-                message = s["messages"][-1]
-                message.pretty_print()
-                # if isinstance(message, ToolMessage) and message.name == "sql_db_query":
-                #     data = message.content
-                # if not isinstance(message, tuple):
-                #     message.pretty_print()
+            with capture_queries() as capture:
+                for s in self.agent_executor.stream(input_data, stream_mode="values", config=config, debug=False, checkpoint_during=True):
+                    message = s["messages"][-1]
+                    message.pretty_print()
 
             # Get structured response
             output = s.get('structured_response')
             if not output:
                 raise ValueError("Structured response cannot be composed")
 
-            # Extract user preferences
-            result_response = ResponseSchemaMod(**output.model_dump())
-            user_requested_rows = getattr(output, 'user_requested_top_k_rows')
-            user_requested_csv = getattr(output, 'user_requested_csv')
-            user_explicitly_asked = getattr(output, 'user_explicitly_asked_for_rows')
-            
-            print(f"\n\nNumber of rows user requested: {user_requested_rows}")
-            print(f"Did user requested csv - {user_requested_csv}")
-            print(f"Did user explicitely asked for some rows count - {user_explicitly_asked}")
-
-            # CSV file logic
-            if user_requested_csv:
-                if user_explicitly_asked:  # csv but limited data
-                    # User wants specific number of rows as CSV   # add user asked limit
-                    final_sql_query = build_sql_query_with_limit(sql_query=result_response.sql_query, 
-                                                                 limit=user_requested_rows)
-                    db_data = fetch_data_from_db(final_sql_query)
-                    
-                else: # csv but whole data
-                    # User wants all data as CSV - no limit
-                    unlimited_sql_query = build_sql_query_with_limit(sql_query=result_response.sql_query, limit = 1000, remove=False)
-                    db_data = fetch_data_from_db(unlimited_sql_query)
-                
-                if not db_data:
-                    print("No matching data found")
-                    result_response.suggested_visualization_type.clear()
-                    result_response.model_error = False
-                    result_response.query_type = 'database'
-                    return result_response
-                
-                print(f"User requested CSV download with {len(db_data)} rows")
-                return compose_csv_response(db_data)
-            
-            
-            # Non Csv file logic
-            # User didnot ask for csv 
-            if user_explicitly_asked or user_requested_rows != TOP_K:    # but do they requested some number of rows? - yes
-                final_sql_query = build_sql_query_with_limit(sql_query=result_response.sql_query,
-                                                             limit=user_requested_rows)
-                
-                db_data = fetch_data_from_db(final_sql_query)
-                
-                
-                if not db_data:
-                    result_response.sql_query = final_sql_query
-                    result_response.suggested_visualization_type.clear()
-                    result_response.model_error = False
-                    result_response.query_type = 'database'
-                    return result_response
-                
-                else:
-                    # Generate graph recommendations using sample
-                    graph_sample = db_data[:SAMPLE_SIZE_FOR_GRAPH]
-                    graph_recommendations = recommend_graph_object(data_extracted_from_database=graph_sample,
-                                                                   output=output, 
-                                                                   llm=self.llm, 
-                                                                   chat_history=chat_history,
-                                                                   latest_user_query=query, 
-                                                                   query=result_response.sql_query)
-                    
-                    result_response.suggested_visualization_type.clear()
-                    result_response.suggested_visualization_type = graph_recommendations
-                    result_response.sql_query = final_sql_query
-                    result_response.data = db_data[:user_requested_rows]
-                    return result_response
-                    
-            # User didnot ask for csv and didnot reuqested any number of rows.... For simplicity we will return 100 rows
-            elif not user_requested_csv and not user_explicitly_asked: 
-                sample_query = build_sql_query_with_limit(sql_query=result_response.sql_query, limit=0,
-                                                          remove=True)
-                db_data = fetch_data_from_db(sample_query)
-                if not db_data:
-                    print("The Query returned no data.")
-                    result_response.sql_query = sample_query
-                    result_response.suggested_visualization_type.clear()
-                    result_response.model_error = False
-                    result_response.query_type = 'database'
-                    return result_response
-                else:
-                    # Generate graph recommendations using sample
-                    total_rows = len(db_data)
-                    # if total_rows == user_requested_rows:
-                    #     pass
-                    # msg = ' It is only 19 sample of whole data.' if total_rows == 19 else ''
-                    # if total_rows > MAX_DISPLAY_ROWS and total_rows != 19:
-                    #     msg = f"\nOut of {total_rows} only {MAX_DISPLAY_ROWS} rows are displayed. Please say 'I want csv data if you want all {total_rows} rows'"
-                    msg = f" Please say I want csv file if you want all {total_rows} rows." if total_rows > 1 else ''
-                    graph_sample = db_data[:SAMPLE_SIZE_FOR_GRAPH]
-                    graph_recommendations = recommend_graph_object(data_extracted_from_database=graph_sample,
-                                                                   output=output, 
-                                                                   llm=self.llm, 
-                                                                   chat_history=chat_history,
-                                                                   latest_user_query=query, 
-                                                                   query=result_response.sql_query)
-                    
-                    result_response.suggested_visualization_type.clear()
-                    result_response.suggested_visualization_type = graph_recommendations
-                    result_response.answer += msg
-                    result_response.sql_query = sample_query
-                    result_response.data = db_data[:MAX_DISPLAY_ROWS]
-                    return result_response
-            else:
-                # TODO find this case
-                print("The unknown logic")
+            return self._respond(query, output, capture, chat_history)
+
+        except Exception as e:
+            raise self._wrap_exception(e, message=message, data=data)
+
+    async def _aattempt_converse(self, query, config, input_data, chat_history, **kwargs):
+        """Async twin of _attempt_converse using astream, the shared asyncpg pool and async chart suggestion."""
+        data = None
+        message = None
+
+        try:
+            with capture_queries() as capture:
+                async for s in self.agent_executor.astream(input_data, stream_mode="values", config=config, debug=False, checkpoint_during=True):
+                    message = s["messages"][-1]
+                    message.pretty_print()
+
+            output = s.get('structured_response')
+            if not output:
+                raise ValueError("Structured response cannot be composed")
+
+            return await self._arespond(query, output, capture, chat_history)
 
         except Exception as e:
-            print("\n...Exception Occured...")
-            print(type(e), str(e))
-            if isinstance(e, ValidationError):
-                print("\n\nValidationError Occured Recomposing response")
-                raise AgentValidationError(e, message=message, data=data)
-            raise AgentExecutionError(e, message=message, data=data)
-        
\ No newline at end of file
+            raise self._wrap_exception(e, message=message, data=data)
+
+    def _respond(self, query, output, capture, chat_history, remember=True):
+        """Run the final SQL of a structured response and compose the API response."""
+        result_response, mode, final_sql_query = self._plan_final_query(output)
+        if mode == "csv":
+            if not self._csv_has_rows(final_sql_query, capture):
+                return self._empty_response(result_response, mode, final_sql_query)
+            self._check_export(check_query(final_sql_query, allow_export=True))
+            print("User requested CSV download, streaming COPY output")
+            return compose_csv_response(stream_copy_csv(final_sql_query))
+        # Too large to load whole: answer with its first rows, a CSV is only sent when asked for
+        bounded = self._needs_full_fetch(mode, final_sql_query, capture) and \
+            self._check_export(check_query(final_sql_query, allow_export=True))
+
+        fetched = self._fetch_final(mode, final_sql_query, capture, bounded)
+        db_data = fetched.rows
+        if not db_data:
+            return self._empty_response(result_response, mode, final_sql_query)
+        if remember:
+            self._remember_answer(query, output)
+
+        graph_recommendations = recommend_graph_object(data_extracted_from_database=db_data[:MAX_DISPLAY_ROWS],
+                                                       output=output, 
+                                                       llm=self.llm, 
+                                                       chat_history=chat_history,
+                                                       latest_user_query=query, 
+                                                       query=result_response.sql_query)
+        return self._data_response(result_response, output, mode, final_sql_query, fetched, graph_recommendations)
+
+    async def _arespond(self, query, output, capture, chat_history, remember=True):
+        result_response, mode, final_sql_query = self._plan_final_query(output)
+        if mode == "csv":
+            if not await self._acsv_has_rows(final_sql_query, capture):
+                return self._empty_response(result_response, mode, final_sql_query)
+            self._check_export(await acheck_query(final_sql_query, allow_export=True))
+            print("User requested CSV download, streaming COPY output")
+            return compose_csv_response(async_database.stream_copy_csv(final_sql_query))
+        bounded = self._needs_full_fetch(mode, final_sql_query, capture) and \
+            self._check_export(await acheck_query(final_sql_query, allow_export=True))
+
+        fetched = await self._afetch_final(mode, final_sql_query, capture, bounded)
+        db_data = fetched.rows
+        if not db_data:
+            return self._empty_response(result_response, mode, final_sql_query)
+        if remember:
+            self._remember_answer(query, output)
+
+        graph_recommendations = await arecommend_graph_object(data_extracted_from_database=db_data[:MAX_DISPLAY_ROWS],
+                                                              output=output, 
+                                                              llm=self.llm, 
+                                                              chat_history=chat_history,
+                                                              latest_user_query=query, 
+                                                              query=result_response.sql_query)
+        return self._data_response(result_response, output, mode, final_sql_query, fetched, graph_recommendations)
+
+    def execute_cached(self, query, chat_history, session_id, cached):
+        """
+        Answer from a cached structured response: its SQL runs again, the ReAct loop is skipped.
+        Returns None when the cached answer no longer works so the caller can run the agent.
+        """
+        config = self.get_config(session_id)
+        try:
+            output = StructuredResponseSchema(**cached)
+            response = self._respond(query, output, QueryCapture(), chat_history, remember=False)
+        except Exception as e:
+            print(f"Cached answer failed, running the agent instead: {e}")
+            answer_cache.discard(cached.get("sql_query", ""))
+            return None
+        try:
+            self.agent_executor.update_state(config, self._cached_turn(query, output),
+                                             as_node="generate_structured_response")
+        except Exception as e:
+            print(f"Could not record the cached answer in the thread: {e}")
+        return response
+
+    async def aexecute_cached(self, query, chat_history, session_id, cached):
+        config = self.get_config(session_id)
+        try:
+            output = StructuredResponseSchema(**cached)
+            response = await self._arespond(query, output, QueryCapture(), chat_history, remember=False)
+        except Exception as e:
+            print(f"Cached answer failed, running the agent instead: {e}")
+            answer_cache.discard(cached.get("sql_query", ""))
+            return None
+        try:
+            await self.agent_executor.aupdate_state(config, self._cached_turn(query, output),
+                                                    as_node="generate_structured_response")
+        except Exception as e:
+            print(f"Could not record the cached answer in the thread: {e}")
+        return response
+
+    @staticmethod
+    def _cached_turn(query, output):
+        """The turn as the agent would have left it, so follow ups see the question and its SQL."""
+        call_id = f"answer_cache_{uuid.uuid4().hex}"
+        return {
+            "messages": [
+                HumanMessage(content=query),
+                AIMessage(content="", tool_calls=[{"name": "sql_db_query", "args": {"query": output.sql_query}, "id": call_id}]),
+                ToolMessage(content=json.dumps({"sql_query": output.sql_query, "result": "served from the answer cache"}),
+                            name="sql_db_query", tool_call_id=call_id),
+                AIMessage(content=output.answer),
+            ],
+            "structured_response": output,
+        }
+
+    def _remember_answer(self, query, output):
+        """Once the SQL the agent wrote returned rows, keep it as a few-shot example and a cached answer."""
+        answer_cache.put(query, output.model_dump())
+        if self.example_store is None:
+            return
+        try:
+            if self.example_store.add(query, output.sql_query):
+                print("Recorded the answer as a few-shot example")
+        except Exception as e:
+            print(f"Could not record few-shot example: {e}")
+
+    def _csv_has_rows(self, final_sql_query, capture):
+        """An export is only started for a non-empty result; the tool capture usually answers this."""
+        if (rows := capture.match(final_sql_query)) is not None:
+            return bool(rows)
+        return has_rows(final_sql_query)
+
+    async def _acsv_has_rows(self, final_sql_query, capture):
+        if (rows := capture.match(final_sql_query)) is not None:
+            return bool(rows)
+        return await ahas_rows(final_sql_query)
+
+    @staticmethod
+    def _needs_full_fetch(mode, final_sql_query, capture):
+        """Every requested row is loaded (not a bounded page) and the tool capture does not have them."""
+        return mode != "default" and capture.match(final_sql_query) is None
+
+    @staticmethod
+    def _check_export(decision) -> bool:
+        """True when the cost guard would only export the whole result; raises when it refuses it."""
+        if decision.refused:
+            raise QueryTooExpensiveError(decision.reason)
+        return decision.action == "export"
+
+    def _captured_rows(self, mode, final_sql_query, capture):
+        rows = capture.match(final_sql_query)
+        if rows is None:
+            return None
+        print("Reusing rows captured from the sql_db_query tool")
+        limit = MAX_DISPLAY_ROWS if mode == "default" else len(rows)
+        return BoundedResult(rows=rows[:limit], total_rows=len(rows))
+
+    def _fetch_final(self, mode, final_sql_query, capture, bounded=False) -> BoundedResult:
+        """
+        Rows for the answer: captured tool output if it covers the query, else a (bounded) fetch.
+        bounded caps a top_k answer at MAX_DISPLAY_ROWS when its full result is too large to load.
+        """
+        if (fetched := self._captured_rows(mode, final_sql_query, capture)) is not None:
+            return fetched
+        if mode == "default" or bounded:
+            return fetch_bounded(final_sql_query, MAX_DISPLAY_ROWS)
+        rows = fetch_data_from_db(final_sql_query)
+        return BoundedResult(rows=rows, total_rows=len(rows))
+
+    async def _afetch_final(self, mode, final_sql_query, capture, bounded=False) -> BoundedResult:
+        if (fetched := self._captured_rows(mode, final_sql_query, capture)) is not None:
+            return fetched
+        if mode == "default" or bounded:
+            return await afetch_bounded(final_sql_query, MAX_DISPLAY_ROWS)
+        rows = await fetch_data_from_db_async(final_sql_query)
+        return BoundedResult(rows=rows, total_rows=len(rows))
+
+    def _plan_final_query(self, output):
+        """
+        Decide which SQL to execute for the final answer from the structured response.
+
+        Returns:
+            (result_response, mode, final_sql_query) where mode is one of
+            'csv', 'top_k' (user asked for a number of rows) or 'default'.
+        """
+        # Extract user preferences
+        result_response = ResponseSchemaMod(**output.model_dump())
+        user_requested_rows = getattr(output, 'user_requested_top_k_rows')
+        user_requested_csv = getattr(output, 'user_requested_csv')
+        user_explicitly_asked = getattr(output, 'user_explicitly_asked_for_rows')
+        
+        print(f"\n\nNumber of rows user requested: {user_requested_rows}")
+        print(f"Did user requested csv - {user_requested_csv}")
+        print(f"Did user explicitely asked for some rows count - {user_explicitly_asked}")
+
+        # CSV file logic
+        if user_requested_csv:
+            if user_explicitly_asked:  # csv but limited data
+                # User wants specific number of rows as CSV   # add user asked limit
+                return result_response, "csv", build_sql_query_with_limit(sql_query=result_response.sql_query, 
+                                                                          limit=user_requested_rows)
+            # csv but whole data: COPY streams it, so no cap is needed
+            return result_response, "csv", build_sql_query_with_limit(sql_query=result_response.sql_query, 
+                                                                      limit=0, remove=True)
+
+        # Non Csv file logic
+        # User didnot ask for csv but do they requested some number of rows? - yes
+        if user_explicitly_asked or user_requested_rows != TOP_K:
+            return result_response, "top_k", build_sql_query_with_limit(sql_query=result_response.sql_query,
+                                                                        limit=user_requested_rows)
+
+        # User didnot ask for csv and didnot reuqested any number of rows.... For simplicity we will return 100 rows
+        return result_response, "default", build_sql_query_with_limit(sql_query=result_response.sql_query, 
+                                                                      limit=0, remove=True)
+
+    def _empty_response(self, result_response, mode, final_sql_query):
+        print("The Query returned no data.")
+        if mode != "csv":
+            result_response.sql_query = final_sql_query
+        result_response.suggested_visualization_type.clear()
+        result_response.model_error = False
+        result_response.query_type = 'database'
+        return result_response
+
+    def _data_response(self, result_response, output, mode, final_sql_query, fetched, graph_recommendations):
+        result_response.suggested_visualization_type.clear()
+        result_response.suggested_visualization_type = graph_recommendations
+        result_response.sql_query = final_sql_query
+        if mode == "top_k":
+            result_response.data = fetched.rows[:getattr(output, 'user_requested_top_k_rows')]
+            if fetched.truncated and len(result_response.data) == len(fetched.rows):
+                result_response.answer += (f" Showing the first {len(result_response.data)} rows."
+                                           f" Please say I want csv file if you want all of them.")
+            return result_response
+
+        if fetched.total_rows is None:
+            total = "the"
+        else:
+            total = f"about {fetched.total_rows}" if fetched.total_is_estimate else str(fetched.total_rows)
+        msg = f" Please say I want csv file if you want all {total} rows." if len(fetched.rows) > 1 else ''
+        result_response.answer += msg
+        result_response.data = fetched.rows[:MAX_DISPLAY_ROWS]
+        return result_response
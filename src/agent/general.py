@@ -5,6 +5,18 @@ class GeneralReactAgent:
     def __init__(self, llm):
         self.llm = llm
 
+    def _build_messages(self, query):
+        prompt = f"User asked: {query}\n Your answer should be: I can only answer from the database. Feel free to ask information from the database."
+        return [{"role": "user", "content": prompt}]
+
+    def _fallback_response(self):
+        return ResponseSchemaGeneral(
+            sql_query='',
+            suggested_visualization_type=[],
+            answer="I can only answer from the database related query please ask about db",
+            model_error = True
+        )
+
     def execute(self, query):
         """Execute general query response and return ResponseSchemaGeneral"""
         # Use structured output for consistent response
@@ -12,15 +24,20 @@ class GeneralReactAgent:
         
         try:
             # Simple prompt for general queries
-            prompt = f"User asked: {query}\n Your answer should be: I can only answer from the database. Feel free to ask information from the database."
-            response = structured_llm.invoke([{"role": "user", "content": prompt}])
+            response = structured_llm.invoke(self._build_messages(query))
+            return response
+        except Exception as e:
+            print(f"General agent error: {e}")
+            return self._fallback_response()
+
+    async def aexecute(self, query):
+        """Async variant of execute that does not block the event loop."""
+        structured_llm = self.llm.with_structured_output(ResponseSchemaGeneral)
+
+        try:
+            response = await structured_llm.ainvoke(self._build_messages(query))
             return response
         except Exception as e:
             print(f"General agent error: {e}")
-            return ResponseSchemaGeneral(
-                sql_query='',
-                suggested_visualization_type=[],
-                answer="I can only answer from the database related query please ask about db",
-                model_error = True
-            )
+            return self._fallback_response()
         
\ No newline at end of file
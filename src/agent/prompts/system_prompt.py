@@ -0,0 +1,53 @@
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from src.agent.tools.example_store import ExampleStore
+from src.data_dictionary.index import DataDictionaryIndex
+
+_SECTIONS = re.compile(r"\{(data_dictionary|few_shot_examples)\}")
+
+
+class SystemPrompt:
+    """
+    The database agent's system prompt with the per-question sections filled on demand.
+
+    Everything except {data_dictionary} and {few_shot_examples} is rendered once. Used as the
+    `prompt` callable of create_react_agent: on every model call the columns and examples are
+    retrieved for the latest user messages of the thread, so follow ups keep the columns of
+    the question they refine.
+    """
+
+    def __init__(self, template: str, dictionary: DataDictionaryIndex, examples: Optional[ExampleStore] = None,
+                 recent_questions: int = 2, **fields):
+        self.dictionary = dictionary
+        self.examples = examples
+        self.recent_questions = recent_questions
+        # Odd positions hold section names, even positions static text
+        self._parts = _SECTIONS.split(template)
+        for i in range(0, len(self._parts), 2):
+            self._parts[i] = self._parts[i].format(**fields)
+        self._render = lru_cache(maxsize=256)(self._render_uncached)
+
+    def _section(self, name: str, question: str) -> str:
+        if name == "data_dictionary":
+            return self.dictionary.render_for(question) if question else self.dictionary.text
+        return self.examples.render_for(question) if self.examples is not None else ""
+
+    def _render_uncached(self, question: str, examples_version: int) -> str:
+        return "".join(part if i % 2 == 0 else self._section(part, question) for i, part in enumerate(self._parts))
+
+    def render(self, question: str = "") -> str:
+        """Prompt for the question; the whole dictionary when there is none."""
+        # The store version is part of the key so newly recorded examples show up
+        return self._render(question, self.examples.version if self.examples is not None else 0)
+
+    def _question(self, messages: List[BaseMessage]) -> str:
+        questions = [m.content for m in reversed(messages) if isinstance(m, HumanMessage) and isinstance(m.content, str)]
+        return "\n".join(reversed(questions[:self.recent_questions]))
+
+    def __call__(self, state) -> List[BaseMessage]:
+        messages = state["messages"]
+        return [SystemMessage(content=self.render(self._question(messages)))] + list(messages)
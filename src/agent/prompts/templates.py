@@ -33,10 +33,7 @@ The column description of the {table_names} is
     - If the user query asks for the visualization of the same categorical column in a single plot (e.g., suspicious vs. non-suspicious discounts per day), do not pivot categories into separate columns. Instead, GROUP BY the categorical column (e.g. discount_type) along with the x-axis column so that the result includes one row per category per x-axis value.
     
     Few Shot examples:
-    Example 1:
-    "input": "Generate a line graph showing the total suspicious discount and non suspicious discount amount per day during the month of April 2025",
-    "sql_query": "SELECT bus_date, CASE WHEN is_fraud = 1 AND fraud_category = 'discount fraud' THEN 'suspicious' ELSE 'non-suspicious' END AS discount_type, SUM(reduction_amt) AS total_discount_amount FROM combined_order_data WHERE bus_date >= '2025-04-01' AND bus_date < '2025-05-01' AND reduction_amt IS NOT NULL GROUP BY bus_date, discount_type ORDER BY bus_date",
-    "explanation": "This SQL query retrieves the total suspicious and non-suspicious discount amounts per day for April 2025, grouping by date and discount type as multi-line plot is required to visualize the given user query."
+    {few_shot_examples}
              
 ---
 
@@ -63,3 +60,10 @@ In cases where the user requested column is not present in the data, inform the
 ---
 sql_query is: 
 """
+
+# Shown when the example store has nothing close to the question
+default_few_shot_example = {
+    "question": "Generate a line graph showing the total suspicious discount and non suspicious discount amount per day during the month of April 2025",
+    "sql_query": "SELECT bus_date, CASE WHEN is_fraud = 1 AND fraud_category = 'discount fraud' THEN 'suspicious' ELSE 'non-suspicious' END AS discount_type, SUM(reduction_amt) AS total_discount_amount FROM combined_order_data WHERE bus_date >= '2025-04-01' AND bus_date < '2025-05-01' AND reduction_amt IS NOT NULL GROUP BY bus_date, discount_type ORDER BY bus_date",
+    "explanation": "This SQL query retrieves the total suspicious and non-suspicious discount amounts per day for April 2025, grouping by date and discount type as multi-line plot is required to visualize the given user query.",
+}
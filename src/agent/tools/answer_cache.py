@@ -0,0 +1,194 @@
+"""
+Question-to-answer cache in front of the ReAct loop.
+
+Maps a normalized question to the validated StructuredResponseSchema the agent produced for
+it, so a repeated question goes straight to executing the cached SQL without the classifier,
+the tool calls or the structured-response call. The SQL runs again on every hit; only the
+agent's reasoning is reused.
+
+- questions are compared as token sequences (stopwords removed, naive singular); an exact
+  match is a dictionary lookup, near matches need ANSWER_CACHE_SIMILARITY (Jaccard over
+  words and word pairs, so reordered questions do not match)
+- numbers, negations, ordering and relative time words must be identical: "top 5" never
+  reuses the SQL of "top 10", nor "last month" the SQL of "this month"
+- follow ups that refer back to the conversation ("plot it", "same for 2023") are neither
+  cached nor looked up
+- entries expire after ANSWER_CACHE_TTL_SECONDS and are dropped when a table their SQL
+  reads changes (schema watcher listener), or all at once when the context they were
+  produced in (dialect, row limits, table selection) changes
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from src.agent.tools.lexical_index import tokenize
+from src.configs.settings import settings
+from src.db.sql_utils import sql_identifiers
+from src.services.metrics import cache_families, register_collector
+
+_ANAPHORA = re.compile(
+    r"\b(it|its|them|they|those|these|same|above|previous|again|instead|also)\b"
+    r"|\b(this|that)\b(?!\s+(day|week|month|quarter|year)s?\b)",
+    re.IGNORECASE,
+)
+_CRITICAL_WORDS = {
+    "not", "no", "without", "except", "excluding", "exclude", "top", "bottom", "highest", "lowest", "most",
+    "least", "first", "last", "max", "maximum", "min", "minimum", "asc", "ascending", "desc", "descending",
+    "this", "next", "previous", "current", "today", "yesterday", "tomorrow", "ago",
+}
+_WORDS = re.compile(r"[a-z0-9]+")
+
+
+def is_follow_up(question: str) -> bool:
+    """Questions that only make sense with the previous turns."""
+    return bool(_ANAPHORA.search(question))
+
+
+def _critical(question: str) -> Tuple[str, ...]:
+    # Taken from the raw words: several of them are stopwords for retrieval
+    return tuple(sorted({w for w in _WORDS.findall(question.lower()) if w.isdigit() or w in _CRITICAL_WORDS}))
+
+
+def _features(tokens: List[str]) -> FrozenSet[str]:
+    return frozenset(tokens) | frozenset(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+def _context() -> tuple:
+    return (settings.DIALECT, settings.TOP_K, settings.MAX_DISPLAY_ROWS, tuple(sorted(settings.INCLUDE_TABLES or [])))
+
+
+@dataclass
+class _AnswerEntry:
+    question: str
+    response: Dict[str, Any]
+    critical: Tuple[str, ...]
+    features: FrozenSet[str]
+    identifiers: FrozenSet[str]
+    expires_at: float
+
+
+class AnswerCache:
+    def __init__(self, ttl_seconds: Optional[float] = None, similarity: Optional[float] = None,
+                 max_entries: Optional[int] = None, enabled: Optional[bool] = None):
+        self.ttl_seconds = settings.ANSWER_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.similarity = settings.ANSWER_CACHE_SIMILARITY if similarity is None else similarity
+        self.max_entries = settings.ANSWER_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.enabled = settings.ANSWER_CACHE_ENABLED if enabled is None else enabled
+        self._entries: "OrderedDict[str, _AnswerEntry]" = OrderedDict()
+        self._context = _context()
+        self._lock = threading.Lock()
+        self.hits = self.near_hits = self.misses = self.skipped = self.stores = self.invalidations = 0
+
+    @staticmethod
+    def key(question: str) -> str:
+        # Critical words are part of the key: several are stopwords that tokenize drops
+        return f"{' '.join(tokenize(question))}|{' '.join(_critical(question))}"
+
+    def _check_context(self):
+        """Must be called with the lock held."""
+        context = _context()
+        if context != self._context:
+            self._entries.clear()
+            self._context = context
+
+    def _near(self, critical, features) -> Optional[Tuple[str, _AnswerEntry]]:
+        best, best_score = None, self.similarity
+        for key, entry in self._entries.items():
+            if entry.critical != critical:
+                continue
+            score = len(features & entry.features) / len(features | entry.features)
+            if score >= best_score:
+                best, best_score = (key, entry), score
+        return best
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """The cached structured response for question, or None."""
+        if not self.enabled:
+            return None
+        if is_follow_up(question):
+            with self._lock:
+                self.skipped += 1
+            return None
+        tokens = tokenize(question)
+        key = self.key(question)
+        now = time.monotonic()
+        with self._lock:
+            self._check_context()
+            entry = self._entries.get(key)
+            found = (key, entry) if entry is not None else None
+            if found is None and self.similarity < 1.0:
+                found = self._near(_critical(question), _features(tokens))
+            if found is None or found[1].expires_at <= now:
+                if found is not None:
+                    del self._entries[found[0]]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(found[0])
+            if found[0] == key:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+                print(f"Answer cache near match: {question!r} ~ {found[1].question!r}")
+            return dict(found[1].response)
+
+    def put(self, question: str, response: Dict[str, Any]):
+        """Remember the structured response the agent produced for a standalone question."""
+        if not self.enabled or is_follow_up(question) or not response.get("sql_query"):
+            return
+        tokens = tokenize(question)
+        if not tokens:
+            return
+        entry = _AnswerEntry(question=question, response=dict(response), critical=_critical(question),
+                             features=_features(tokens), identifiers=sql_identifiers(response["sql_query"]),
+                             expires_at=time.monotonic() + self.ttl_seconds)
+        key = self.key(question)
+        with self._lock:
+            self._check_context()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+
+    def discard(self, sql_query: str):
+        """Drop the answers built on sql_query, e.g. after it failed or returned nothing."""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry.response.get("sql_query") == sql_query]:
+                del self._entries[key]
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Drop every answer whose SQL mentions one of tables; returns the number removed."""
+        names = {table.lower() for table in tables}
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.identifiers & names]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "skipped_follow_ups": self.skipped,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "invalidated": self.invalidations,
+                "similarity": self.similarity,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+answer_cache = AnswerCache()
+register_collector(lambda: cache_families("answer", answer_cache.stats()))
@@ -0,0 +1,176 @@
+"""
+Rule-based chart argument inference.
+
+Most result sets have an obvious chart shape: a date column plus a measure is a line chart,
+one category plus a measure is a bar chart, a handful of categories with a share is a pie.
+infer_chart_args fills the chart suggestion models from a vectorized profile of the rows and
+returns None whenever the shape is ambiguous, so only those cases reach the LLM.
+"""
+import re
+import warnings
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pandas as pd
+
+from src.models.graph_models import BarChartSuggestion, LineChartSuggestion, PieChartSuggestion
+
+MAX_SERIES = 10       # Largest group_by cardinality that still reads as a multi-series chart
+PIE_MAX_SLICES = 8    # Largest label cardinality for a pie chart
+
+TEMPORAL_NAME = re.compile(r"(date|time|day|week|month|quarter|year|period|_dt$|_ts$|^dt$)")
+IDENTIFIER_NAME = re.compile(r"(_id$|^id$|_key$|_no$|_number$)")
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    kind: str            # 'temporal', 'numeric' or 'categorical'
+    cardinality: int
+    nulls: int
+    non_negative: bool = False
+    unique: bool = False
+
+
+def _humanize(column: str) -> str:
+    return column.replace("_", " ").strip().title()
+
+
+def _profile(name: str, series: pd.Series) -> ColumnProfile:
+    non_null = series.dropna()
+    cardinality = int(non_null.nunique())
+    profile = ColumnProfile(name=name, kind="categorical", cardinality=cardinality,
+                            nulls=int(series.isna().sum()), unique=cardinality == len(non_null))
+    if non_null.empty:
+        return profile
+
+    lowered = name.lower()
+    if pd.api.types.is_datetime64_any_dtype(non_null):
+        profile.kind = "temporal"
+        return profile
+
+    if pd.api.types.is_bool_dtype(non_null):
+        return profile
+
+    # Decimal values from the driver arrive as object columns
+    numeric = pd.to_numeric(non_null, errors="coerce")
+    if numeric.notna().all():
+        if TEMPORAL_NAME.search(lowered) and numeric.between(1900, 2100).all() and (numeric % 1 == 0).all():
+            profile.kind = "temporal"   # e.g. a "year" column
+        elif not IDENTIFIER_NAME.search(lowered):
+            profile.kind = "numeric"
+            profile.non_negative = bool((numeric >= 0).all())
+        return profile
+
+    if non_null.map(lambda v: hasattr(v, "isoformat")).all():
+        profile.kind = "temporal"       # datetime.date / datetime.datetime objects
+        return profile
+
+    if TEMPORAL_NAME.search(lowered):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            parsed = pd.to_datetime(non_null.astype(str), errors="coerce", format="mixed")
+        if parsed.notna().all():
+            profile.kind = "temporal"
+    return profile
+
+
+def profile_columns(rows: List[dict]) -> List[ColumnProfile]:
+    """Profile every column of the result rows, in SELECT order."""
+    df = pd.DataFrame(rows)
+    return [_profile(column, df[column]) for column in df.columns]
+
+
+def _single(profiles, kind):
+    matches = [p for p in profiles if p.kind == kind]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _infer_line(profiles) -> Optional[LineChartSuggestion]:
+    x_axis = _single(profiles, "temporal")
+    y_axis = _single(profiles, "numeric")
+    if not x_axis or not y_axis:
+        return None
+    categoricals = [p for p in profiles if p.kind == "categorical"]
+    if len(categoricals) > 1:
+        return None
+    group_by = categoricals[0] if categoricals else None
+    if group_by and group_by.cardinality > MAX_SERIES:
+        return None
+    if not group_by and not x_axis.unique:
+        return None   # repeated dates without a split column would draw a zig-zag
+    xlabel, ylabel = _humanize(x_axis.name), _humanize(y_axis.name)
+    return LineChartSuggestion(
+        title=f"{ylabel} over {xlabel}" + (f" by {_humanize(group_by.name)}" if group_by else ""),
+        x_axis=x_axis.name,
+        y_axis=y_axis.name,
+        line_type="multi-line" if group_by else "single",
+        group_by=group_by.name if group_by else None,
+        xlabel=xlabel,
+        ylabel=ylabel,
+    )
+
+
+def _infer_bar(profiles) -> Optional[BarChartSuggestion]:
+    y_axis = _single(profiles, "numeric")
+    dimensions = [p for p in profiles if p.kind in ("categorical", "temporal")]
+    if not y_axis or not dimensions or len(dimensions) > 2:
+        return None
+    if len(dimensions) == 1:
+        x_axis, group_by = dimensions[0], None
+        if not x_axis.unique:
+            return None
+    else:
+        temporal = [p for p in dimensions if p.kind == "temporal"]
+        # A date always goes on the x axis; otherwise follow the SELECT (GROUP BY) order
+        x_axis = temporal[0] if len(temporal) == 1 else dimensions[0]
+        group_by = dimensions[1] if x_axis is dimensions[0] else dimensions[0]
+        if group_by.cardinality > MAX_SERIES:
+            return None
+    xlabel, ylabel = _humanize(x_axis.name), _humanize(y_axis.name)
+    return BarChartSuggestion(
+        title=f"{ylabel} by {xlabel}" + (f" and {_humanize(group_by.name)}" if group_by else ""),
+        x_axis=x_axis.name,
+        y_axis=y_axis.name,
+        bar_type="grouped" if group_by else "single",
+        group_by=group_by.name if group_by else None,
+        xlabel=xlabel,
+        ylabel=ylabel,
+    )
+
+
+def _infer_pie(profiles) -> Optional[PieChartSuggestion]:
+    value = _single(profiles, "numeric")
+    label = _single(profiles, "categorical")
+    if not value or not label or len(profiles) != 2:
+        return None
+    if not value.non_negative or not label.unique or label.cardinality > PIE_MAX_SLICES:
+        return None
+    return PieChartSuggestion(
+        title=f"{_humanize(value.name)} by {_humanize(label.name)}",
+        label=label.name,
+        value=value.name,
+        legend_title=_humanize(label.name),
+    )
+
+
+_RULES = {"line": _infer_line, "bar": _infer_bar, "pie": _infer_pie}
+
+
+def infer_chart_args(graph_type: str, rows: List[dict], profiles: Optional[List[ColumnProfile]] = None) -> Optional[dict]:
+    """
+    Chart arguments for graph_type inferred from the result rows.
+
+    Returns:
+        The model_dump() of the matching chart suggestion, or None when the heuristics
+        are not confident and the LLM should decide.
+    """
+    rule = _RULES.get(graph_type)
+    if rule is None or not rows:
+        return None
+    try:
+        suggestion = rule(profiles if profiles is not None else profile_columns(rows))
+    except Exception as e:
+        print(f"Chart inference failed for {graph_type}: {e}")
+        return None
+    return suggestion.model_dump() if suggestion else None
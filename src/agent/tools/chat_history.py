@@ -1,14 +1,190 @@
-from langchain_core.messages import ToolMessage, HumanMessage
+"""
+Chat history rendering for the classifier, chitchat and chart prompts.
 
-def get_chat_history(messages):
-    chat_log = []
+The history is built per turn (a user message and the tool messages that followed it).
+The most recent turns are rendered verbatim; older turns keep the user message and the SQL
+they ran, with the sql_db_query result reduced to a row count. Turns are dropped from the
+oldest end until the history fits the token budget.
+
+ChatHistoryBuilder caches the rendered turns per thread, so each request only renders the
+messages added since the previous one instead of walking the whole checkpoint again.
+"""
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from src.configs.settings import settings
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_encoding_failed = False
+
+_SQL_FIELD = re.compile(r'"sql_query":\s*"((?:[^"\\]|\\.)*)"')
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken; falls back to ~4 characters per token when the encoding is unavailable."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(settings.CHAT_HISTORY_ENCODING)
+                except Exception as e:
+                    print(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+                    _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _content(msg: BaseMessage) -> str:
+    return msg.content if isinstance(msg.content, str) else str(msg.content)
+
+
+def _render_message(msg: BaseMessage) -> str:
+    if isinstance(msg, HumanMessage):
+        return f"\n\nUser: {_content(msg)}"
+    label = "Data Extracted" if msg.name == 'sql_db_query' else "SQL Query"
+    return f"\n{label}:\n{_content(msg)}"
+
+
+def summarize_query_output(content: str) -> str:
+    """SQL and row count of a sql_db_query tool message, without the rows."""
+    try:
+        payload = json.loads(content)
+        sql, result = payload.get("sql_query", ""), payload.get("result")
+    except (ValueError, AttributeError):
+        # Truncated or non-JSON content: the SQL is still near the start
+        match = _SQL_FIELD.search(content)
+        sql = match.group(1).replace('\\"', '"').replace('\\n', '\n') if match else ""
+        result = None
+    if isinstance(result, dict) and "row_count" in result:
+        outcome = f"returned {result['row_count']} rows"
+    elif isinstance(result, list):
+        outcome = f"returned {len(result)} rows"
+    elif isinstance(result, str) and result.startswith("Error"):
+        outcome = "failed"
+    elif result == "":
+        outcome = "returned no rows"
+    else:
+        outcome = "result omitted"
+    return f"\nSQL Query ({outcome}):\n{sql}" if sql else ""
+
+
+def _render_compact(msg: BaseMessage) -> str:
+    if isinstance(msg, HumanMessage):
+        return _render_message(msg)
+    if isinstance(msg, ToolMessage) and msg.name == 'sql_db_query':
+        return summarize_query_output(_content(msg))
+    return ""   # schema and table listings can be fetched again
+
+
+@dataclass
+class _Turn:
+    verbatim: str = ""
+    compact: str = ""
+    verbatim_tokens: int = 0
+    compact_tokens: int = 0
+
+    def add(self, msg: BaseMessage):
+        self.verbatim += _render_message(msg)
+        self.compact += _render_compact(msg)
+
+    def seal(self):
+        self.verbatim_tokens = count_tokens(self.verbatim)
+        self.compact_tokens = count_tokens(self.compact)
+
+
+def _extend_turns(turns: List[_Turn], messages: List[BaseMessage]) -> List[_Turn]:
+    """Render messages onto turns. Returns a new list; turns passed in (possibly cached) are not mutated."""
+    turns = list(turns)
+    touched = set()
     for msg in messages:
-        if isinstance(msg, HumanMessage):
-            chat_log.append(f"\n\nUser: {msg.content}")
-        elif isinstance(msg, ToolMessage):
-            label = "Data Extracted" if msg.name == 'sql_db_query' else "SQL Query"
-            chat_log.append(f"\n{label}:\n{msg.content}")
-    result = ''.join(chat_log)
-    return result
+        if not isinstance(msg, (HumanMessage, ToolMessage)):
+            continue
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append(_Turn())
+        elif len(turns) - 1 not in touched:
+            turns[-1] = replace(turns[-1])   # tool messages continuing the last cached turn
+        turns[-1].add(msg)
+        touched.add(len(turns) - 1)
+    for index in touched:
+        turns[index].seal()
+    return turns
+
+
+def _assemble(turns: List[_Turn], token_budget: int, verbatim_turns: int) -> str:
+    """Newest turns first until the budget is used; recent turns verbatim when they fit."""
+    selected, used = [], 0
+    for age, turn in enumerate(reversed(turns)):
+        if age < verbatim_turns and used + turn.verbatim_tokens <= token_budget:
+            text, tokens = turn.verbatim, turn.verbatim_tokens
+        else:
+            text, tokens = turn.compact, turn.compact_tokens
+        if used + tokens > token_budget:
+            break
+        selected.append(text)
+        used += tokens
+    return ''.join(reversed(selected))
+
+
+def get_chat_history(messages, token_budget: Optional[int] = None, verbatim_turns: Optional[int] = None):
+    """Render the history of a message list within the token budget (no caching)."""
+    return _assemble(_extend_turns([], messages),
+                     settings.CHAT_HISTORY_TOKEN_BUDGET if token_budget is None else token_budget,
+                     settings.CHAT_HISTORY_VERBATIM_TURNS if verbatim_turns is None else verbatim_turns)
+
+
+@dataclass
+class _ThreadHistory:
+    turns: List[_Turn]
+    consumed: int
+    last_id: Optional[str]
+
+
+class ChatHistoryBuilder:
+    """Incremental, per-thread cache of rendered turns (LRU bounded by thread count)."""
+
+    def __init__(self, token_budget: Optional[int] = None, verbatim_turns: Optional[int] = None,
+                 max_threads: Optional[int] = None):
+        self.token_budget = settings.CHAT_HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+        self.verbatim_turns = settings.CHAT_HISTORY_VERBATIM_TURNS if verbatim_turns is None else verbatim_turns
+        self.max_threads = settings.CHAT_HISTORY_CACHE_THREADS if max_threads is None else max_threads
+        self._threads: "OrderedDict[str, _ThreadHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, thread_id: str, messages: List[BaseMessage]) -> Optional[_ThreadHistory]:
+        cached = self._threads.get(thread_id)
+        if cached is None or cached.consumed > len(messages):
+            return None
+        # The checkpoint only ever appends; a different message at the old end means the thread was reset
+        if cached.consumed and getattr(messages[cached.consumed - 1], "id", None) != cached.last_id:
+            return None
+        return cached
 
+    def render(self, thread_id: str, messages: List[BaseMessage]) -> str:
+        with self._lock:
+            cached = self._cached(thread_id, messages)
+        turns = cached.turns if cached else []
+        consumed = cached.consumed if cached else 0
+        if consumed < len(messages) or cached is None:
+            turns = _extend_turns(turns, messages[consumed:])
+            with self._lock:
+                self._threads[thread_id] = _ThreadHistory(
+                    turns=turns, consumed=len(messages),
+                    last_id=getattr(messages[-1], "id", None) if messages else None)
+                self._threads.move_to_end(thread_id)
+                while len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+        return _assemble(turns, self.token_budget, self.verbatim_turns)
 
+    def invalidate(self, thread_id: str):
+        with self._lock:
+            self._threads.pop(thread_id, None)
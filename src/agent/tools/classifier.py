@@ -1,7 +1,11 @@
+import time
 from typing import Literal
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chat_models import init_chat_model
+from src.configs.settings import settings
+from src.agent.tools.fast_classifier import LocalQueryClassifier, classifier_stats
+from src.data_dictionary.index import dictionary_index
 
 
 class Classification(BaseModel):
@@ -14,6 +18,7 @@ class Classification(BaseModel):
 class QueryClassifier:
     def __init__(self, data_dictionary: str, chat_history: str, model):
         self.data_dictionary = data_dictionary
+        self.dictionary_index = dictionary_index(data_dictionary)
         self.chat_history = chat_history
         self.prompt_template = ChatPromptTemplate.from_template(
             """
@@ -38,14 +43,43 @@ class QueryClassifier:
             """
         )
         self.llm = model.with_structured_output(Classification)
+        self.local_classifier = LocalQueryClassifier(data_dictionary) if settings.CLASSIFIER_FAST_PATH_ENABLED else None
 
-    def classify_query(self, user_query: str) -> Classification:
-        prompt_messages = self.prompt_template.format_prompt(
+    def _build_messages(self, user_query: str, chat_history: str | None = None):
+        return self.prompt_template.format_prompt(
             input=user_query,
-            chat_history=self.chat_history,
-            data_dictionary=self.data_dictionary
+            chat_history=self.chat_history if chat_history is None else chat_history,
+            # Only the columns the query mentions; the table/column outline when it mentions none
+            data_dictionary=self.dictionary_index.render_for(user_query, fallback=self.dictionary_index.outline())
         ).to_messages()
+
+    def _classify_locally(self, user_query: str, chat_history: str | None) -> Classification | None:
+        """Lexical fast path; None means the message is ambiguous and needs the LLM."""
+        if self.local_classifier is None:
+            return None
+        local = self.local_classifier.classify(user_query, self.chat_history if chat_history is None else chat_history)
+        print(f"Local classification: {local}")
+        if local.query_type is None:
+            return None
+        return Classification(query_type=local.query_type)
+
+    def classify_query(self, user_query: str, chat_history: str | None = None) -> Classification:
+        if result := self._classify_locally(user_query, chat_history):
+            return result
+        start = time.perf_counter()
+        prompt_messages = self._build_messages(user_query, chat_history)
         result = self.llm.invoke(prompt_messages)
+        classifier_stats.record_llm((time.perf_counter() - start) * 1000)
+        print("The classification is ", result)
+        return result
+
+    async def aclassify_query(self, user_query: str, chat_history: str | None = None) -> Classification:
+        if result := self._classify_locally(user_query, chat_history):
+            return result
+        start = time.perf_counter()
+        prompt_messages = self._build_messages(user_query, chat_history)
+        result = await self.llm.ainvoke(prompt_messages)
+        classifier_stats.record_llm((time.perf_counter() - start) * 1000)
         print("The classification is ", result)
         return result
 
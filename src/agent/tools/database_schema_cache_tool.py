@@ -1,4 +1,5 @@
-from typing import Dict, ClassVar, Optional, Type
+from typing import Dict, ClassVar, Iterable, List, Optional, Set, Tuple, Type
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import threading
 from dataclasses import dataclass
@@ -8,12 +9,128 @@ from langchain_core.tools import BaseTool
 from langchain_core.callbacks import (
     CallbackManagerForToolRun,
 )
+from src.configs.settings import settings
+from src.services.metrics import cache_families, register_collector
 
 @dataclass
 class CacheEntry:
     data: str
     timestamp: datetime
 
+
+class SchemaCache:
+    """
+    Per-table cache of the schema and sample rows rendered by SQLDatabase.get_table_info.
+
+    Any table combination is composed from per-table entries. A missing table is loaded once
+    (single-flight per table, other tables are not blocked). An entry older than refresh_after
+    is still served while one background refresh replaces it; only entries older than
+    max_stale are reloaded in the request path.
+    """
+
+    def __init__(self, refresh_after: Optional[timedelta] = None, max_stale: Optional[timedelta] = None,
+                 max_workers: int = 2):
+        self.refresh_after = refresh_after or timedelta(seconds=settings.SCHEMA_CACHE_REFRESH_SECONDS)
+        self.max_stale = max_stale or timedelta(seconds=settings.SCHEMA_CACHE_MAX_STALE_SECONDS)
+        self._entries: Dict[Tuple[str, str], CacheEntry] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="schema-refresh")
+        self.hits = self.stale_hits = self.misses = 0
+
+    @staticmethod
+    def _key(db: SQLDatabase, table: str) -> Tuple[str, str]:
+        return str(db._engine.url), table
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _load(self, db: SQLDatabase, key) -> str:
+        data = db.get_table_info_no_throw([key[1]])
+        if not data.startswith("Error"):
+            with self._lock:
+                self._entries[key] = CacheEntry(data=data, timestamp=datetime.now())
+        return data
+
+    def _refresh(self, db: SQLDatabase, key):
+        try:
+            with self._key_lock(key):
+                self._load(db, key)
+        except Exception as e:
+            print(f"Background schema refresh of {key[1]} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_table(self, db: SQLDatabase, table: str) -> str:
+        key = self._key(db, table)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            age = datetime.now() - entry.timestamp
+            if age < self.refresh_after:
+                with self._lock:
+                    self.hits += 1
+                return entry.data
+            if age < self.max_stale:
+                with self._lock:
+                    self.stale_hits += 1
+                    schedule = key not in self._refreshing
+                    self._refreshing.add(key)
+                if schedule:
+                    self._refresh_pool.submit(self._refresh, db, key)
+                return entry.data
+
+        with self._key_lock(key):
+            # Another request may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+            with self._lock:
+                if entry is not None and datetime.now() - entry.timestamp < self.max_stale:
+                    self.hits += 1
+                    return entry.data
+                self.misses += 1
+            return self._load(db, key)
+
+    def get(self, db: SQLDatabase, tables: Iterable[str]) -> str:
+        parts = [self.get_table(db, table) for table in dict.fromkeys(tables)]
+        errors = [part for part in parts if part.startswith("Error")]
+        return errors[0] if errors else "\n\n".join(parts)
+
+    def seed(self, db: SQLDatabase, table_info: Dict[str, str], timestamp: Optional[datetime] = None):
+        """Fill entries from a schema snapshot; old entries are refreshed in the background on first use."""
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            for table, data in table_info.items():
+                self._entries[self._key(db, table)] = CacheEntry(data=data, timestamp=timestamp)
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None):
+        """Drop the entries of the given tables (of any database), or everything."""
+        with self._lock:
+            if tables is None:
+                self._entries.clear()
+                return
+            names = set(tables)
+            for key in [k for k in self._entries if k[1] in names]:
+                del self._entries[key]
+
+    def cached_tables(self) -> List[str]:
+        with self._lock:
+            return sorted({table for _, table in self._entries})
+
+    def stats(self) -> Dict[str, int]:
+        """Stale hits are served while a background refresh runs, so they count as hits."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits + self.stale_hits,
+                    "stale_hits": self.stale_hits, "misses": self.misses}
+
+
+schema_cache = SchemaCache()
+register_collector(lambda: cache_families("schema", schema_cache.stats()))
+
+
 class BaseSQLDatabaseTool(BaseModel):
     db: SQLDatabase = Field(exclude=True, sample_rows_in_table_info=3)
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -28,10 +145,8 @@ class InfoSQLDatabaseTool(BaseSQLDatabaseTool, BaseTool):
     name: str = "sql_db_schema"
     description: str = "Get the schema and sample rows for the specified SQL tables."
     args_schema: Type[BaseModel] = _InfoSQLDatabaseToolInput
-    
-    _cache: ClassVar[Dict[str, CacheEntry]] = {}
-    _lock: ClassVar[threading.Lock] = threading.Lock()
-    CACHE_TIMEOUT: ClassVar[timedelta] = timedelta(minutes=15)
+
+    _cache: ClassVar[SchemaCache] = schema_cache
 
     def _run(
         self,
@@ -43,21 +158,8 @@ class InfoSQLDatabaseTool(BaseSQLDatabaseTool, BaseTool):
         if not tables:
             raise ValueError("No valid table names provided")
 
-        cache_key = f"{str(self.db._engine.url)}|{','.join(sorted(tables))}"
-        
-        with self._lock:
-            if cache_entry := self._cache.get(cache_key):
-                if (datetime.now() - cache_entry.timestamp) < self.CACHE_TIMEOUT:
-                    print("\n\nUsing Schema from Cache\n\n")
-                    return cache_entry.data
-
-            result = self.db.get_table_info_no_throw(tables)
-            self._cache[cache_key] = CacheEntry(data=result, timestamp=datetime.now())
-            return result
-
-
+        return self._cache.get(self.db, tables)
 
     @classmethod
-    def clear_cache(cls) -> None:
-        with cls._lock:
-            cls._cache.clear()
\ No newline at end of file
+    def clear_cache(cls, tables: Optional[Iterable[str]] = None) -> None:
+        cls._cache.invalidate(tables)
@@ -0,0 +1,158 @@
+"""
+Few-shot example store for the database agent.
+
+Examples are (question, SQL) pairs from the evaluation workbook and from answered production
+questions, appended to a JSONL file. A BM25 index over the questions picks the examples
+closest to the current question; they replace the single hard-coded example of the system
+prompt so the agent starts from a query shaped like the one it needs.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from src.agent.tools.lexical_index import BM25Index, tokenize
+from src.configs.settings import settings
+from src.db.sql_utils import normalize_sql
+
+QUESTION_COLUMNS = ("question", "user_query", "input", "nl_question")
+SQL_COLUMNS = ("gt_sql", "sql_query", "sql")
+
+
+@dataclass
+class SQLExample:
+    question: str
+    sql_query: str
+    explanation: str = ""
+    source: str = "production"     # builtin, eval or production
+    created_at: float = 0.0
+
+
+def _key(question: str) -> str:
+    return " ".join(tokenize(question))
+
+
+def render_examples(examples: List[SQLExample]) -> str:
+    """Examples in the layout the system prompt always used."""
+    blocks = []
+    for n, example in enumerate(examples, 1):
+        lines = [f"Example {n}:", f"\"input\": {json.dumps(example.question)},",
+                 f"\"sql_query\": {json.dumps(example.sql_query)}"]
+        if example.explanation:
+            lines[-1] += ","
+            lines.append(f"\"explanation\": {json.dumps(example.explanation)}")
+        blocks.append("\n    ".join(lines))
+    return "\n    ".join(blocks)
+
+
+class ExampleStore:
+    """Examples keyed by normalized question (the latest SQL for a question wins) with a lazily rebuilt index."""
+
+    def __init__(self, path: Optional[str] = None, default: Optional[SQLExample] = None):
+        self.path = settings.EXAMPLES_STORE_PATH if path is None else path
+        self.default = default
+        self._examples: Dict[str, SQLExample] = {}
+        self._ordered: List[SQLExample] = []
+        self._index: Optional[BM25Index] = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if default is not None:
+            self._put(default)
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    def _put(self, example: SQLExample) -> bool:
+        key = _key(example.question)
+        if not key or not example.sql_query.strip():
+            return False
+        with self._lock:
+            self._examples[key] = example
+            self._index = None
+            self.version += 1
+        return True
+
+    def load_eval(self, path: Optional[str] = None) -> int:
+        """Seed from the evaluation workbook; it is skipped when it has no question column."""
+        path = settings.EXAMPLES_EVAL_PATH if path is None else path
+        if not path or not os.path.exists(path):
+            return 0
+        import pandas as pd
+        loaded = 0
+        for sheet, df in pd.read_excel(path, sheet_name=None).items():
+            columns = {c.lower(): c for c in df.columns}
+            question = next((columns[c] for c in QUESTION_COLUMNS if c in columns), None)
+            sql = next((columns[c] for c in SQL_COLUMNS if c in columns), None)
+            if question is None or sql is None:
+                print(f"Skipping {path} [{sheet}] for few-shot examples: no question and SQL columns")
+                continue
+            for q, s in df[[question, sql]].dropna().itertuples(index=False):
+                loaded += self._put(SQLExample(question=str(q), sql_query=str(s), source="eval"))
+        return loaded
+
+    def load_jsonl(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        loaded = 0
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    loaded += self._put(SQLExample(**json.loads(line)))
+                except (ValueError, TypeError) as e:
+                    print(f"Skipping malformed example in {self.path}: {e}")
+        return loaded
+
+    def load(self) -> "ExampleStore":
+        start = time.perf_counter()
+        seeded, recorded = self.load_eval(), self.load_jsonl()
+        print(f"Loaded {seeded} evaluation and {recorded} recorded few-shot examples "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return self
+
+    def add(self, question: str, sql_query: str) -> bool:
+        """Record an answered question; persisted so it survives restarts."""
+        if len(tokenize(question)) < settings.EXAMPLES_MIN_QUESTION_TOKENS:
+            return False    # "plot it as a pie" is only meaningful with its thread
+        key = _key(question)
+        existing = self._examples.get(key)
+        if existing is not None and normalize_sql(existing.sql_query) == normalize_sql(sql_query):
+            return False
+        example = SQLExample(question=question, sql_query=sql_query, created_at=time.time())
+        if not self._put(example):
+            return False
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._write_lock, open(self.path, "a") as f:
+                f.write(json.dumps(asdict(example)) + "\n")
+        return True
+
+    def _current_index(self):
+        with self._lock:
+            if self._index is None:
+                self._ordered = list(self._examples.values())
+                self._index = BM25Index([tokenize(e.question) for e in self._ordered])
+            return self._index, self._ordered
+
+    def search(self, question: str, k: Optional[int] = None) -> List[SQLExample]:
+        k = settings.EXAMPLES_TOP_K if k is None else k
+        index, examples = self._current_index()
+        return [examples[i] for i, score in index.search(question, k) if score >= settings.EXAMPLES_MIN_SCORE]
+
+    def render_for(self, question: str, k: Optional[int] = None) -> str:
+        """Most similar examples; the built-in example when none is similar enough."""
+        examples = self.search(question, k) if question else []
+        if not examples and self.default is not None:
+            examples = [self.default]
+        return render_examples(examples)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sources: Dict[str, int] = {}
+            for example in self._examples.values():
+                sources[example.source] = sources.get(example.source, 0) + 1
+        return {"examples": len(self), "by_source": sources, "path": self.path}
@@ -0,0 +1,166 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from src.configs.settings import settings
+from src.data_dictionary.index import dictionary_index
+
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hii+|hello|hey|hey there|hiya|yo|greetings|good (morning|afternoon|evening|day)|"
+    r"thanks|thank you|thank you so much|thanks a lot|thx|ty|cheers|ok|okay|cool|great|nice|awesome|"
+    r"bye|goodbye|see you|see ya|how are you|how are you doing|how's it going|what's up|sup|"
+    r"who are you|what are you|what can you do|what do you do|help)"
+    r"(\s+(there|again|bot|assistant|buddy|friend|mate|today))?[\s!.?,:)]*$",
+    re.IGNORECASE,
+)
+GREETING_PREFIX = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening))\b", re.IGNORECASE)
+
+SQL_STATEMENT = re.compile(r"\bselect\b.+\bfrom\b|\bgroup\s+by\b|\border\s+by\b|\bwhere\b.+[=<>]", re.IGNORECASE)
+
+INTENT_KEYWORDS = {
+    "show", "list", "display", "give", "get", "fetch", "find", "count", "total", "sum", "average", "avg",
+    "mean", "median", "top", "bottom", "highest", "lowest", "most", "least", "max", "maximum", "min",
+    "minimum", "number", "many", "much", "rank", "ranking", "compare", "comparison", "distribution",
+    "percentage", "percent", "share", "ratio", "trend", "breakdown", "group", "per", "daily", "weekly",
+    "monthly", "yearly", "between", "since", "last", "records", "rows", "data", "query", "sql",
+}
+OUTPUT_KEYWORDS = {
+    "plot", "chart", "graph", "visualize", "visualise", "visualization", "bar", "barplot", "pie",
+    "line", "csv", "export", "download", "excel", "table",
+}
+# Marks an output request as being about the previous answer: "plot it", "this as csv", "as a bar chart"
+FOLLOW_UP = re.compile(r"\b(it|this|them|these|those)\b|\bas an?\b")
+# Column name fragments that carry little meaning on their own
+GENERIC_PARTS = {"id", "fl", "flag", "amt", "cd", "code", "no", "num", "nm", "dt", "ts", "the", "of", "is", "to"}
+
+
+@dataclass
+class LocalClassification:
+    query_type: Optional[Literal["database", "chitchat", "general"]]
+    confidence: float
+    reason: str = ""
+
+
+class ClassifierStats:
+    """Process-wide counters used to tune CLASSIFIER_CONFIDENCE_THRESHOLD."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.total = 0
+            self.local_hits = {"database": 0, "chitchat": 0, "general": 0}
+            self.llm_fallbacks = 0
+            self.local_latency_ms = 0.0
+            self.llm_latency_ms = 0.0
+            # Best local confidence per message in 0.1 buckets, including fallbacks
+            self.confidence_buckets = [0] * 10
+
+    def record_local(self, result: LocalClassification, latency_ms: float):
+        with self._lock:
+            self.total += 1
+            self.local_latency_ms += latency_ms
+            self.confidence_buckets[min(int(result.confidence * 10), 9)] += 1
+            if result.query_type is not None:
+                self.local_hits[result.query_type] += 1
+
+    def record_llm(self, latency_ms: float):
+        with self._lock:
+            self.llm_fallbacks += 1
+            self.llm_latency_ms += latency_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hits = sum(self.local_hits.values())
+            return {
+                "total": self.total,
+                "local_hits": dict(self.local_hits),
+                "llm_fallbacks": self.llm_fallbacks,
+                "hit_rate": hits / self.total if self.total else 0.0,
+                "avg_local_latency_ms": self.local_latency_ms / self.total if self.total else 0.0,
+                "avg_llm_latency_ms": self.llm_latency_ms / self.llm_fallbacks if self.llm_fallbacks else 0.0,
+                "confidence_threshold": settings.CLASSIFIER_CONFIDENCE_THRESHOLD,
+                "confidence_buckets": {f"{i / 10:.1f}-{(i + 1) / 10:.1f}": n
+                                       for i, n in enumerate(self.confidence_buckets)},
+            }
+
+
+classifier_stats = ClassifierStats()
+
+
+def parse_schema_terms(data_dictionary: str):
+    """Table names, full column names and informative column name parts from data_dictionary.txt."""
+    tables, columns, parts = set(), set(), set()
+    for table in dictionary_index(data_dictionary).tables:
+        tables.add(table.name.lower())
+        for entry in table.columns:
+            column = entry.name.lower()
+            columns.add(column)
+            parts.update(p for p in column.split("_") if len(p) > 2 and p not in GENERIC_PARTS)
+    return tables, columns, parts
+
+
+class LocalQueryClassifier:
+    """
+    Lexical first-stage classifier.
+    Decides the easy majority of messages (greetings, questions naming schema columns)
+    and returns query_type=None when it is not confident so the caller falls back to the LLM.
+    """
+
+    def __init__(self, data_dictionary: str, threshold: float | None = None):
+        self.tables, self.columns, self.column_parts = parse_schema_terms(data_dictionary)
+        self.threshold = settings.CLASSIFIER_CONFIDENCE_THRESHOLD if threshold is None else threshold
+
+    def _score(self, user_query: str, chat_history: str) -> LocalClassification:
+        text = user_query.strip().lower()
+        if not text:
+            return LocalClassification(None, 0.0, "empty")
+
+        tokens = re.findall(r"[a-z0-9_]+", text)
+        # Naive singular forms so "accounts" matches the account_id column
+        token_set = set(tokens) | {t[:-1] for t in tokens if t.endswith("s") and len(t) > 3}
+        schema_names = token_set & (self.columns | self.tables)
+        schema_parts = token_set & self.column_parts
+        intents = token_set & INTENT_KEYWORDS
+        outputs = token_set & OUTPUT_KEYWORDS
+
+        if SQL_STATEMENT.search(text):
+            return LocalClassification("database", 0.99, "sql statement")
+
+        db_score = 0.0
+        if schema_names:
+            db_score += 0.6
+        db_score += min(0.25 * len(schema_parts - schema_names), 0.5)
+        if db_score:
+            db_score += min(0.15 * len(intents), 0.3)
+        greeting = bool(GREETING_PREFIX.match(text))
+        if outputs and not (greeting and not db_score and not intents):
+            # "plot it as a pie chart", "give me this as csv": follow ups on the previous answer.
+            # Words like "bar" or "line" alone are too common to skip the LLM ("the best bar in town")
+            follow_up = bool(intents) or bool(FOLLOW_UP.search(text))
+            db_score += 0.9 if chat_history and follow_up else min(0.45, self.threshold / 2)
+        if db_score >= 0.5 and re.search(r"\d", text):
+            db_score += 0.1
+
+        if db_score:
+            return LocalClassification("database", min(db_score, 0.99),
+                                       f"schema={sorted(schema_names | schema_parts)} output={sorted(outputs)}")
+
+        if GREETING_PATTERN.match(text):
+            return LocalClassification("chitchat", 0.95, "greeting")
+        if greeting and len(tokens) <= 6 and not intents and not outputs:
+            return LocalClassification("chitchat", 0.7, "greeting prefix")
+        return LocalClassification(None, 0.0, "no lexical signal")
+
+    def classify(self, user_query: str, chat_history: str = "") -> LocalClassification:
+        start = time.perf_counter()
+        result = self._score(user_query, chat_history)
+        if result.query_type is not None and result.confidence < self.threshold:
+            result = LocalClassification(None, result.confidence, f"below threshold: {result.reason}")
+        classifier_stats.record_local(result, (time.perf_counter() - start) * 1000)
+        return result
@@ -1,8 +1,9 @@
-from typing import List
-from pydantic import BaseModel
+import threading
+from typing import Any, ClassVar, Dict, List, Optional, Type
+from pydantic import BaseModel, Field, create_model
 # from langchain.chat_models import init_chat_model
 from trustcall import create_extractor
-from src.data_dictionary.extract import explanations
+from src.data_dictionary.index import dictionary_index
 from src.agent.prompts.graphing import graph_prompt
 
 class PromptBuilder:
@@ -22,7 +23,8 @@ class PromptBuilder:
         self.chat_history = chat_history
         self.latest_user_query = latest_user_query
         self.column_names = column_names
-        self.data_dictionary= explanations()
+        # Descriptions of the result columns and of the columns the question refers to
+        self.data_dictionary = dictionary_index().render_for(latest_user_query, names=column_names)
         self.agent_response_summary = agent_response_summary
 
     def build(self) -> str:
@@ -37,21 +39,70 @@ class PromptBuilder:
 
 
 class ChartSuggester:
+    # trustcall extractors are stateless once built, so one per (llm, schema) is reused across requests
+    _extractors: ClassVar[Dict[tuple, Any]] = {}
+    _batch_schemas: ClassVar[Dict[tuple, Type[BaseModel]]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
     def __init__(self, llm):
         self.llm = llm
+
+    def _get_extractor(self, schema: Type[BaseModel]):
+        key = (id(self.llm), schema)
+        if key not in self._extractors:
+            with self._lock:
+                if key not in self._extractors:
+                    self._extractors[key] = create_extractor(self.llm, tools=[schema])
+        return self._extractors[key]
+
+    @classmethod
+    def batch_schema(cls, schemas: Dict[str, Type[BaseModel]]) -> Type[BaseModel]:
+        """One tool schema with an optional field per requested chart type, e.g. {'bar': ..., 'pie': ...}."""
+        key = tuple(sorted((g_type, model.__name__) for g_type, model in schemas.items()))
+        if key not in cls._batch_schemas:
+            fields = {
+                g_type: (Optional[model], Field(None, description=f"Configuration for the {g_type} chart"))
+                for g_type, model in sorted(schemas.items())
+            }
+            cls._batch_schemas[key] = create_model(
+                "ChartSuggestions",
+                __doc__="Chart configurations, one per requested graph type.",
+                **fields,
+            )
+        return cls._batch_schemas[key]
+
+    @staticmethod
+    def _first_response(response) -> dict:
+        if "responses" in response and response["responses"]:
+            return response["responses"][0].model_dump()
+        return {}
+
     def suggest_chart(self, prompt: str, schema: BaseModel) -> dict:
         try:
-            extractor = create_extractor(self.llm, tools=[schema])
-            response = extractor.invoke({"messages": [{"role": "user", "content": prompt}]})
+            response = self._get_extractor(schema).invoke({"messages": [{"role": "user", "content": prompt}]})
             # print("Raw Response:", response)
-            if "responses" in response and response["responses"]:
-                return response["responses"][0].model_dump()
-            else:
-                return {}
+            return self._first_response(response)
+        except Exception as e:
+            print("Exception during extraction:", e)
+            return {}
+
+    async def asuggest_chart(self, prompt: str, schema: BaseModel) -> dict:
+        try:
+            response = await self._get_extractor(schema).ainvoke({"messages": [{"role": "user", "content": prompt}]})
+            return self._first_response(response)
         except Exception as e:
             print("Exception during extraction:", e)
             return {}
 
+    def suggest_charts(self, prompt: str, schemas: Dict[str, Type[BaseModel]]) -> Dict[str, dict]:
+        """Ask for every requested chart type in a single structured call; missing types are left out."""
+        suggestions = self.suggest_chart(prompt, self.batch_schema(schemas))
+        return {g_type: args for g_type, args in suggestions.items() if args}
+
+    async def asuggest_charts(self, prompt: str, schemas: Dict[str, Type[BaseModel]]) -> Dict[str, dict]:
+        suggestions = await self.asuggest_chart(prompt, self.batch_schema(schemas))
+        return {g_type: args for g_type, args in suggestions.items() if args}
+
 
 # === Example Usage ===
 if __name__ == "__main__":
@@ -1,44 +1,132 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from src.configs.settings import settings
 from src.agent.tools.graph_analyzer import PromptBuilder, ChartSuggester
+from src.agent.tools.chart_inference import infer_chart_args, profile_columns
 from src.models.graph_models import Table, LineChartSuggestion, BarChartSuggestion, PieChartSuggestion
 
 schema = {
-    "line": LineChartSuggestion, 
+    "line": LineChartSuggestion,
     'bar': BarChartSuggestion,
     'pie': PieChartSuggestion,
     'table': Table
     }
 
-def recommend_graph_object(data_extracted_from_database, output, llm, chat_history, latest_user_query, query):
-    column_names = list(data_extracted_from_database[0].keys())
-    print(column_names)
-    results = []
-    graph_types = set(output.suggested_visualization_type) 
-    agent_response_summary = output.answer
-    supported_types = {"line", "bar", "pie", 'table'}
+supported_types = {"line", "bar", "pie", 'table'}
+
+# Bounds the number of chart LLM calls in flight across all requests of the process
+_chart_pool = ThreadPoolExecutor(max_workers=settings.CHART_SUGGESTION_MAX_WORKERS,
+                                 thread_name_prefix="chart-suggester")
+_chart_semaphore = asyncio.Semaphore(settings.CHART_SUGGESTION_MAX_WORKERS)
+
+
+def _split_graph_types(data_extracted_from_database, output):
+    """Return (table entries, chart types that need arguments from the LLM)."""
+    graph_types = set(output.suggested_visualization_type)
     valid_graph_types = graph_types & supported_types
     print(f"{valid_graph_types=}")
-    for g_type in valid_graph_types:
+    tables, chart_types = [], []
+    for g_type in sorted(valid_graph_types):
         print(f"Graph type Detected: {g_type}")
         if g_type == "table" or len(data_extracted_from_database) == 1:
-            args = Table(graph_type='table', args=None)
-            results.append(args)
-            continue
-        elif g_type in supported_types:
-            prompt = PromptBuilder(
-            data_sample=data_extracted_from_database,
-            sql_query=query,
-            graph_type=g_type,
-            chat_history=chat_history,
-            latest_user_query=latest_user_query,
-            column_names=column_names,
-            agent_response_summary = agent_response_summary,
-            ).build()
-            suggester = ChartSuggester(llm=llm)
-
-            args = suggester.suggest_chart(prompt=prompt, schema=schema.get(g_type))
-            
-            if args:
-                results.append({"graph_type": g_type , "args": args})
-    return results
+            tables.append(Table(graph_type='table', args=None))
+        else:
+            chart_types.append(g_type)
+    return tables, chart_types
+
+
+def _build_prompt(data_extracted_from_database, output, chat_history, latest_user_query, query, graph_type):
+    column_names = list(data_extracted_from_database[0].keys())
+    return PromptBuilder(
+        # The LLM only sees a sample; the rules in _infer_locally profile every row
+        data_sample=data_extracted_from_database[:settings.SAMPLE_SIZE_FOR_GRAPH],
+        sql_query=query,
+        graph_type=graph_type,
+        chat_history=chat_history,
+        latest_user_query=latest_user_query,
+        column_names=column_names,
+        agent_response_summary=output.answer,
+    ).build()
+
+
+def _infer_locally(data_extracted_from_database, chart_types):
+    """Chart arguments the rule engine is confident about; the rest still need the LLM."""
+    if not settings.CHART_INFERENCE_ENABLED:
+        return {}
+    profiles = profile_columns(data_extracted_from_database)
+    inferred = {}
+    for g_type in chart_types:
+        if args := infer_chart_args(g_type, data_extracted_from_database, profiles):
+            inferred[g_type] = args
+    print(f"Chart arguments inferred without LLM: {list(inferred)}")
+    return inferred
+
+
+def _batched_graph_type(chart_types):
+    return f"{', '.join(chart_types)} (fill one configuration for each of these graph types)"
+
+
+def _as_results(suggestions, chart_types):
+    return [{"graph_type": g_type, "args": suggestions[g_type]} for g_type in chart_types if suggestions.get(g_type)]
+
+
+def recommend_graph_object(data_extracted_from_database, output, llm, chat_history, latest_user_query, query):
+    print(list(data_extracted_from_database[0].keys()))
+    results, chart_types = _split_graph_types(data_extracted_from_database, output)
+    if not chart_types:
+        return results
+
+    suggester = ChartSuggester(llm=llm)
+    suggestions = _infer_locally(data_extracted_from_database, chart_types)
+    pending = [g for g in chart_types if g not in suggestions]
+    if settings.CHART_SUGGESTION_MODE == "batched" and len(pending) > 1:
+        prompt = _build_prompt(data_extracted_from_database, output, chat_history, latest_user_query,
+                               query, _batched_graph_type(pending))
+        suggestions.update(suggester.suggest_charts(prompt=prompt, schemas={g: schema[g] for g in pending}))
+        pending = [g for g in pending if g not in suggestions]
+        if pending:
+            print(f"Batched chart call missed {pending}, falling back to per-type calls")
+
+    # Per-type calls fan out on the bounded pool instead of running one after another
+    futures = {
+        g_type: _chart_pool.submit(
+            suggester.suggest_chart,
+            prompt=_build_prompt(data_extracted_from_database, output, chat_history, latest_user_query, query, g_type),
+            schema=schema.get(g_type),
+        )
+        for g_type in pending
+    }
+    for g_type, future in futures.items():
+        suggestions[g_type] = future.result()
+
+    return results + _as_results(suggestions, chart_types)
+
+
+async def arecommend_graph_object(data_extracted_from_database, output, llm, chat_history, latest_user_query, query):
+    """Async variant of recommend_graph_object; per-type fallback calls run concurrently under a semaphore."""
+    print(list(data_extracted_from_database[0].keys()))
+    results, chart_types = _split_graph_types(data_extracted_from_database, output)
+    if not chart_types:
+        return results
+
+    suggester = ChartSuggester(llm=llm)
+    suggestions = _infer_locally(data_extracted_from_database, chart_types)
+    pending = [g for g in chart_types if g not in suggestions]
+    if settings.CHART_SUGGESTION_MODE == "batched" and len(pending) > 1:
+        prompt = _build_prompt(data_extracted_from_database, output, chat_history, latest_user_query,
+                               query, _batched_graph_type(pending))
+        async with _chart_semaphore:
+            suggestions.update(await suggester.asuggest_charts(prompt=prompt, schemas={g: schema[g] for g in pending}))
+        pending = [g for g in pending if g not in suggestions]
+        if pending:
+            print(f"Batched chart call missed {pending}, falling back to per-type calls")
+
+    async def suggest(g_type):
+        prompt = _build_prompt(data_extracted_from_database, output, chat_history, latest_user_query, query, g_type)
+        async with _chart_semaphore:
+            return await suggester.asuggest_chart(prompt=prompt, schema=schema.get(g_type))
 
+    for g_type, args in zip(pending, await asyncio.gather(*(suggest(g) for g in pending))):
+        suggestions[g_type] = args
 
+    return results + _as_results(suggestions, chart_types)
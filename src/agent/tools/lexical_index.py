@@ -0,0 +1,71 @@
+"""
+Small in-process BM25 index.
+
+Used to pick the data dictionary columns relevant to a question. Documents are short
+(a column name and its description), so the whole index is a few dicts and a search is a
+loop over the query terms; no external dependency is needed.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "give", "has",
+    "have", "how", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "please", "show", "that",
+    "the", "their", "there", "these", "this", "to", "was", "we", "were", "what", "when", "where", "which",
+    "who", "whose", "why", "will", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; snake_case names are split and plurals reduced to a naive singular."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over pre-tokenized documents."""
+
+    def __init__(self, documents: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self._lengths = [len(doc) for doc in documents]
+        avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        # term -> [(document, term frequency)], so a search only touches documents containing a query term
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        for i, doc in enumerate(documents):
+            for term, tf in Counter(doc).items():
+                self._postings.setdefault(term, []).append((i, tf))
+        n = len(self._lengths)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self._norms = [k1 * (1 - b + b * length / (avg_length or 1)) for length in self._lengths]
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def scores(self, query_tokens: Iterable[str]) -> List[float]:
+        scores = [0.0] * len(self._lengths)
+        for term in set(query_tokens):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + self._norms[i])
+        return scores
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Indexes and scores of the k best documents with a positive score, best first."""
+        scores = self.scores(tokenize(query))
+        ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+        return [(i, scores[i]) for i in ranked[:k]]
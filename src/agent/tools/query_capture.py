@@ -0,0 +1,69 @@
+"""
+Per-request capture of the rows returned by the sql_db_query tool.
+
+The ReAct loop already executes the final SQL through the tool. Recording the typed,
+untruncated rows here lets the response builder reuse them instead of running the same
+query a second time. The capture travels in a ContextVar, which LangGraph copies into the
+worker threads and tasks that run the tools of the current request.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.db.sql_utils import normalize_sql, strip_trailing_limit
+
+
+@dataclass
+class CapturedQuery:
+    sql: str
+    rows: List[Dict[str, Any]]
+    base_sql: str = field(init=False)
+    limit: Optional[int] = field(init=False)
+
+    def __post_init__(self):
+        base_sql, self.limit = strip_trailing_limit(self.sql)
+        self.base_sql = normalize_sql(base_sql)
+
+
+class QueryCapture:
+    def __init__(self):
+        self.queries: List[CapturedQuery] = []
+
+    def record(self, sql: str, rows: List[Dict[str, Any]]):
+        self.queries.append(CapturedQuery(sql=sql, rows=rows))
+
+    def match(self, final_sql: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Rows for final_sql if they can be derived from a captured execution.
+
+        Exact matches are reused as is. When only the trailing LIMIT differs the captured rows
+        are sliced, provided they are known to contain every row the new limit asks for.
+        """
+        base_sql, limit = strip_trailing_limit(final_sql)
+        base_sql = normalize_sql(base_sql)
+        for captured in reversed(self.queries):
+            if captured.base_sql != base_sql:
+                continue
+            complete = captured.limit is None or len(captured.rows) < captured.limit
+            if complete or (limit is not None and limit <= captured.limit):
+                return captured.rows if limit is None else captured.rows[:limit]
+        return None
+
+
+_current_capture: ContextVar[Optional[QueryCapture]] = ContextVar("query_capture", default=None)
+
+
+@contextmanager
+def capture_queries():
+    """Collect every sql_db_query execution made inside the block."""
+    capture = QueryCapture()
+    token = _current_capture.set(capture)
+    try:
+        yield capture
+    finally:
+        _current_capture.reset(token)
+
+
+def current_capture() -> Optional[QueryCapture]:
+    return _current_capture.get()
@@ -0,0 +1,91 @@
+"""
+Compact preview of a query result for the agent's context.
+
+The sql_db_query tool used to hand the model every row it fetched. The preview keeps what the
+model needs to write its answer: the total row count, each column's type with its null count
+and min/max over all rows, and the first rows as arrays under a single header. Rows are dropped
+from the end until the preview fits TOOL_RESULT_MAX_TOKENS. Values are made JSON-safe, so the
+tool message is real JSON instead of a Python repr. The full typed rows stay in the query capture.
+"""
+import datetime
+import decimal
+import json
+from typing import Any, Dict, List, Optional
+
+from langchain_community.utilities.sql_database import truncate_word
+
+from src.agent.tools.chat_history import count_tokens
+from src.configs.settings import settings
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return "number"
+    if isinstance(value, datetime.datetime):
+        return "timestamp"
+    if isinstance(value, datetime.date):
+        return "date"
+    if isinstance(value, datetime.time):
+        return "time"
+    if isinstance(value, datetime.timedelta):
+        return "interval"
+    if isinstance(value, str):
+        return "text"
+    return type(value).__name__
+
+
+def json_safe(value: Any, max_string_length: int = 0) -> Any:
+    """A JSON-encodable stand-in for a driver value; long strings are cut to max_string_length."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        value = bytes(value).hex()
+    elif not isinstance(value, str):
+        value = str(value)
+    return truncate_word(value, length=max_string_length) if max_string_length else value
+
+
+def column_summary(name: str, values: List[Any], max_string_length: int) -> Dict[str, Any]:
+    """Type, null count and min/max of one column over every row."""
+    present = [v for v in values if v is not None]
+    kinds = {_kind(v) for v in present}
+    summary = {"name": name, "type": kinds.pop() if len(kinds) == 1 else ("mixed" if kinds else "unknown"),
+               "nulls": len(values) - len(present)}
+    if present and summary["type"] in ("number", "timestamp", "date", "time", "interval", "text"):
+        try:
+            low, high = min(present), max(present)
+        except TypeError:   # e.g. naive and aware timestamps in one column
+            return summary
+        summary["min"], summary["max"] = json_safe(low, max_string_length), json_safe(high, max_string_length)
+    return summary
+
+
+def preview_result(rows: List[Dict[str, Any]], max_rows: Optional[int] = None, max_tokens: Optional[int] = None,
+                   max_string_length: int = 300) -> Dict[str, Any]:
+    """
+    {"row_count", "columns": [{"name", "type", "nulls", "min", "max"}], "rows": [[...]]}, plus
+    "rows_omitted" when only the first rows are included.
+    """
+    max_rows = settings.TOOL_RESULT_PREVIEW_ROWS if max_rows is None else max_rows
+    max_tokens = settings.TOOL_RESULT_MAX_TOKENS if max_tokens is None else max_tokens
+    names = list(rows[0].keys()) if rows else []
+    preview = {
+        "row_count": len(rows),
+        "columns": [column_summary(name, [row.get(name) for row in rows], max_string_length) for name in names],
+    }
+    shown = min(len(rows), max_rows)
+    while True:
+        preview["rows"] = [[json_safe(row.get(name), max_string_length) for name in names] for row in rows[:shown]]
+        if shown < len(rows):
+            preview["rows_omitted"] = len(rows) - shown
+        if shown == 0 or count_tokens(json.dumps(preview, ensure_ascii=False)) <= max_tokens:
+            return preview
+        shown //= 2
@@ -5,10 +5,16 @@ from langchain_core.tools.base import BaseToolkit
 from pydantic import ConfigDict, Field
 from typing import Any, List, Optional
 from langchain_community.utilities.sql_database import SQLDatabase
-from langchain_community.tools.sql_database.tool import QuerySQLCheckerTool
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from src.agent.tools.database_schema_cache_tool import InfoSQLDatabaseTool
+from src.agent.tools.query_capture import current_capture
+from src.agent.tools.result_preview import preview_result
+from src.agent.tools.sql_validator import QuerySQLValidatorTool, read_only_errors
+from src.db.cost_guard import cost_guard
+from src.db.statement_timeout import AGENT_TIMEOUT_MS, timed_transaction
+from src.services.metrics import timed_query
 from typing import Any, Dict, Optional, Sequence, Type, Union
-import ast
 from pydantic import BaseModel
 
 class BaseSQLDatabaseTool(BaseModel):
@@ -25,7 +31,7 @@ class _QuerySQLDatabaseToolInput(BaseModel):
     query: str = Field(..., description="A detailed and correct SQL query.")
     
 class QuerySQLDatabaseTool(BaseSQLDatabaseTool, BaseTool):
-    """Tool for querying a SQL database and returning results as JSON with column names."""
+    """Tool for querying a SQL database and returning a compact JSON preview of the result."""
     
     name: str = "sql_db_query"
     description: str = """
@@ -40,22 +46,47 @@ class QuerySQLDatabaseTool(BaseSQLDatabaseTool, BaseTool):
         run_manager: Optional[CallbackManagerForToolRun] = None
     ):
         """Execute the SQL query and return the results as JSON."""
-        # Make timeout database-agnostic
-        try:
-            if self.db.dialect.lower() == 'postgresql':
-                _ = self.db.run_no_throw("SET LOCAL statement_timeout = 60000")  # 60 seconds
-            elif self.db.dialect.lower() == 'mysql':
-                _ = self.db.run_no_throw("SET SESSION max_execution_time = 60000")  # 60 seconds
-        except Exception:
-            # If timeout setting fails, continue without it
-            pass
-            
-        result = self.db.run_no_throw(query, include_columns=True)
+        # The agent is told to validate first, but nothing that writes may run even if it did not
+        if errors := read_only_errors(query):
+            return {"sql_query": query, "result": f"Error: {' '.join(errors)}"}
+
+        # Runaway plans are refused (the agent rewrites) or bounded before they hold a connection
+        executed, note = query, None
+        if self.db.dialect.lower() == 'postgresql':
+            decision = cost_guard.check(query, self._explain)
+            if decision.refused:
+                return {"sql_query": query, "result": f"Error: {decision.reason}"}
+            executed, note = decision.query, decision.reason or None
+
         try:
-            result = ast.literal_eval(result)
-        except Exception as e:
-            pass
+            rows = self._execute(executed)
+        except SQLAlchemyError as e:
+            return {"sql_query": query, "result": f"Error: {e}"}
+
+        # Keep the typed, untruncated rows for the response builder of this request
+        if (capture := current_capture()) is not None:
+            capture.record(executed, rows)
+
+        # The model gets a preview within its token budget; the response builder uses the captured rows
+        result = preview_result(rows, max_string_length=self.db._max_string_length) if rows else ""
+        if note:
+            return {"sql_query": query, "result": result, "note": note}
         return {"sql_query": query, "result":result}
+
+    def _execute(self, query: str):
+        """Like SQLDatabase._execute(query, fetch="all"), with the statement timeout in the same transaction."""
+        with timed_transaction(self.db._engine, AGENT_TIMEOUT_MS) as connection:
+            if self.db._schema is not None and self.db.dialect == "postgresql":
+                connection.exec_driver_sql("SET LOCAL search_path TO %s", (self.db._schema,))
+            with timed_query("agent", self.db._engine.driver) as timing:
+                cursor = connection.execute(text(query))
+                rows = [row._asdict() for row in cursor.fetchall()] if cursor.returns_rows else []
+                timing.rows = len(rows)
+            return rows
+
+    def _explain(self, explain_sql: str):
+        rows = self._execute(explain_sql)
+        return next(iter(rows[0].values())) if rows else None
     
     
 class _ListSQLDatabaseToolInput(BaseModel):
@@ -116,7 +147,8 @@ class SQLDatabaseToolkit(BaseToolkit):
         
         query_sql_database_tool_description = (
             "Input to this tool is a detailed and correct SQL query. Use this input to compose  output response sql_query "
-            "Output is a result from the database in JSON format including column names. If the query is not correct, "
+            "Output is a JSON preview of the result: the total row_count, the columns with their type, null count "
+            "and min/max over all rows, and the first rows as arrays in column order. If the query is not correct, "
             "an error message will be returned. If an error is returned, rewrite the query, check the "
             "query, and try again. If you encounter an issue with Unknown column "
             f"'xxxx' in 'field list', use {info_sql_database_tool.name} "
@@ -130,12 +162,14 @@ class SQLDatabaseToolkit(BaseToolkit):
         
         query_sql_checker_tool_description = (
             "Use this tool to validate if your query is correct before executing "
-            "it."
+            "it. It checks that the query is a single read-only SELECT and that every "
+            "table and column exists, and lists the exact problems otherwise. "
             "Always use this tool before executing a query with "
             f"{query_sql_database_tool.name}!"
         )
-        query_sql_checker_tool = QuerySQLCheckerTool(
-            db=self.db, llm=self.llm, description=query_sql_checker_tool_description
+        # Validates locally against the reflected schema: no LLM round trip
+        query_sql_checker_tool = QuerySQLValidatorTool(
+            db=self.db, description=query_sql_checker_tool_description
         )
         
         return [
@@ -0,0 +1,490 @@
+"""
+Local replacement for the LLM-backed sql_db_query_checker tool.
+
+The statement is tokenized with the scanner of src.db.sql_utils (literals, quoted identifiers
+and comments are never mistaken for code) and checked without a database round trip or an
+LLM call:
+
+- exactly one statement, starting with SELECT or WITH, and nothing that writes, locks or has
+  side effects (DML/DDL keywords, SELECT INTO, FOR UPDATE, pg_sleep, set_config, ...)
+- balanced parentheses and terminated literals
+- every table in FROM/JOIN exists in the reflected schema
+- every alias.column reference and every bare column name exists in the referenced tables
+
+Column checks only report what the reflected metadata proves wrong: names defined inside the
+query (aliases, CTEs, derived tables) are accepted, and bare names are not checked when a
+referenced table has not been reflected.
+"""
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+from langchain_community.utilities.sql_database import SQLDatabase
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.db.sql_utils import split_sql
+
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|::|<>|!=|>=|<=|\|\||\S")
+
+WRITE_KEYWORDS = {
+    "insert", "update", "delete", "merge", "upsert", "drop", "alter", "create", "truncate", "grant", "revoke",
+    "copy", "call", "vacuum", "reindex", "cluster", "refresh", "attach", "detach", "pragma", "into", "share",
+}
+SIDE_EFFECT_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until", "pg_terminate_backend", "pg_cancel_backend", "set_config",
+    "pg_reload_conf", "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "lo_import", "lo_export", "dblink",
+    "dblink_exec", "nextval", "setval", "pg_advisory_lock", "pg_advisory_xact_lock",
+}
+KEYWORDS = {
+    "select", "from", "where", "group", "by", "having", "order", "limit", "offset", "fetch", "next", "first",
+    "rows", "row", "only", "with", "recursive", "as", "on", "using", "join", "inner", "left", "right", "full",
+    "outer", "cross", "natural", "lateral", "union", "intersect", "except", "all", "distinct", "and", "or",
+    "not", "in", "is", "null", "true", "false", "unknown", "between", "like", "ilike", "similar", "escape",
+    "exists", "any", "some", "case", "when", "then", "else", "end", "cast", "asc", "desc", "nulls", "last",
+    "over", "partition", "range", "groups", "unbounded", "preceding", "following", "current", "exclude",
+    "ties", "others", "no", "filter", "within", "window", "values", "default", "collate", "at", "time", "zone",
+    "interval", "array", "grouping", "sets", "rollup", "cube", "for", "of", "to", "ordinality", "tablesample",
+    "symmetric", "asymmetric", "isnull", "notnull", "overlaps", "both", "leading", "trailing", "percent",
+    "current_date", "current_time", "current_timestamp", "localtime", "localtimestamp", "current_user",
+    "session_user", "current_schema", "current_catalog",
+    # types (casts) and date parts (EXTRACT, DATE_TRUNC units are literals, INTERVAL fields are not)
+    "int", "integer", "bigint", "smallint", "numeric", "decimal", "real", "double", "precision", "float",
+    "text", "varchar", "char", "character", "varying", "date", "timestamp", "timestamptz", "boolean", "bool",
+    "json", "jsonb", "uuid", "money", "bytea", "year", "years", "month", "months", "week", "weeks", "day",
+    "days", "hour", "hours", "minute", "minutes", "second", "seconds", "quarter", "epoch", "dow", "doy",
+    "isodow", "isoyear", "decade", "century", "millennium", "milliseconds", "microseconds", "timezone",
+    "without",
+}
+# Functions whose argument list uses FROM without naming a table
+_FROM_FUNCTIONS = {"extract", "substring", "trim", "overlay", "position", "substr"}
+_SYSTEM_SCHEMAS = {"information_schema", "pg_catalog"}
+
+
+@dataclass
+class _Token:
+    kind: str       # word, ident, string, number, punct
+    value: str
+
+    @property
+    def lower(self) -> str:
+        return self.value.lower() if self.kind == "word" else self.value
+
+    def is_name(self) -> bool:
+        return self.kind == "ident" or (self.kind == "word" and self.value.lower() not in KEYWORDS)
+
+
+@dataclass
+class ValidationResult:
+    errors: List[str] = field(default_factory=list)
+    tables: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def _tokenize(sql: str) -> Tuple[List[_Token], List[str]]:
+    tokens, errors = [], []
+    for kind, text in split_sql(sql):
+        if kind == "comment":
+            if text.startswith("/*") and not text.endswith("*/"):
+                errors.append("Unterminated /* comment.")
+            continue
+        if kind == "string":
+            if len(text) < 2 or (text[-1] != "'" and not text.endswith("$")):
+                errors.append(f"Unterminated string literal {text[:30]!r}.")
+            tokens.append(_Token("string", text))
+        elif kind == "identifier":
+            if len(text) < 2 or not text.endswith('"'):
+                errors.append(f"Unterminated quoted identifier {text[:30]!r}.")
+            tokens.append(_Token("ident", text[1:-1].replace('""', '"')))
+        else:
+            for match in _TOKEN.finditer(text):
+                value = match.group(0)
+                kind = "word" if value[0].isalpha() or value[0] == "_" else "number" if value[0].isdigit() else "punct"
+                tokens.append(_Token(kind, value))
+    return tokens, errors
+
+
+def _suggest(name: str, candidates) -> str:
+    close = difflib.get_close_matches(name.lower(), [c.lower() for c in candidates], n=3, cutoff=0.6)
+    return f" Did you mean: {', '.join(close)}?" if close else ""
+
+
+class _Schema:
+    """Table and column names of an SQLDatabase, from the reflected metadata."""
+
+    def __init__(self, db: SQLDatabase):
+        self.default_schema = db._schema
+        self.usable = {t.lower() for t in db.get_usable_table_names()}
+        self.columns: Dict[str, Set[str]] = {}
+        for table in db._metadata.sorted_tables:
+            if table.schema in (None, self.default_schema) and table.name.lower() in self.usable:
+                self.columns[table.name.lower()] = {c.name.lower() for c in table.columns}
+
+    def resolve(self, parts: List[str]) -> Tuple[Optional[str], bool]:
+        """(table key, known) for a possibly schema-qualified name; key is None for system catalogs."""
+        if len(parts) > 1 and parts[-2].lower() in _SYSTEM_SCHEMAS:
+            return None, True
+        if len(parts) > 1 and self.default_schema and parts[-2].lower() != self.default_schema.lower():
+            return parts[-1].lower(), False
+        name = parts[-1].lower()
+        if name.startswith("pg_") or name in _SYSTEM_SCHEMAS:
+            return None, True
+        return name, name in self.usable
+
+
+def _write_clause_positions(tokens: List[_Token]) -> Set[int]:
+    """
+    Indexes of the words that start a statement or a locking/INTO clause, where a write keyword
+    really writes. Elsewhere the same words are names: "SELECT store_id AS copy" or "t.call".
+    Statements start the query, follow a ';', open a CTE body ("AS (DELETE ...") and follow the
+    CTE list ("WITH x AS (...) UPDATE ...").
+    """
+    positions: Set[int] = set()
+    openers: List[str] = []
+    closed_cte = False
+    for i, token in enumerate(tokens):
+        previous = tokens[i - 1] if i else None
+        if token.value == "(":
+            openers.append(previous.lower if previous is not None else "")
+            continue
+        if token.value == ")":
+            closed_cte = bool(openers) and openers.pop() in ("as", "materialized") and not openers
+            continue
+        if token.kind != "word" or (previous is not None and previous.lower in ("as", ".", "::")):
+            closed_cte = False
+            continue
+        word = token.lower
+        starts_statement = (previous is None or previous.value == ";" or closed_cte
+                            or (previous.value == "(" and openers and openers[-1] in ("as", "materialized")))
+        # INTO is reserved, so outside an AS alias it always targets a table (SELECT ... INTO t)
+        locking = word in ("update", "share") and previous is not None and previous.lower in ("for", "key")
+        if starts_statement or word == "into" or locking:
+            positions.add(i)
+        closed_cte = False
+    return positions
+
+
+def _statement_errors(tokens: List[_Token]) -> List[str]:
+    """One read-only statement with balanced parentheses."""
+    errors = []
+    if any(t.value == ";" for t in tokens):
+        errors.append("Only one statement is allowed; remove the ';' separated statements.")
+    first = next((t.lower for t in tokens if t.value != "("), "")
+    if first not in ("select", "with"):
+        errors.append(f"Only SELECT queries are allowed, the statement starts with {first.upper()!r}.")
+    clauses = _write_clause_positions(tokens)
+    for i, token in enumerate(tokens):
+        if token.kind != "word":
+            continue
+        word = token.lower
+        followed_by_paren = i + 1 < len(tokens) and tokens[i + 1].value == "("
+        if word in SIDE_EFFECT_FUNCTIONS and followed_by_paren:
+            errors.append(f"{word}() is not allowed: the query must not have side effects.")
+        elif word in WRITE_KEYWORDS and i in clauses:
+            locking = word in ("update", "share") and tokens[i - 1].lower in ("for", "key")
+            clause = f"FOR {word.upper()}" if locking else word.upper()
+            errors.append(f"{clause} is not allowed: the query must be read-only.")
+
+    depth = 0
+    for token in tokens:
+        depth += token.value == "("
+        depth -= token.value == ")"
+        if depth < 0:
+            break
+    if depth:
+        errors.append("Unbalanced parentheses: " + ("a ')' has no matching '('." if depth < 0
+                                                   else f"{depth} '(' not closed."))
+    return errors
+
+
+def _statement_tokens(sql: str) -> Tuple[List[_Token], List[str]]:
+    tokens, errors = _tokenize(sql)
+    while tokens and tokens[-1].value == ";":
+        tokens.pop()
+    if not tokens:
+        return tokens, errors + ["The query is empty."]
+    return tokens, errors + _statement_errors(tokens)
+
+
+def read_only_errors(sql: str) -> List[str]:
+    """Why sql is not a single read-only SELECT; empty when it is. Needs no schema."""
+    return _statement_tokens(sql)[1]
+
+
+def validate_sql(sql: str, db: SQLDatabase) -> ValidationResult:
+    tokens, errors = _statement_tokens(sql)
+    result = ValidationResult(errors=errors)
+    if not result.errors:
+        _check_names(tokens, _Schema(db), result)
+    return result
+
+
+def _qualified(tokens: List[_Token], i: int) -> Tuple[List[str], int]:
+    """Dotted name starting at i; returns its parts and the index after it."""
+    parts = [tokens[i].value]
+    i += 1
+    while i + 1 < len(tokens) and tokens[i].value == "." and tokens[i + 1].kind in ("word", "ident"):
+        parts.append(tokens[i + 1].value)
+        i += 2
+    return parts, i
+
+
+def _matching(tokens: List[_Token], i: int) -> int:
+    """Index after the parenthesis that closes the one at i."""
+    level, i = 1, i + 1
+    while i < len(tokens) and level:
+        level += (tokens[i].value == "(") - (tokens[i].value == ")")
+        i += 1
+    return i
+
+
+_SELECT_LIST_END = {"from", "where", "group", "having", "order", "limit", "offset", "fetch", "window", "union",
+                    "intersect", "except", "into", "for"}
+
+
+def _output_columns(body: List[_Token]) -> Optional[List[str]]:
+    """
+    Column names of a subquery from its select list, or None when one of them cannot be told
+    without the database: a *, a cast or an unnamed expression.
+    """
+    if not body or body[0].lower != "select":
+        return None
+    items, item, i = [], [], 1
+    if i < len(body) and body[i].lower in ("distinct", "all"):
+        i += 1
+        if i + 1 < len(body) and body[i].lower == "on" and body[i + 1].value == "(":
+            i = _matching(body, i + 1)
+    while i < len(body) and body[i].lower not in _SELECT_LIST_END:
+        if body[i].value == "(":
+            end = _matching(body, i)
+            item.extend(body[i:end])
+            i = end
+            continue
+        if body[i].value == ",":
+            items.append(item)
+            item = []
+        else:
+            item.append(body[i])
+        i += 1
+    items.append(item)
+    names = []
+    for item in items:
+        if not item or any(t.value == "*" and (k == 0 or item[k - 1].value == ".") for k, t in enumerate(item)):
+            return None
+        last = item[-1]
+        if last.is_name() and (len(item) == 1 or item[-2].value != "::"):
+            names.append(last.value.lower())            # column, alias.column, expr AS name or expr name
+        elif item[0].kind == "word" and len(item) > 1 and item[1].value == "(" and _matching(item, 1) == len(item):
+            names.append(item[0].lower)                 # count(*) is named count
+        else:
+            return None
+    return names
+
+
+def _check_names(tokens: List[_Token], schema: _Schema, result: ValidationResult):
+    aliases: Dict[str, Optional[str]] = {}    # alias or table name -> table key (None: derived/CTE/function)
+    defined: Set[str] = set()                 # names the query defines: CTEs, aliases, CTE column lists
+    referenced: List[Optional[str]] = []
+    table_positions: Set[int] = set()
+    opaque_ctes: Set[str] = set()             # CTEs whose output columns could not be collected
+    opaque_source = False                     # a FROM item with columns the schema does not know
+    derived_columns: Set[str] = set()         # output columns of the CTEs and subqueries read
+
+    # CTE and window names: "name [(columns)] AS ("
+    for i, token in enumerate(tokens):
+        if not token.is_name() or (i and tokens[i - 1].value == "."):
+            continue
+        j = i + 1
+        columns = []
+        if j < len(tokens) and tokens[j].value == "(" and i and tokens[i - 1].lower in ("with", "recursive", ","):
+            j += 1
+            while j < len(tokens) and tokens[j].value != ")":
+                if tokens[j].is_name():
+                    columns.append(tokens[j].value.lower())
+                j += 1
+            j += 1
+        if j + 1 < len(tokens) and tokens[j].lower == "as" and tokens[j + 1].value == "(":
+            name = token.value.lower()
+            defined.add(name)
+            defined.update(columns)
+            aliases[name] = None
+            table_positions.add(i)
+            if not columns:
+                outputs = _output_columns(tokens[j + 2:_matching(tokens, j + 1) - 1])
+                if outputs is None:
+                    opaque_ctes.add(name)
+                else:
+                    defined.update(outputs)
+                    derived_columns.update(outputs)
+
+    # FROM / JOIN items
+    functions: List[Optional[str]] = []
+    for i, token in enumerate(tokens):
+        if token.value == "(":
+            functions.append(tokens[i - 1].lower if i and tokens[i - 1].kind == "word" else None)
+            continue
+        if token.value == ")":
+            if functions:
+                functions.pop()
+            continue
+        if token.lower not in ("from", "join") or (functions and functions[-1] in _FROM_FUNCTIONS):
+            continue
+        if token.lower == "from" and i and tokens[i - 1].lower == "distinct":
+            continue                                # IS [NOT] DISTINCT FROM expression
+        j = i + 1
+        while j < len(tokens):
+            if tokens[j].lower in ("lateral", "only"):
+                j += 1
+                continue
+            unknown_columns = False
+            if tokens[j].value == "(":
+                # Derived table: skip to the matching parenthesis, its alias is defined below
+                end = _matching(tokens, j)
+                outputs = _output_columns(tokens[j + 1:end - 1])
+                unknown_columns = outputs is None
+                defined.update(outputs or ())
+                derived_columns.update(outputs or ())
+                j, key = end, None
+            elif tokens[j].kind in ("word", "ident") and tokens[j].is_name():
+                parts, end = _qualified(tokens, j)
+                table_positions.update(range(j, end))
+                if end < len(tokens) and tokens[end].value == "(":
+                    key = None                      # set returning function such as generate_series
+                    end = _matching(tokens, end)
+                    unknown_columns = True
+                else:
+                    name = parts[-1].lower()
+                    if name in aliases and aliases[name] is None and len(parts) == 1:
+                        key = None                  # a CTE
+                        unknown_columns = name in opaque_ctes
+                    else:
+                        key, known = schema.resolve(parts)
+                        if not known:
+                            result.errors.append(f'Table "{".".join(parts)}" does not exist.'
+                                                 + _suggest(parts[-1], schema.usable))
+                            key = None
+                        elif key is not None:
+                            referenced.append(key)
+                            result.tables.append(key)
+                    aliases[name] = key
+                j = end
+            elif tokens[j].kind == "word" and not (j + 1 < len(tokens) and tokens[j + 1].value == "("):
+                # A keyword cannot start a table expression: an unquoted reserved word such as "order"
+                name = tokens[j].value
+                hint = (f' "{name.lower()}" is a reserved word and must be double-quoted.'
+                        if name.lower() in schema.usable else _suggest(name, schema.usable))
+                result.errors.append(f'Table "{name}" does not exist.' + hint)
+                break
+            else:
+                break
+            # Optional alias
+            if j < len(tokens) and tokens[j].lower == "as":
+                j += 1
+            if j < len(tokens) and tokens[j].is_name() and tokens[j].lower not in ("on", "using"):
+                alias = tokens[j].value.lower()
+                aliases[alias] = key
+                defined.add(alias)
+                table_positions.add(j)
+                j += 1
+                if j < len(tokens) and tokens[j].value == "(":   # alias column list
+                    unknown_columns = False
+                    while j < len(tokens) and tokens[j].value != ")":
+                        if tokens[j].is_name():
+                            defined.add(tokens[j].value.lower())
+                        j += 1
+            opaque_source = opaque_source or unknown_columns
+            if token.lower == "from" and j < len(tokens) and tokens[j].value == ",":
+                j += 1
+                continue
+            break
+
+    # Output and implicit aliases: "expr AS name" and "expr name"
+    for i, token in enumerate(tokens):
+        if i == 0 or i in table_positions or not token.is_name():
+            continue
+        if i + 1 < len(tokens) and tokens[i + 1].value in (".", "("):
+            continue
+        previous = tokens[i - 1]
+        after_cast = i >= 2 and tokens[i - 2].value == "::"          # x::date total
+        ends_operand = (previous.kind in ("ident", "number", "string") or previous.value == ")"
+                        or previous.lower == "end" or after_cast
+                        or (previous.kind == "word" and previous.lower not in KEYWORDS))
+        if previous.lower == "as" or ends_operand:
+            defined.add(token.value.lower())
+
+    all_columns: Set[str] = set()
+    for key in referenced:
+        all_columns |= schema.columns.get(key, set())
+    every_table_reflected = all(key in schema.columns for key in referenced)
+
+    for i, token in enumerate(tokens):
+        if i in table_positions or token.kind not in ("word", "ident"):
+            continue
+        previous = tokens[i - 1] if i else None
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if previous is not None and previous.value in (".", "::"):
+            continue
+        if following is not None and following.value == "(":
+            continue                                # function call
+        if following is not None and following.value == ".":
+            # qualifier.column
+            qualifier = token.value.lower()
+            if i + 2 >= len(tokens) or tokens[i + 2].kind not in ("word", "ident"):
+                continue
+            column = tokens[i + 2].value
+            if tokens[i + 2].value == "*" or (i + 3 < len(tokens) and tokens[i + 3].value in (".", "(")):
+                continue
+            if qualifier not in aliases:
+                result.errors.append(f'Missing FROM-clause entry for "{token.value}" in "{token.value}.{column}".'
+                                     + _suggest(token.value, aliases))
+                continue
+            key = aliases[qualifier]
+            if key is not None and key in schema.columns and column.lower() not in schema.columns[key]:
+                result.errors.append(f'Column "{column}" does not exist in table {key}.'
+                                     + _suggest(column, schema.columns[key]))
+            continue
+        # Bare names may come from a function or subquery whose columns are unknown here
+        if not token.is_name() or not every_table_reflected or not referenced or opaque_source:
+            continue
+        name = token.value.lower()
+        if name in defined or name in aliases or name in all_columns:
+            continue
+        tables = ", ".join(sorted(set(referenced)))
+        if derived_columns:
+            tables += " or the columns returned by the query's subqueries"
+        result.errors.append(f'Column "{token.value}" does not exist in {tables}.'
+                             + _suggest(name, all_columns | derived_columns))
+
+    # Report each problem once, in order
+    result.errors = list(dict.fromkeys(result.errors))
+    result.tables = list(dict.fromkeys(result.tables))
+
+
+class _QuerySQLValidatorToolInput(BaseModel):
+    query: str = Field(..., description="The SQL query to validate.")
+
+
+class QuerySQLValidatorTool(BaseTool):
+    """Validates a query against the reflected schema in process; no LLM call, no database round trip."""
+
+    name: str = "sql_db_query_checker"
+    description: str = "Use this tool to validate if your query is correct before executing it."
+    args_schema: Type[BaseModel] = _QuerySQLValidatorToolInput
+    db: SQLDatabase = Field(exclude=True)
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        result = validate_sql(query, self.db)
+        if result.ok:
+            tables = f" over {', '.join(result.tables)}" if result.tables else ""
+            return f"The query is a valid read-only SELECT{tables}. Execute it unchanged with sql_db_query:\n{query}"
+        return "Error: the query is not valid.\n" + "\n".join(f"- {e}" for e in result.errors) + \
+            "\nFix these problems (use sql_db_schema for the exact column names) and validate again."
+
+    async def _arun(self, query: str, run_manager=None) -> str:
+        return self._run(query)
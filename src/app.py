@@ -1,20 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from src.configs.settings import settings
 from src.schemas.chat_request import ChatRequest
-from src.services.chat_service import ChatService
+from src.services.chat_service import ChatService, ComponentFactory
 import os
-import shutil
 import asyncio
 import time
 from src.schemas.chat_response import ResponseSchemaMod
-
-def clear_local_db_folder(path="db-agent"):
-    if os.path.exists(path):
-        shutil.rmtree(path)  # Deletes the folder and all its contents
-        print(f"Cleared all files in {path}")
-    else:
-        print(f"Folder {path} doesn't exist.")
+from src.agent.tools.answer_cache import answer_cache
+from src.agent.tools.fast_classifier import classifier_stats
+from src.db.cost_guard import cost_guard
+from src.db.db import async_database, query_result_cache
+from src.services.response_format import render_response
+from src.services import metrics, warmup
+from src.services.cancellation import RequestCancelled, run_cancellable
+from src.services.schema_watcher import schema_watcher
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
 async def create_directories_async(path="db-agent"):
     """
@@ -38,43 +40,133 @@ async def create_directories_async(path="db-agent"):
 async def lifespan(app: FastAPI):
     """
     Asynchronous lifespan manager for the FastAPI application.
-    Creates directories on startup and clears them on shutdown.
+    Creates directories, opens the shared asyncpg pool and starts the background tasks
+    (checkpoint compaction, warm-up, schema change detection) on startup, closes the pool and
+    the checkpoint store on shutdown.
+    Checkpoints are kept so conversations survive restarts.
     """
     # Startup: Create directories asynchronously
     await create_directories_async("db-agent")
+    try:
+        # Every async query path shares this pool; a failure here is retried on first use
+        await async_database.open()
+    except Exception as e:
+        print(f"Could not open the asyncpg pool at startup: {e}")
+    compactor = await asyncio.to_thread(ComponentFactory.get_checkpoint_compactor)
+    compaction_task = asyncio.create_task(compactor.run_periodically())
+    # Serving starts immediately; /ready reports when the warm-up has finished
+    warmup_task = asyncio.create_task(warmup.run_warmup())
+    background = [compaction_task, warmup_task]
+    if settings.SCHEMA_WATCH_ENABLED:
+        # Cached answers carry SQL written against the old columns, cached plans their old shape
+        schema_watcher.add_listener(answer_cache.invalidate_tables)
+        schema_watcher.add_listener(cost_guard.invalidate_tables)
+        # The warm-up makes the first comparison against the snapshot; without it the loop does
+        background.append(asyncio.create_task(schema_watcher.run_periodically(check_first=not settings.WARMUP_ENABLED)))
     
     yield  # Application runs after this point
     
-    # Shutdown: Clear the local db folder asynchronously
-    print("Shutting down application and clearing db-agent folder...")
-    clear_local_db_folder()
+    print("Shutting down application...")
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await async_database.close()
+    await asyncio.to_thread(ComponentFactory.close)
     print("Cleanup complete.")
 
 app = FastAPI(lifespan=lifespan)
 
 
 @app.post("/test_chat")
-async def get_chat(payload: ChatRequest):
+async def get_chat(payload: ChatRequest, request: Request):
     print(f"{payload.session_id=}")
     print(f"{payload.user_query=}\n")
     start_time = time.time()
+    outcome = "error"
     try:
-        service = ChatService(payload=payload)
-        response = service.converse()
+        service = await ChatService.create(payload=payload)
+        # Running queries are cancelled on the server when the client leaves or the deadline passes
+        response = await run_cancellable(request, service.aconverse(), settings.REQUEST_TIMEOUT_SECONDS)
+        outcome = "ok"
         
         if isinstance(response, ResponseSchemaMod):
             print(f"{payload.session_id=}, {payload.user_query=}, {response.model_dump(exclude={'data'})}")
+            if payload.response_format != "records":
+                return render_response(response, payload.response_format)
         else:
             print(f"{payload.session_id=}, {payload.user_query=}, csv response")
         return response
+    except RequestCancelled as e:
+        outcome = "timeout" if e.timed_out else "disconnected"
+        print(f"{payload.session_id=}, conversation cancelled: {e.reason}")
+        if e.timed_out:
+            raise HTTPException(status_code=504, detail="The request took too long. Try a narrower question.")
+        return Response(status_code=499)    # nobody is listening any more
     except Exception as e:
         print(str(e))
         raise HTTPException(status_code=500, detail="Internal Server Error.")
     finally:
         end_time = time.time()
+        metrics.request_duration.observe(end_time - start_time, outcome=outcome)
         print(f"Conversation duration: {end_time - start_time:.2f} seconds")
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: pool checkout waits and sizes, query latency and rows, cache hit ratios."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+async def get_ready():
+    """Warm-up progress; 503 until the schema, prompt and agent are ready."""
+    status = warmup.progress.snapshot()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/classifier/stats")
+async def get_classifier_stats():
+    """Hit rate and latency of the local classifier fast path versus the LLM fallback."""
+    return classifier_stats.snapshot()
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit, miss and eviction counters of the query result cache."""
+    return query_result_cache.stats()
+
+
+@app.get("/cost_guard/stats")
+async def get_cost_guard_stats():
+    """Plan cache hit ratio and how often generated SQL was run, bounded, exported or refused."""
+    return cost_guard.stats()
+
+
+@app.get("/checkpoints/stats")
+async def get_checkpoint_stats():
+    """Result of the last checkpoint compaction: deleted rows, reclaimed bytes, largest threads."""
+    return ComponentFactory.get_checkpoint_compactor().stats()
+
+
+@app.get("/answers/stats")
+async def get_answer_cache_stats():
+    """Hit rate of the question-to-answer cache that bypasses the React Agent."""
+    return answer_cache.stats()
+
+
+@app.get("/examples/stats")
+async def get_example_stats():
+    """Few-shot examples available to the database agent, by source."""
+    store = ComponentFactory.get_example_store()
+    return store.stats() if store is not None else {"examples": 0, "enabled": False}
+
+
+@app.get("/schema/stats")
+async def get_schema_stats():
+    """Catalog fingerprint checks and the last detected schema change."""
+    return schema_watcher.stats()
+
+
 origins = [
     "http://localhost",
     "http://localhost:8080",
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
-from typing import List
+from typing import List, Literal
 
 class Settings(BaseSettings):
     POSTGRES_USER: str  = ''
@@ -16,6 +16,105 @@ class Settings(BaseSettings):
     MAX_DISPLAY_ROWS: int = 100   # Maximum rows to display in UI response
     SAMPLE_SIZE_FOR_GRAPH: int = 15
 
+    # Local fast-path query classifier: messages below this confidence go to the LLM
+    CLASSIFIER_FAST_PATH_ENABLED: bool = True
+    CLASSIFIER_CONFIDENCE_THRESHOLD: float = 0.8
+
+    # Chart suggestion: "batched" asks for all chart types in one LLM call,
+    # "concurrent" fans one call per chart type out on a bounded pool
+    CHART_SUGGESTION_MODE: Literal["batched", "concurrent"] = "batched"
+    CHART_SUGGESTION_MAX_WORKERS: int = 4
+    # Fill chart arguments from column profiling and only call the LLM when the rules are not confident
+    CHART_INFERENCE_ENABLED: bool = True
+
+    # Query result cache keyed by normalized SQL (bytes are an estimate of the cached Python rows)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: float = 300
+
+    # How the total behind a truncated answer is obtained: COUNT(*), planner estimate or not at all
+    ROW_COUNT_STRATEGY: Literal["exact", "estimate", "none"] = "exact"
+
+    # EXPLAIN-based guard before generated SQL runs: over the limits a query is bounded to LIMIT_ROWS,
+    # streamed as CSV when every row was asked for (up to EXPORT_MAX_COST) or refused
+    COST_GUARD_ENABLED: bool = True
+    COST_GUARD_MAX_COST: float = 1_000_000
+    COST_GUARD_MAX_ROWS: int = 1_000_000
+    COST_GUARD_LIMIT_ROWS: int = 1000
+    COST_GUARD_EXPORT_MAX_COST: float = 50_000_000
+    COST_GUARD_PLAN_TTL_SECONDS: float = 600
+    COST_GUARD_PLAN_CACHE_ENTRIES: int = 2000
+
+    # sql_db_query output sent to the model: first rows and per-column stats within a token budget
+    TOOL_RESULT_PREVIEW_ROWS: int = 20
+    TOOL_RESULT_MAX_TOKENS: int = 1500
+
+    # Shared asyncpg pool opened by the application lifespan; STATEMENT_CACHE_SIZE 0 turns prepared
+    # statements off (required behind PgBouncer in transaction mode)
+    ASYNC_POOL_MIN_SIZE: int = 5
+    ASYNC_POOL_MAX_SIZE: int = 20
+    ASYNC_POOL_MAX_INACTIVE_SECONDS: float = 300
+    ASYNC_POOL_STATEMENT_CACHE_SIZE: int = 256
+
+    # Statement timeouts (SET LOCAL in the query's transaction) per kind of query, and the deadline of a
+    # /test_chat request after which its running queries are cancelled
+    STATEMENT_TIMEOUT_AGENT_MS: int = 30_000
+    STATEMENT_TIMEOUT_FINAL_MS: int = 60_000
+    STATEMENT_TIMEOUT_EXPORT_MS: int = 15 * 60_000
+    REQUEST_TIMEOUT_SECONDS: float = 300
+
+    # CSV exports stream COPY output; at most QUEUE_CHUNKS * CHUNK_BYTES are buffered per export
+    CSV_EXPORT_CHUNK_BYTES: int = 64 * 1024
+    CSV_EXPORT_QUEUE_CHUNKS: int = 8
+
+    # LangGraph checkpoints; kept across restarts
+    CHECKPOINT_DB_PATH: str = "checkpoints/agent_checkpoints.sqlite"
+    CHECKPOINT_BUSY_TIMEOUT_MS: int = 5000
+    # Compaction: newest checkpoints kept per thread, idle thread expiry (0 disables) and pages vacuumed per pass
+    CHECKPOINT_KEEP_LATEST: int = 10
+    CHECKPOINT_THREAD_TTL_SECONDS: int = 7 * 24 * 3600
+    CHECKPOINT_COMPACT_INTERVAL_SECONDS: int = 600
+    CHECKPOINT_VACUUM_PAGES: int = 4096
+
+    # Chat history sent to the classifier and chart prompts
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2000
+    CHAT_HISTORY_VERBATIM_TURNS: int = 2
+    CHAT_HISTORY_ENCODING: str = "cl100k_base"
+    CHAT_HISTORY_CACHE_THREADS: int = 1000
+
+    # Schema tool cache: entries older than REFRESH are served while refreshed in the background
+    SCHEMA_CACHE_REFRESH_SECONDS: int = 900
+    SCHEMA_CACHE_MAX_STALE_SECONDS: int = 24 * 3600
+
+    # Startup warm-up and the reflected schema snapshot it restores from
+    WARMUP_ENABLED: bool = True
+    WARMUP_POOL_CONNECTIONS: int = 5
+    SCHEMA_SNAPSHOT_ENABLED: bool = True
+    SCHEMA_SNAPSHOT_PATH: str = "db-agent/schema_snapshot.pkl"
+
+    # Catalog fingerprint polling that invalidates schema-derived caches on migrations
+    SCHEMA_WATCH_ENABLED: bool = True
+    SCHEMA_WATCH_INTERVAL_SECONDS: int = 60
+
+    # Prompts carry only the data dictionary columns retrieved for the question (BM25 over names and descriptions)
+    DATA_DICTIONARY_RETRIEVAL_ENABLED: bool = True
+    DATA_DICTIONARY_TOP_K: int = 12
+
+    # Few-shot examples retrieved per question from the evaluation set and answered questions
+    EXAMPLES_ENABLED: bool = True
+    EXAMPLES_TOP_K: int = 3
+    EXAMPLES_MIN_SCORE: float = 1.0
+    EXAMPLES_MIN_QUESTION_TOKENS: int = 4
+    EXAMPLES_EVAL_PATH: str = "evaluation/eval_sql.xlsx"
+    EXAMPLES_STORE_PATH: str = "db-agent/examples.jsonl"
+
+    # Answer cache: a repeated question reuses the agent's structured response and only re-runs its SQL.
+    # SIMILARITY 1.0 accepts normalized exact matches only
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY: float = 0.9
+    ANSWER_CACHE_TTL_SECONDS: float = 24 * 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 2000
+
     # Optional Bedrock fields (conditionally required)
     BEDROCK_ACCESS_KEY_ID: str | None = None
     BEDROCK_SECRET_ACCESS_KEY: str | None = None
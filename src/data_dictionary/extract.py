@@ -1,4 +1,9 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
 def explanations(path=None):
+    """Contents of data_dictionary.txt, read once per process."""
     if not path:
         path = 'src/data_dictionary/data_dictionary.txt'
     with open(path, 'r') as file:
@@ -0,0 +1,127 @@
+"""
+Structured view of data_dictionary.txt.
+
+The file is parsed once into tables and columns (datatype, name, description) and a BM25
+index over the column names and descriptions. Prompts use render_for(question) to include
+only the columns relevant to the question, in the same tab-separated layout as the file.
+"""
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from src.agent.tools.lexical_index import BM25Index, tokenize
+from src.configs.settings import settings
+from src.data_dictionary.extract import explanations
+
+_HEADER = "datatype"
+
+
+@dataclass(frozen=True)
+class ColumnEntry:
+    table: str
+    datatype: str
+    name: str
+    description: str
+    line: str           # the row as written in the file
+
+
+@dataclass
+class TableEntry:
+    name: str
+    preamble: List[str] = field(default_factory=list)   # description lines and the column header
+    columns: List[ColumnEntry] = field(default_factory=list)
+
+
+def parse_data_dictionary(text: str) -> List[TableEntry]:
+    """Tables in file order. Rows are `datatype<TAB>column_name<TAB>...description`."""
+    tables: List[TableEntry] = []
+    for line in text.splitlines():
+        if line.lower().startswith("table_name:"):
+            tables.append(TableEntry(name=line.split(":", 1)[1].strip(), preamble=[line.rstrip()]))
+            continue
+        if not tables:
+            continue
+        table = tables[-1]
+        fields = [f.strip() for f in line.split("\t") if f.strip()]
+        if len(fields) >= 2 and fields[0].lower() != _HEADER:
+            table.columns.append(ColumnEntry(table=table.name, datatype=fields[0], name=fields[1],
+                                             description=" ".join(fields[2:]), line=line.rstrip()))
+        elif not table.columns:
+            table.preamble.append(line.rstrip())
+    return tables
+
+
+class DataDictionaryIndex:
+    """Parsed data dictionary with per-question column retrieval."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tables = parse_data_dictionary(text)
+        self.columns: List[ColumnEntry] = [column for table in self.tables for column in table.columns]
+        self._by_name: Dict[str, List[int]] = {}
+        for i, column in enumerate(self.columns):
+            self._by_name.setdefault(column.name.lower(), []).append(i)
+        # Column name terms are repeated so a name match outranks a passing mention in a description
+        self._bm25 = BM25Index([tokenize(c.name) * 2 + tokenize(c.description) + tokenize(c.table)
+                                for c in self.columns])
+
+    def search(self, question: str, k: Optional[int] = None) -> List[ColumnEntry]:
+        k = settings.DATA_DICTIONARY_TOP_K if k is None else k
+        return [self.columns[i] for i, _ in self._bm25.search(question, k)]
+
+    def _named(self, question: str, names: Iterable[str]) -> List[int]:
+        """Columns written out literally in the question or listed in names (e.g. result columns)."""
+        words = {w.lower() for w in names} | set(question.lower().replace(",", " ").split())
+        return [i for word in words for i in self._by_name.get(word.strip("`\"'()."), [])]
+
+    def render(self, columns: Optional[Iterable[ColumnEntry]] = None) -> str:
+        """The dictionary in file layout, restricted to columns (everything when None)."""
+        if columns is None:
+            return self.text
+        wanted = set(columns)
+        blocks = []
+        for table in self.tables:
+            rows = [c.line for c in table.columns if c in wanted]
+            if rows:
+                blocks.append("\n".join(table.preamble + rows))
+        return "\n\n".join(blocks)
+
+    def outline(self) -> str:
+        """Table and column names only, for prompts that need to know what exists but not what it means."""
+        return "\n".join(f"Table_name: {t.name}\nColumns: {', '.join(c.name for c in t.columns)}"
+                         for t in self.tables)
+
+    def render_for(self, question: str, names: Iterable[str] = (), k: Optional[int] = None,
+                   fallback: Optional[str] = None) -> str:
+        """
+        Columns relevant to the question: literal column names first, then the best BM25 matches.
+        Returns fallback (the full dictionary by default) when retrieval is disabled or nothing matches.
+        """
+        if not settings.DATA_DICTIONARY_RETRIEVAL_ENABLED or not self.columns:
+            return self.text
+        k = settings.DATA_DICTIONARY_TOP_K if k is None else k
+        named = self._named(question, names)
+        budget = max(k, len(named))
+        selected = dict.fromkeys(named)
+        for i, _ in self._bm25.search(question, budget):
+            if len(selected) >= budget:
+                break
+            selected.setdefault(i)
+        if not selected:
+            return self.text if fallback is None else fallback
+        return self.render(self.columns[i] for i in sorted(selected))
+
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _index_for_text(text: str) -> DataDictionaryIndex:
+    return DataDictionaryIndex(text)
+
+
+def dictionary_index(text: Optional[str] = None) -> DataDictionaryIndex:
+    """Index of the given dictionary text, or of data_dictionary.txt; built once per distinct text."""
+    with _lock:
+        return _index_for_text(explanations() if text is None else text)
@@ -0,0 +1,276 @@
+"""
+Pre-execution cost guard for generated SQL.
+
+Before a query runs, EXPLAIN (FORMAT JSON) gives the planner's total cost and row estimate.
+Within COST_GUARD_MAX_COST and COST_GUARD_MAX_ROWS the query runs unchanged; above them it is
+
+- routed to a streamed CSV export when the caller wants every row and the plan is within
+  COST_GUARD_EXPORT_MAX_COST (export),
+- bounded to COST_GUARD_LIMIT_ROWS rows when the bounded plan is within the limits (limit),
+- refused with the reason, so the agent rewrites it (refuse).
+
+Plans are cached by SQL fingerprint. They expire after COST_GUARD_PLAN_TTL_SECONDS and are
+dropped with the tables they read when the schema watcher detects a change. The guard only
+knows PostgreSQL plans; a query whose EXPLAIN fails runs unguarded and reports its own error.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from src.configs.settings import settings
+from src.services.metrics import cache_families, register_collector
+from src.db.sql_utils import sql_fingerprint, sql_identifiers, strip_trailing_limit, strip_trailing_noise, wrap_with_limit
+
+Explain = Callable[[str], Any]
+AsyncExplain = Callable[[str], Awaitable[Any]]
+
+
+class QueryTooExpensiveError(Exception):
+    """Raised when the planner estimates a query beyond the cost guard limits."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(reason)
+
+
+def explain_sql(query: str) -> str:
+    return f"EXPLAIN (FORMAT JSON) {strip_trailing_noise(query)}"
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    total_cost: float
+    rows: int
+    node: str
+    warnings: Tuple[str, ...] = ()
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def _warnings(root: dict) -> Tuple[str, ...]:
+    """The plan nodes that usually explain a runaway estimate."""
+    found = []
+    for node in _walk(root):
+        kind = node.get("Node Type", "")
+        rows = int(node.get("Plan Rows", 0))
+        if kind == "Nested Loop" and "Join Filter" not in node and not any(
+                "Index Cond" in child or "Recheck Cond" in child for child in node.get("Plans", ())):
+            found.append(f"a join without a join condition (cross join, ~{rows:,} rows)")
+        elif kind == "Seq Scan" and "Filter" not in node and rows >= settings.COST_GUARD_MAX_ROWS:
+            found.append(f"an unfiltered scan of {node.get('Relation Name', 'a table')} (~{rows:,} rows)")
+    return tuple(dict.fromkeys(found))
+
+
+def parse_plan(explain_output: Any) -> Optional[QueryPlan]:
+    """QueryPlan from EXPLAIN (FORMAT JSON) output (a JSON string or the decoded list)."""
+    try:
+        plan = json.loads(explain_output) if isinstance(explain_output, str) else explain_output
+        root = plan[0]["Plan"]
+        return QueryPlan(total_cost=float(root["Total Cost"]), rows=int(root["Plan Rows"]),
+                         node=root.get("Node Type", ""), warnings=_warnings(root))
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CostDecision:
+    action: str                 # run, limit, export or refuse
+    query: str                  # the query to execute: bounded for limit
+    plan: Optional[QueryPlan] = None
+    reason: str = ""
+
+    @property
+    def refused(self) -> bool:
+        return self.action == "refuse"
+
+
+@dataclass
+class _PlanEntry:
+    plan: Optional[QueryPlan]
+    expires_at: float
+    identifiers: FrozenSet[str] = field(default_factory=frozenset)
+
+
+class CostGuard:
+
+    def __init__(self, max_cost: Optional[float] = None, max_rows: Optional[int] = None,
+                 limit_rows: Optional[int] = None, export_max_cost: Optional[float] = None,
+                 ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.max_cost = settings.COST_GUARD_MAX_COST if max_cost is None else max_cost
+        self.max_rows = settings.COST_GUARD_MAX_ROWS if max_rows is None else max_rows
+        self.limit_rows = settings.COST_GUARD_LIMIT_ROWS if limit_rows is None else limit_rows
+        self.export_max_cost = settings.COST_GUARD_EXPORT_MAX_COST if export_max_cost is None else export_max_cost
+        self.ttl_seconds = settings.COST_GUARD_PLAN_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.COST_GUARD_PLAN_CACHE_ENTRIES if max_entries is None else max_entries
+        self.enabled = settings.COST_GUARD_ENABLED if enabled is None else enabled
+        self._plans: "OrderedDict[str, _PlanEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.plan_hits = self.plan_misses = self.explain_errors = 0
+        self.decisions: Dict[str, int] = {"run": 0, "limit": 0, "export": 0, "refuse": 0}
+
+    def _cached(self, key: str) -> Tuple[bool, Optional[QueryPlan]]:
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self.plan_misses += 1
+                return False, None
+            self._plans.move_to_end(key)
+            self.plan_hits += 1
+            return True, entry.plan
+
+    def _store(self, key: str, query: str, plan: Optional[QueryPlan]):
+        with self._lock:
+            self._plans[key] = _PlanEntry(plan=plan, expires_at=time.monotonic() + self.ttl_seconds,
+                                          identifiers=sql_identifiers(query))
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def _explained(self, query: str, output: Any = None, error: Optional[Exception] = None) -> Optional[QueryPlan]:
+        if error is not None:
+            # Not cached: the error is usually in the SQL and surfaces when the query itself runs
+            print(f"EXPLAIN failed, running the query unguarded: {error}")
+            with self._lock:
+                self.explain_errors += 1
+            return None
+        plan = parse_plan(output)
+        self._store(sql_fingerprint(query), query, plan)
+        return plan
+
+    def plan(self, query: str, explain: Explain) -> Optional[QueryPlan]:
+        """Planner estimate of query, from the cache or explain(EXPLAIN statement)."""
+        found, plan = self._cached(sql_fingerprint(query))
+        if found:
+            return plan
+        try:
+            output = explain(explain_sql(query))
+        except Exception as e:
+            return self._explained(query, error=e)
+        return self._explained(query, output)
+
+    async def aplan(self, query: str, explain: AsyncExplain) -> Optional[QueryPlan]:
+        found, plan = self._cached(sql_fingerprint(query))
+        if found:
+            return plan
+        try:
+            output = await explain(explain_sql(query))
+        except Exception as e:
+            return self._explained(query, error=e)
+        return self._explained(query, output)
+
+    def within_limits(self, plan: Optional[QueryPlan]) -> bool:
+        return plan is None or (plan.total_cost <= self.max_cost and plan.rows <= self.max_rows)
+
+    def _try_bounded(self, plan: Optional[QueryPlan], allow_export: bool) -> bool:
+        # Only a result larger than the bound can get cheaper by bounding it
+        return not self.within_limits(plan) and not allow_export and plan.rows > self.limit_rows
+
+    def _bounded(self, query: str) -> Optional[str]:
+        """The query bounded to limit_rows, or None when it already returns no more than that."""
+        base, limit = strip_trailing_limit(query)
+        if limit is not None and limit <= self.limit_rows:
+            return None
+        return wrap_with_limit(base, self.limit_rows)
+
+    def _reason(self, plan: QueryPlan) -> str:
+        exceeded = []
+        if plan.total_cost > self.max_cost:
+            exceeded.append(f"a cost of {plan.total_cost:,.0f} (limit {self.max_cost:,.0f})")
+        if plan.rows > self.max_rows:
+            exceeded.append(f"{plan.rows:,} rows (limit {self.max_rows:,})")
+        reason = f"The query was not executed: the planner estimates {' and '.join(exceeded)}."
+        if plan.warnings:
+            reason += " The plan contains " + " and ".join(plan.warnings) + "."
+        return reason + (" Rewrite it with join conditions and selective filters, or aggregate before"
+                         " returning rows.")
+
+    def _decide(self, query: str, plan: Optional[QueryPlan], allow_export: bool,
+                bounded_plan: Optional[QueryPlan] = None, bounded: Optional[str] = None) -> CostDecision:
+        if self.within_limits(plan):
+            decision = CostDecision("run", query, plan)
+        elif allow_export and plan.total_cost <= self.export_max_cost:
+            # Within the export budget: only a result too large to return inline is streamed
+            decision = CostDecision("export" if plan.rows > self.max_rows else "run", query, plan)
+        elif plan.rows > self.limit_rows and bounded is not None and bounded_plan is not None \
+                and self.within_limits(bounded_plan):
+            decision = CostDecision("limit", bounded, bounded_plan,
+                                    f"Only the first {self.limit_rows} rows were returned: the full result is "
+                                    f"estimated at {plan.rows:,} rows. Aggregate or filter to see the rest.")
+        else:
+            decision = CostDecision("refuse", query, plan, self._reason(plan))
+        with self._lock:
+            self.decisions[decision.action] += 1
+        if decision.action != "run":
+            print(f"Cost guard: {decision.action} (cost {plan.total_cost:,.0f}, rows {plan.rows:,})")
+        return decision
+
+    def check(self, query: str, explain: Explain, allow_export: bool = False) -> CostDecision:
+        """
+        Decide how query may run. allow_export is for callers that need every row and can
+        stream them as CSV; everyone else gets a bounded query or a refusal.
+        """
+        if not self.enabled:
+            return CostDecision("run", query)
+        plan = self.plan(query, explain)
+        bounded = bounded_plan = None
+        if self._try_bounded(plan, allow_export) and (bounded := self._bounded(query)) is not None:
+            bounded_plan = self.plan(bounded, explain)
+        return self._decide(query, plan, allow_export, bounded_plan, bounded)
+
+    async def acheck(self, query: str, explain: AsyncExplain, allow_export: bool = False) -> CostDecision:
+        if not self.enabled:
+            return CostDecision("run", query)
+        plan = await self.aplan(query, explain)
+        bounded = bounded_plan = None
+        if self._try_bounded(plan, allow_export) and (bounded := self._bounded(query)) is not None:
+            bounded_plan = await self.aplan(bounded, explain)
+        return self._decide(query, plan, allow_export, bounded_plan, bounded)
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Drop the plans of queries that mention one of tables; returns the number removed."""
+        names = {table.lower() for table in tables}
+        with self._lock:
+            stale = [key for key, entry in self._plans.items() if entry.identifiers & names]
+            for key in stale:
+                del self._plans[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.plan_hits + self.plan_misses
+            return {
+                "enabled": self.enabled,
+                "cached_plans": len(self._plans),
+                "plan_hits": self.plan_hits,
+                "plan_misses": self.plan_misses,
+                "plan_hit_ratio": self.plan_hits / lookups if lookups else 0.0,
+                "explain_errors": self.explain_errors,
+                "decisions": dict(self.decisions),
+                "max_cost": self.max_cost,
+                "max_rows": self.max_rows,
+            }
+
+
+    def metrics(self):
+        stats = self.stats()
+        return cache_families("plan", {"hits": stats["plan_hits"], "misses": stats["plan_misses"],
+                                       "entries": stats["cached_plans"]}) + [
+            ("cost_guard_decisions_total", "counter", "Generated queries run, bounded, exported or refused.",
+             [({"action": action}, count) for action, count in stats["decisions"].items()]),
+        ]
+
+
+cost_guard = CostGuard()
+register_collector(cost_guard.metrics)
@@ -1,10 +1,33 @@
+import asyncio
+import queue
+import sys
+import threading
+import time
 import asyncpg
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass
+import weakref
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.pool import QueuePool
 from src.configs.settings import settings
+from src.db.cost_guard import CostDecision, QueryTooExpensiveError, cost_guard
+from src.services.metrics import cache_families, pool_checkout_timeouts, pool_checkout_wait, register_collector, timed_query
+from src.db.statement_timeout import (
+    EXPORT_TIMEOUT_MS,
+    FINAL_TIMEOUT_MS,
+    aset_local_timeout,
+    client_timeout,
+    current_scope,
+    timed_transaction,
+    timeout_statement,
+)
+from src.db.sql_utils import normalize_sql, sql_fingerprint, sql_identifiers, wrap_with_limit, count_query, strip_trailing_noise
 import datetime
 from decimal import Decimal
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Generator, AsyncGenerator, FrozenSet
 from sqlalchemy.engine import Result
 
 
@@ -37,6 +60,44 @@ class SingletonMeta(type):
         return cls._instances[cls]
 
 
+_queue_pools: "weakref.WeakSet[InstrumentedQueuePool]" = weakref.WeakSet()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait (including connecting) and how many time out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _queue_pools.add(self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.inc(pool="sqlalchemy")
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start, pool="sqlalchemy")
+
+
+def _queue_pool_metrics():
+    pools = list(_queue_pools)
+    label = {"pool": "sqlalchemy"}
+    return [
+        ("db_pool_connections", "gauge", "Connections currently open in the pool.",
+         [(label, sum(p.checkedin() + p.checkedout() for p in pools))]),
+        ("db_pool_in_use", "gauge", "Connections currently checked out.", [(label, sum(p.checkedout() for p in pools))]),
+        ("db_pool_overflow", "gauge", "Connections open beyond pool_size (SQLAlchemy max_overflow).",
+         [(label, sum(max(p.overflow(), 0) for p in pools))]),
+        ("db_pool_max_size", "gauge", "Most connections the pool may open.",
+         [(label, sum(p.size() + p._max_overflow for p in pools))]),
+    ]
+
+
+register_collector(_queue_pool_metrics)
+
+
 class Database(metaclass=SingletonMeta):
     def __init__(self):
         self.user = settings.POSTGRES_USER
@@ -54,7 +115,7 @@ class Database(metaclass=SingletonMeta):
             try:
                 self._engine = create_engine(
                     self.get_uri(),
-                    poolclass=QueuePool,
+                    poolclass=InstrumentedQueuePool,   # QueuePool with checkout metrics
                     pool_size=5,  # Production-ready pool size
                     max_overflow=30,  # Higher overflow for peak loads
                     pool_pre_ping=True,  # Verify connections before use
@@ -76,31 +137,415 @@ class Database(metaclass=SingletonMeta):
                 pass
 
 
-def fetch_data_from_db_fast(query: str) -> List[Dict[str, Any]]:
+@dataclass
+class _ResultCacheEntry:
+    rows: List[Dict[str, Any]]
+    size: int
+    expires_at: float
+    identifiers: FrozenSet[str] = frozenset()
+
+
+class QueryResultCache:
     """
-    Executes SQL query and returns results as list of dictionaries.
-    Optimized version without pandas overhead.
-    
-    Parameters:
-        query (str): The raw SQL query to execute.
-    
-    Returns:
-        List[Dict[str, Any]]: Query results where each row is a dict keyed by column names.
+    Result cache keyed by the normalized SQL fingerprint.
+
+    - bounded by the estimated total size of the cached rows, least recently used entries are evicted first
+    - every entry expires after ttl_seconds
+    - single-flight: concurrent misses for the same fingerprint wait for one query instead of each running it
     """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, _ResultCacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.coalesced = 0
+
+    @staticmethod
+    def _estimate_size(rows: List[Dict[str, Any]]) -> int:
+        size = sys.getsizeof(rows)
+        for row in rows:
+            size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        return size
+
+    def _lookup(self, key: str):
+        """Return cached rows or None; must be called with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.rows
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _store(self, key: str, rows: List[Dict[str, Any]], query: str):
+        size = self._estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        identifiers = sql_identifiers(query)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _ResultCacheEntry(rows=rows, size=size,
+                                                   expires_at=time.monotonic() + self.ttl_seconds,
+                                                   identifiers=identifiers)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, query: str, loader: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if not self.enabled:
+            return loader()
+        key = sql_fingerprint(query)
+        while True:
+            with self._lock:
+                rows = self._lookup(key)
+                if rows is not None:
+                    return rows
+                pending = self._inflight.get(key)
+                owner = pending is None
+                if owner:
+                    self.misses += 1
+                    pending = self._inflight[key] = Future()
+                else:
+                    self.coalesced += 1
+            if owner:
+                break
+            try:
+                return pending.result()
+            except CancelledError:
+                # The owner's request was cancelled, not the query: run it again or wait for a new owner
+                continue
+
+        try:
+            rows = loader()
+        except BaseException as e:
+            # A query interrupted by the owner's cancel scope is cancelled for the waiters, who retry
+            scope = current_scope()
+            if not (scope is not None and scope.cancelled):
+                pending.set_exception(e)
+            raise
+        else:
+            self._store(key, rows, query)
+            pending.set_result(rows)
+            return rows
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is pending:
+                    del self._inflight[key]
+            if not pending.done():
+                pending.cancel()
+
+    async def aget_or_load(self, query: str, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        if not self.enabled:
+            return await loader()
+        key = sql_fingerprint(query)
+        while True:
+            with self._lock:
+                rows = self._lookup(key)
+                if rows is not None:
+                    return rows
+                pending = self._ainflight.get(key)
+                owner = pending is None
+                if owner:
+                    self.misses += 1
+                    pending = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                else:
+                    self.coalesced += 1
+            if owner:
+                break
+            try:
+                # shield: one cancelled waiter must not cancel the shared query
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The owner was cancelled, not this waiter: run the query again or wait for a new owner
+
+        try:
+            rows = await loader()
+        except Exception as e:
+            pending.set_exception(e)
+            # Retrieve it so an unawaited failure is not reported as "never retrieved"
+            pending.exception()
+            raise
+        else:
+            self._store(key, rows, query)
+            pending.set_result(rows)
+            return rows
+        finally:
+            with self._lock:
+                if self._ainflight.get(key) is pending:
+                    del self._ainflight[key]
+            if not pending.done():
+                # Cancelled owner (client disconnect, deadline): waiters retry instead of failing with it
+                pending.cancel()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def invalidate_tables(self, tables) -> int:
+        """Drop every entry whose SQL mentions one of tables; returns the number removed."""
+        names = {table.lower() for table in tables}
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.identifiers & names]
+            for key in stale:
+                self._remove(key)
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+query_result_cache = QueryResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    enabled=settings.RESULT_CACHE_ENABLED,
+)
+register_collector(lambda: cache_families("result", query_result_cache.stats()))
+
+
+def _execute_query(query: str) -> List[Dict[str, Any]]:
     engine = Database().get_engine()
     if not engine:
         raise ConnectionError("Failed to initialize database engine.")
     
     try:
-        with engine.connect() as conn:
+        with timed_transaction(engine, FINAL_TIMEOUT_MS) as conn, timed_query("final", engine.driver) as timing:
             result = conn.execute(text(query))
             columns = result.keys()
             rows = result.fetchall()
+            timing.rows = len(rows)
             return [dict(zip(columns, row)) for row in rows]
     except Exception as e:
         raise
 
 
+def explain_query(explain_sql: str) -> Any:
+    """Output of an EXPLAIN (FORMAT JSON) statement, for the cost guard."""
+    engine = Database().get_engine()
+    if not engine:
+        raise ConnectionError("Failed to initialize database engine.")
+    with timed_transaction(engine, FINAL_TIMEOUT_MS) as conn:
+        return conn.execute(text(explain_sql)).scalar()
+
+
+def check_query(query: str, allow_export: bool = False) -> CostDecision:
+    """Cost guard decision for query, planned on the application engine."""
+    return cost_guard.check(query, explain_query, allow_export=allow_export)
+
+
+def _guard(query: str) -> str:
+    """The query to run in place of query; raises QueryTooExpensiveError when it must not run."""
+    decision = check_query(query)
+    if decision.refused:
+        raise QueryTooExpensiveError(decision.reason)
+    return decision.query
+
+
+def fetch_data_from_db_fast(query: str) -> List[Dict[str, Any]]:
+    """
+    Executes SQL query and returns results as list of dictionaries.
+    Optimized version without pandas overhead. Identical queries are served from query_result_cache;
+    a miss is checked by the cost guard first.
+    
+    Parameters:
+        query (str): The raw SQL query to execute.
+    
+    Returns:
+        List[Dict[str, Any]]: Query results where each row is a dict keyed by column names.
+    """
+    return query_result_cache.get_or_load(query, lambda: _execute_query(_guard(query)))
+
+
+
+
+@dataclass
+class BoundedResult:
+    """At most max_rows rows of a query plus the total row count (exact, estimated or unknown)."""
+    rows: List[Dict[str, Any]]
+    total_rows: Optional[int]
+    total_is_estimate: bool = False
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_rows is None or self.total_rows > len(self.rows)
+
+
+def _fetch_head(query: str, max_rows: int) -> List[Dict[str, Any]]:
+    """First max_rows rows through a server-side cursor, never the whole result."""
+    engine = Database().get_engine()
+    if not engine:
+        raise ConnectionError("Failed to initialize database engine.")
+    with timed_transaction(engine, FINAL_TIMEOUT_MS) as conn, timed_query("final", engine.driver) as timing:
+        result = conn.execution_options(stream_results=True, max_row_buffer=max_rows).execute(text(query))
+        columns = result.keys()
+        rows = result.fetchmany(max_rows)
+        result.close()
+        timing.rows = len(rows)
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def _count_strategy(count_plan) -> str:
+    # A COUNT(*) over the limits would scan as much as the query the guard just bounded
+    strategy = settings.ROW_COUNT_STRATEGY
+    if strategy == "exact" and cost_guard.enabled and not cost_guard.within_limits(count_plan):
+        return "estimate"
+    return strategy
+
+
+def _count_rows(query: str):
+    """(total rows, is_estimate) following ROW_COUNT_STRATEGY."""
+    counted = count_query(query)
+    # Only the guard needs the plan of an exact count; without it the count runs directly
+    plan_count = settings.ROW_COUNT_STRATEGY == "exact" and cost_guard.enabled
+    count_plan = cost_guard.plan(counted, explain_query) if plan_count else None
+    strategy = _count_strategy(count_plan)
+    if strategy == "exact":
+        rows = fetch_data_from_db_fast(counted)
+        return int(rows[0]["total_rows"]), False
+    if strategy == "estimate":
+        plan = cost_guard.plan(query, explain_query)
+        return (plan.rows if plan else None), True
+    return None, False
+
+
+def fetch_bounded(query: str, max_rows: int) -> BoundedResult:
+    """
+    Fetch at most max_rows rows of query without loading the full result.
+
+    The query is wrapped as a subquery limited to max_rows + 1 rows; only when that extra
+    row shows up is the total obtained separately (COUNT(*) or planner estimate).
+    """
+    bounded_query = wrap_with_limit(query, max_rows + 1)
+    rows = query_result_cache.get_or_load(bounded_query, lambda: _fetch_head(_guard(bounded_query), max_rows + 1))
+    if len(rows) <= max_rows:
+        return BoundedResult(rows=rows, total_rows=len(rows))
+    total_rows, is_estimate = _count_rows(query)
+    return BoundedResult(rows=rows[:max_rows], total_rows=total_rows, total_is_estimate=is_estimate)
+
+
+def has_rows(query: str) -> bool:
+    """True if query returns at least one row; only the first row is ever produced."""
+    probe_query = wrap_with_limit(query, 1)
+    return bool(query_result_cache.get_or_load(probe_query, lambda: _fetch_head(_guard(probe_query), 1)))
+
+
+class _CopyCancelled(Exception):
+    pass
+
+
+class _QueueWriter:
+    """File-like sink for copy_expert that hands fixed-size chunks to a bounded queue."""
+
+    def __init__(self, chunks: queue.Queue, chunk_bytes: int):
+        self.chunks = chunks
+        self.chunk_bytes = chunk_bytes
+        self.buffer = bytearray()
+        self.cancelled = threading.Event()
+
+    def write(self, data):
+        if self.cancelled.is_set():
+            raise _CopyCancelled()
+        self.buffer += data.encode("utf-8") if isinstance(data, str) else data
+        if len(self.buffer) >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            # Blocks while the client is slower than the database: memory stays at queue size * chunk size
+            self.chunks.put(bytes(self.buffer))
+            self.buffer = bytearray()
+
+
+_COPY_DONE = object()
+
+
+def stream_copy_csv(query: str) -> Generator[bytes, None, None]:
+    """
+    Stream COPY (<query>) TO STDOUT WITH CSV HEADER from a pooled connection.
+
+    The COPY runs in a worker thread that pushes chunks into a bounded queue, so memory use does
+    not depend on the size of the export. Closing the generator (client disconnect) cancels the
+    statement on the server.
+    """
+    engine = Database().get_engine()
+    if not engine:
+        raise ConnectionError("Failed to initialize database engine.")
+    copy_sql = f"COPY ({strip_trailing_noise(query)}) TO STDOUT WITH CSV HEADER"
+    raw_conn = engine.raw_connection()
+    chunks: queue.Queue = queue.Queue(maxsize=settings.CSV_EXPORT_QUEUE_CHUNKS)
+    writer = _QueueWriter(chunks, settings.CSV_EXPORT_CHUNK_BYTES)
+
+    def copy():
+        try:
+            cursor = raw_conn.cursor()
+            try:
+                # Same implicit transaction as the COPY; the pool rolls it back on return
+                cursor.execute(timeout_statement("postgresql", EXPORT_TIMEOUT_MS))
+                with timed_query("export", engine.driver) as timing:
+                    cursor.copy_expert(copy_sql, writer)
+                    writer.flush()
+                    timing.rows = cursor.rowcount
+            finally:
+                cursor.close()
+        except BaseException as e:
+            if not writer.cancelled.is_set():
+                chunks.put(e)
+        finally:
+            chunks.put(_COPY_DONE)
+
+    worker = threading.Thread(target=copy, name="csv-copy", daemon=True)
+    worker.start()
+    finished = False
+    try:
+        while (item := chunks.get()) is not _COPY_DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        finished = True
+    finally:
+        if not finished:
+            writer.cancelled.set()
+            try:
+                raw_conn.driver_connection.cancel()
+            except Exception as e:
+                print(f"Could not cancel COPY: {e}")
+            # Unblock the writer until the worker has exited
+            while worker.is_alive() or not chunks.empty():
+                try:
+                    if chunks.get(timeout=0.1) is _COPY_DONE:
+                        break
+                except queue.Empty:
+                    pass
+        worker.join()
+        raw_conn.close()   # returns the connection to the pool
 
 
 def fetch_data_from_db_pandas(query: str) -> List[Dict[str, Any]]:
@@ -130,6 +575,7 @@ def fetch_data_from_db_pandas(query: str) -> List[Dict[str, Any]]:
 async def fetch_data_async(query: str) -> List[Dict[str, Any]]:
     """
     Async version using asyncpg for high-performance applications.
+    Runs on the shared pool instead of opening a connection per query.
     
     Parameters:
         query (str): The raw SQL query to execute.
@@ -137,58 +583,169 @@ async def fetch_data_async(query: str) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: Query results as list of dictionaries.
     """
-    db = Database()
-    conn_str = f"postgresql://{db.user}:{db.password}@{db.host}:{db.port}/{db.database}"
-    
-    try:
-        conn = await asyncpg.connect(conn_str)
-        try:
-            rows = await conn.fetch(query)
-            # Convert asyncpg.Record to dict
-            return [dict(row) for row in rows]
-        finally:
-            await conn.close()
-    except Exception as e:
-        raise
+    return await async_database.fetch_data(query)
 
 
 # Connection pool for async operations
 class AsyncDatabase:
+    """
+    One asyncpg pool per process, opened by the application lifespan and closed on shutdown
+    (or created on first use outside the app).
+
+    Every connection keeps asyncpg's prepared statement cache; queries are sent in their
+    normalized form so repeats of a fingerprint that differ only in spacing, case or comments
+    reuse one prepared statement.
+    """
+
     def __init__(self):
         self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
         self.db = Database()
 
     async def get_pool(self) -> asyncpg.Pool:
         if not self._pool:
-            conn_str = self.db.get_uri()
-            self._pool = await asyncpg.create_pool(
-                conn_str,
-                min_size=10,  # Production scale
-                max_size=50,  # Higher for production
-                command_timeout=60,
-                server_settings={
-                    'application_name': 'production_app',
-                    'jit': 'off'  # Disable JIT for consistent performance
-                }
-            )
+            # Concurrent first requests must not each create their own pool
+            async with self._pool_lock:
+                if not self._pool:
+                    conn_str = self.db.get_uri()
+                    self._pool = await asyncpg.create_pool(
+                        conn_str,
+                        min_size=settings.ASYNC_POOL_MIN_SIZE,
+                        max_size=settings.ASYNC_POOL_MAX_SIZE,
+                        max_inactive_connection_lifetime=settings.ASYNC_POOL_MAX_INACTIVE_SECONDS,
+                        statement_cache_size=settings.ASYNC_POOL_STATEMENT_CACHE_SIZE,
+                        command_timeout=60,
+                        server_settings={
+                            'application_name': 'production_app',
+                            'jit': 'off'  # Disable JIT for consistent performance
+                        }
+                    )
+                    print(f"asyncpg pool created ({settings.ASYNC_POOL_MIN_SIZE}-{settings.ASYNC_POOL_MAX_SIZE} connections)")
         return self._pool
 
-    async def fetch_data(self, query: str) -> List[Dict[str, Any]]:
-        """High-performance async data fetching with connection pooling."""
+    async def open(self) -> asyncpg.Pool:
+        return await self.get_pool()
+
+    @staticmethod
+    def _statement(query: str) -> str:
+        # Without a statement cache there is nothing to share, so the query is sent as written
+        return normalize_sql(query) if settings.ASYNC_POOL_STATEMENT_CACHE_SIZE else query
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._pool:
+            return {"open": False}
+        return {
+            "open": True,
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size(),
+        }
+
+    @asynccontextmanager
+    async def acquire(self):
+        """pool.acquire() with the wait recorded for /metrics."""
         pool = await self.get_pool()
-        async with pool.acquire() as conn:
-            rows = await conn.fetch(query)
+        start = time.perf_counter()
+        try:
+            conn = await pool.acquire()
+        except asyncio.TimeoutError:
+            pool_checkout_timeouts.inc(pool="asyncpg")
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start, pool="asyncpg")
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    def metrics(self):
+        if not self._pool:
+            return []
+        label = {"pool": "asyncpg"}
+        size, idle = self._pool.get_size(), self._pool.get_idle_size()
+        return [
+            ("db_pool_connections", "gauge", "Connections currently open in the pool.", [(label, size)]),
+            ("db_pool_in_use", "gauge", "Connections currently checked out.", [(label, size - idle)]),
+            ("db_pool_max_size", "gauge", "Most connections the pool may open.", [(label, self._pool.get_max_size())]),
+        ]
+
+    async def explain(self, explain_sql: str) -> Any:
+        async with self.acquire() as conn, conn.transaction():
+            await aset_local_timeout(conn, FINAL_TIMEOUT_MS)
+            return await conn.fetchval(explain_sql, timeout=client_timeout(FINAL_TIMEOUT_MS))
+
+    async def fetch_data(self, query: str, timeout_ms: int = FINAL_TIMEOUT_MS) -> List[Dict[str, Any]]:
+        """High-performance async data fetching with connection pooling."""
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                await aset_local_timeout(conn, timeout_ms)
+                with timed_query("final", "asyncpg") as timing:
+                    rows = await conn.fetch(self._statement(query), timeout=client_timeout(timeout_ms))
+                    timing.rows = len(rows)
             return [dict(row) for row in rows]
 
+    async def fetch_head(self, query: str, max_rows: int) -> List[Dict[str, Any]]:
+        """First max_rows rows through a server-side cursor."""
+        async with self.acquire() as conn:
+            # asyncpg cursors only exist inside a transaction
+            async with conn.transaction():
+                await aset_local_timeout(conn, FINAL_TIMEOUT_MS)
+                with timed_query("final", "asyncpg") as timing:
+                    rows = await conn.cursor(self._statement(query)).fetch(max_rows, timeout=client_timeout(FINAL_TIMEOUT_MS))
+                    timing.rows = len(rows)
+                return [dict(row) for row in rows]
+
+    async def stream_copy_csv(self, query: str) -> AsyncGenerator[bytes, None]:
+        """
+        Async twin of stream_copy_csv using asyncpg's COPY support.
+        The sink awaits a bounded queue, so a slow client applies back-pressure to the COPY.
+        Closing the generator cancels the COPY task, which cancels the statement on the server.
+        """
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=settings.CSV_EXPORT_QUEUE_CHUNKS)
+
+        async def copy():
+            try:
+                async with self.acquire() as conn, conn.transaction():
+                    await aset_local_timeout(conn, EXPORT_TIMEOUT_MS)
+                    with timed_query("export", "asyncpg") as timing:
+                        status = await conn.copy_from_query(strip_trailing_noise(query), output=chunks.put,
+                                                            format="csv", header=True,
+                                                            timeout=client_timeout(EXPORT_TIMEOUT_MS))
+                        # "COPY <rows>"; counting newlines would miscount values with line breaks
+                        timing.rows = int(status.split()[-1])
+            finally:
+                await chunks.put(_COPY_DONE)
+
+        task = asyncio.create_task(copy())
+        try:
+            while (item := await chunks.get()) is not _COPY_DONE:
+                yield item
+            await task   # re-raises a failed COPY
+        finally:
+            if not task.done():
+                task.cancel()
+                # Let the cancelled COPY release its connection; drain so its final put cannot block
+                while not task.done():
+                    try:
+                        chunks.get_nowait()
+                    except asyncio.QueueEmpty:
+                        await asyncio.sleep(0)
+
     async def execute(self, query: str, *args) -> str:
         """Execute non-SELECT queries (INSERT/UPDATE/DELETE)."""
-        pool = await self.get_pool()
-        async with pool.acquire() as conn:
+        async with self.acquire() as conn:
             return await conn.execute(query, *args)
 
     async def close(self):
         if self._pool:
             await self._pool.close()
+            self._pool = None
+
+
+# Shared by every async query path so the pool is created once per process
+async_database = AsyncDatabase()
+register_collector(async_database.metrics)
 
 
 # Convenience functions
@@ -197,7 +754,58 @@ def fetch_data_from_db(query: str) -> List[Dict[str, Any]]:
     return fetch_data_from_db_fast(query)
 
 
+async def acheck_query(query: str, allow_export: bool = False) -> CostDecision:
+    """Async variant of check_query on the shared asyncpg pool."""
+    return await cost_guard.acheck(query, async_database.explain, allow_export=allow_export)
+
+
+async def _aguard(query: str) -> str:
+    decision = await acheck_query(query)
+    if decision.refused:
+        raise QueryTooExpensiveError(decision.reason)
+    return decision.query
+
+
 async def fetch_data_from_db_async(query: str) -> List[Dict[str, Any]]:
-    """Async wrapper for backward compatibility - uses optimized async version."""
-    async_db = AsyncDatabase()
-    return await async_db.fetch_data(query)
\ No newline at end of file
+    """Async wrapper for backward compatibility - uses the shared connection pool and the result cache."""
+    return await query_result_cache.aget_or_load(query, lambda: _afetch_guarded(query))
+
+
+async def _afetch_guarded(query: str) -> List[Dict[str, Any]]:
+    return await async_database.fetch_data(await _aguard(query))
+
+
+async def _afetch_head_guarded(query: str, max_rows: int) -> List[Dict[str, Any]]:
+    return await async_database.fetch_head(await _aguard(query), max_rows)
+
+
+async def _acount_rows(query: str):
+    counted = count_query(query)
+    plan_count = settings.ROW_COUNT_STRATEGY == "exact" and cost_guard.enabled
+    count_plan = await cost_guard.aplan(counted, async_database.explain) if plan_count else None
+    strategy = _count_strategy(count_plan)
+    if strategy == "exact":
+        rows = await fetch_data_from_db_async(counted)
+        return int(rows[0]["total_rows"]), False
+    if strategy == "estimate":
+        plan = await cost_guard.aplan(query, async_database.explain)
+        return (plan.rows if plan else None), True
+    return None, False
+
+
+async def afetch_bounded(query: str, max_rows: int) -> BoundedResult:
+    """Async variant of fetch_bounded on the shared asyncpg pool."""
+    bounded_query = wrap_with_limit(query, max_rows + 1)
+    rows = await query_result_cache.aget_or_load(bounded_query,
+                                                 lambda: _afetch_head_guarded(bounded_query, max_rows + 1))
+    if len(rows) <= max_rows:
+        return BoundedResult(rows=rows, total_rows=len(rows))
+    total_rows, is_estimate = await _acount_rows(query)
+    return BoundedResult(rows=rows[:max_rows], total_rows=total_rows, total_is_estimate=is_estimate)
+
+
+async def ahas_rows(query: str) -> bool:
+    """Async variant of has_rows."""
+    probe_query = wrap_with_limit(query, 1)
+    return bool(await query_result_cache.aget_or_load(probe_query,
+                                                      lambda: _afetch_head_guarded(probe_query, 1)))
@@ -0,0 +1,74 @@
+"""
+Local snapshot of the reflected schema.
+
+Reflection and the sample-row queries behind SQLDatabase.get_table_info are the slowest part
+of a cold start. The snapshot stores the reflected MetaData (pickled, SQLAlchemy supports it)
+and the rendered per-table info so a restart can build SQLDatabase and seed the schema cache
+from disk instead of the catalog. The file is written by this service only; it is never
+loaded from an untrusted location.
+"""
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import MetaData
+from sqlalchemy.engine import Engine
+
+from src.configs.settings import settings
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class SchemaSnapshot:
+    url: str
+    schema: Optional[str]
+    include_tables: List[str]
+    metadata: MetaData
+    table_info: Dict[str, str] = field(default_factory=dict)
+    fingerprint: Optional[Dict[str, str]] = None   # per-table catalog hash, see schema_watcher
+    created_at: float = field(default_factory=time.time)
+    version: int = SNAPSHOT_VERSION
+
+
+def _identity(engine: Engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+def load_snapshot(engine: Engine, path: Optional[str] = None) -> Optional[SchemaSnapshot]:
+    """The snapshot at path if it was taken for the same database and table selection."""
+    path = path or settings.SCHEMA_SNAPSHOT_PATH
+    if not settings.SCHEMA_SNAPSHOT_ENABLED or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable schema snapshot {path}: {e}")
+        return None
+    if (not isinstance(snapshot, SchemaSnapshot) or snapshot.version != SNAPSHOT_VERSION
+            or snapshot.url != _identity(engine) or sorted(snapshot.include_tables) != sorted(settings.INCLUDE_TABLES or [])):
+        print(f"Schema snapshot {path} does not match the current configuration, ignoring it")
+        return None
+    print(f"Loaded schema snapshot with {len(snapshot.metadata.tables)} tables from {path}")
+    return snapshot
+
+
+def save_snapshot(engine: Engine, metadata: MetaData, table_info: Dict[str, str], schema: Optional[str] = None,
+                  fingerprint: Optional[Dict[str, str]] = None, path: Optional[str] = None) -> Optional[str]:
+    path = path or settings.SCHEMA_SNAPSHOT_PATH
+    if not settings.SCHEMA_SNAPSHOT_ENABLED:
+        return None
+    snapshot = SchemaSnapshot(url=_identity(engine), schema=schema, include_tables=list(settings.INCLUDE_TABLES or []),
+                              metadata=metadata, table_info=table_info, fingerprint=fingerprint)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)   # readers never see a half-written file
+    print(f"Saved schema snapshot with {len(metadata.tables)} tables to {path}")
+    return path
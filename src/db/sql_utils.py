@@ -0,0 +1,197 @@
+"""
+Lexical helpers for the SQL text produced by the agent.
+
+The scanner splits a statement into code, string literal, quoted identifier and comment
+segments so normalization and LIMIT handling never touch text inside literals or comments.
+"""
+import hashlib
+import re
+from typing import FrozenSet, List, Optional, Tuple
+
+_DOLLAR_TAG = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+_TRAILING_LIMIT = re.compile(r"(?<![\w$.])limit\s+(\d+|all)\s*$", re.IGNORECASE)
+_TRAILING_FETCH = re.compile(r"(?<![\w$.])fetch\s+(?:first|next)\s+(\d+)?\s*rows?\s+only\s*$", re.IGNORECASE)
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+_BOUNDED_WRAPPER = re.compile(r"^SELECT \* FROM \(\n(.*)\n\) AS _bounded LIMIT (\d+)$", re.DOTALL)
+
+
+def split_sql(sql: str) -> List[Tuple[str, str]]:
+    """
+    Split SQL into (kind, text) segments.
+
+    kind is one of 'code', 'string' (single-quoted, E'' or dollar-quoted literal),
+    'identifier' (double-quoted) or 'comment' (-- line or nested /* block */ comment).
+    """
+    segments = []
+    i, n, start = 0, len(sql), 0
+
+    def flush(end):
+        if end > start:
+            segments.append(("code", sql[start:end]))
+
+    while i < n:
+        ch = sql[i]
+        nxt = sql[i + 1] if i + 1 < n else ""
+        if ch == "-" and nxt == "-":
+            flush(i)
+            end = sql.find("\n", i)
+            end = n if end == -1 else end
+            segments.append(("comment", sql[i:end]))
+            i = start = end
+        elif ch == "/" and nxt == "*":
+            flush(i)
+            depth, j = 1, i + 2
+            while j < n and depth:
+                if sql.startswith("/*", j):
+                    depth, j = depth + 1, j + 2
+                elif sql.startswith("*/", j):
+                    depth, j = depth - 1, j + 2
+                else:
+                    j += 1
+            segments.append(("comment", sql[i:j]))
+            i = start = j
+        elif ch == "'":
+            escaped = i > 0 and sql[i - 1] in "eE" and (i == 1 or not (sql[i - 2].isalnum() or sql[i - 2] == "_"))
+            lit_start = i - 1 if escaped else i
+            flush(lit_start)
+            j = i + 1
+            while j < n:
+                if escaped and sql[j] == "\\":
+                    j += 2
+                    continue
+                if sql[j] == "'":
+                    if j + 1 < n and sql[j + 1] == "'":
+                        j += 2
+                        continue
+                    j += 1
+                    break
+                j += 1
+            segments.append(("string", sql[lit_start:j]))
+            i = start = j
+        elif ch == '"':
+            flush(i)
+            j = i + 1
+            while j < n:
+                if sql[j] == '"':
+                    if j + 1 < n and sql[j + 1] == '"':
+                        j += 2
+                        continue
+                    j += 1
+                    break
+                j += 1
+            segments.append(("identifier", sql[i:j]))
+            i = start = j
+        elif ch == "$" and (match := _DOLLAR_TAG.match(sql, i)) and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+            flush(i)
+            tag = match.group(0)
+            end = sql.find(tag, match.end())
+            end = n if end == -1 else end + len(tag)
+            segments.append(("string", sql[i:end]))
+            i = start = end
+        else:
+            i += 1
+    flush(n)
+    return segments
+
+
+def strip_trailing_noise(sql: str) -> str:
+    """Remove trailing whitespace, semicolons and comments."""
+    segments = split_sql(sql)
+    while segments:
+        kind, text = segments[-1]
+        if kind == "comment":
+            segments.pop()
+            continue
+        if kind == "code":
+            stripped = text.rstrip().rstrip(";").rstrip()
+            if stripped != text:
+                if stripped:
+                    segments[-1] = (kind, stripped)
+                else:
+                    segments.pop()
+                continue
+        break
+    return "".join(text for _, text in segments)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of a statement: comments dropped, whitespace collapsed, code lowercased,
+    trailing semicolons removed and LIMIT/FETCH formatting made uniform.
+    Literals and quoted identifiers are kept verbatim, so the result is still executable and
+    means the same thing in PostgreSQL (unquoted identifiers fold to lower case).
+    """
+    parts = []
+    for kind, text in split_sql(strip_trailing_noise(sql)):
+        if kind == "comment":
+            parts.append(" ")
+        elif kind == "code":
+            parts.append(re.sub(r"\s+", " ", text).lower())
+        else:
+            parts.append(text)
+    normalized = "".join(parts)
+    # Whitespace around punctuation never matters outside literals
+    segments = []
+    for kind, text in split_sql(normalized):
+        if kind == "code":
+            # Comments were replaced by a space, which may sit next to other whitespace
+            text = re.sub(r"\s*([,()])\s*", r"\1", re.sub(r"\s+", " ", text))
+        segments.append(text)
+    return "".join(segments).strip()
+
+
+def strip_trailing_limit(sql: str) -> Tuple[str, Optional[int]]:
+    """
+    Remove a top-level trailing ``LIMIT n`` or ``FETCH FIRST n ROWS ONLY``, or undo wrap_with_limit.
+
+    Returns:
+        (sql without the clause, the limit or None when there was no clause or it was LIMIT ALL)
+    """
+    sql = strip_trailing_noise(sql)
+    if match := _BOUNDED_WRAPPER.match(sql):
+        return match.group(1), int(match.group(2))
+    segments = split_sql(sql)
+    if not segments or segments[-1][0] != "code":
+        return sql, None
+    head = "".join(text for _, text in segments[:-1])
+    tail = segments[-1][1]
+    for pattern in (_TRAILING_LIMIT, _TRAILING_FETCH):
+        if match := pattern.search(tail):
+            value = match.group(1)
+            limit = int(value) if value and value.isdigit() else (1 if pattern is _TRAILING_FETCH and not value else None)
+            return (head + tail[:match.start()]).rstrip(), limit
+    return sql, None
+
+
+
+def sql_identifiers(sql: str) -> FrozenSet[str]:
+    """
+    Lowercased words and quoted identifiers outside literals and comments.
+    A superset of the tables a statement reads, used to tag cached results for invalidation.
+    """
+    names = set()
+    for kind, text in split_sql(sql):
+        if kind == "code":
+            names.update(word.lower() for word in _WORD.findall(text))
+        elif kind == "identifier":
+            names.add(text[1:-1].replace('""', '"').lower())
+    return frozenset(names)
+
+
+def sql_fingerprint(sql: str) -> str:
+    """Stable key for a statement: hash of its normalized text."""
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+def wrap_with_limit(sql: str, limit: int) -> str:
+    """
+    Bound any SELECT by wrapping it as a subquery.
+    Unlike appending a LIMIT this works with CTEs, trailing comments, FETCH FIRST and LIMIT ... OFFSET.
+    The newlines keep a trailing line comment of the inner query from swallowing the closing parenthesis.
+    """
+    return f"SELECT * FROM (\n{strip_trailing_noise(sql)}\n) AS _bounded LIMIT {int(limit)}"
+
+
+def count_query(sql: str) -> str:
+    """Statement returning the number of rows sql produces."""
+    return f"SELECT COUNT(*) AS total_rows FROM (\n{strip_trailing_noise(sql)}\n) AS _counted"
@@ -0,0 +1,129 @@
+"""
+Per-statement timeouts and request-scoped cancellation.
+
+Timeouts are set with SET LOCAL statement_timeout inside the transaction that runs the query,
+so they bind that statement on that pooled connection and end with its transaction. A SET sent
+as its own autocommitted statement lands on whichever connection the pool hands out and is gone
+before the next query starts. There are separate budgets for the agent's exploration queries,
+the final answer fetch and CSV exports; asyncpg calls also get the matching client timeout.
+
+A CancelScope spans one HTTP request. Every synchronous query registers its DBAPI connection
+while it runs, and cancelling the scope (client disconnect, request deadline) sends a cancel
+request for each of them and makes the remaining queries of the request fail fast. Async
+queries are cancelled with the task that awaits them: asyncpg cancels the statement on the server.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, Set
+
+from sqlalchemy.engine import Connection, Engine
+
+from src.configs.settings import settings
+
+
+class QueryCancelled(Exception):
+    """The request the query belongs to was cancelled."""
+
+
+class CancelScope:
+
+    def __init__(self):
+        self._connections: Set[Any] = set()
+        self._lock = threading.Lock()
+        self.cancelled = False
+        self.reason = ""
+
+    @contextmanager
+    def track(self, dbapi_connection):
+        """Register a connection for the duration of a query so cancel() can interrupt it."""
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled(self.reason)
+            self._connections.add(dbapi_connection)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._connections.discard(dbapi_connection)
+
+    def cancel(self, reason: str = "request cancelled") -> int:
+        """Cancel the running queries on the server; returns how many were running."""
+        with self._lock:
+            self.cancelled = True
+            self.reason = reason
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.cancel()
+            except Exception as e:
+                print(f"Could not cancel a running query: {e}")
+        if connections:
+            print(f"Cancelled {len(connections)} running queries: {reason}")
+        return len(connections)
+
+
+_current_scope: ContextVar[Optional[CancelScope]] = ContextVar("cancel_scope", default=None)
+
+
+@contextmanager
+def cancel_scope():
+    """Queries started inside the block, also from worker threads and tasks, can be cancelled together."""
+    scope = CancelScope()
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def current_scope() -> Optional[CancelScope]:
+    return _current_scope.get()
+
+
+def timeout_statement(dialect: str, timeout_ms: int) -> Optional[str]:
+    """
+    The transaction scoped timeout of dialect, None when it has none. Other dialects are left
+    unbounded: a session setting such as MySQL's max_execution_time would outlive the transaction
+    on the pooled connection and apply its budget to the next query.
+    """
+    if dialect == "postgresql":
+        return f"SET LOCAL statement_timeout = {int(timeout_ms)}"
+    return None
+
+
+def set_local_timeout(conn: Connection, timeout_ms: int):
+    """Bound the statements of the current transaction of conn by timeout_ms."""
+    if (statement := timeout_statement(conn.dialect.name, timeout_ms)) is not None:
+        conn.exec_driver_sql(statement)
+
+
+@contextmanager
+def timed_transaction(engine: Engine, timeout_ms: int):
+    """
+    A transaction on a pooled connection whose statements are bounded by timeout_ms and
+    cancelled with the current request.
+    """
+    with engine.begin() as conn:
+        set_local_timeout(conn, timeout_ms)
+        scope = current_scope()
+        if scope is None:
+            yield conn
+        else:
+            with scope.track(conn.connection.driver_connection):
+                yield conn
+
+
+async def aset_local_timeout(conn, timeout_ms: int):
+    """asyncpg twin of set_local_timeout; conn must be inside a transaction."""
+    await conn.execute(timeout_statement("postgresql", timeout_ms))
+
+
+def client_timeout(timeout_ms: int) -> float:
+    """asyncpg timeout in seconds, a little longer so the server reports its own timeout first."""
+    return timeout_ms / 1000 + 1
+
+
+AGENT_TIMEOUT_MS = settings.STATEMENT_TIMEOUT_AGENT_MS
+FINAL_TIMEOUT_MS = settings.STATEMENT_TIMEOUT_FINAL_MS
+EXPORT_TIMEOUT_MS = settings.STATEMENT_TIMEOUT_EXPORT_MS
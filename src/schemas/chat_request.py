@@ -1,6 +1,12 @@
 from pydantic import BaseModel, Field
+from typing import Literal
 from uuid import uuid4
 
 class ChatRequest(BaseModel):
     user_query : str
-    session_id : str
\ No newline at end of file
+    session_id : str
+    response_format : Literal["records", "rows", "columnar"] = Field(
+        default="records",
+        description="Shape of `data`: per-row dicts (records), columns plus row arrays (rows) "
+                    "or one array per column (columnar).",
+    )
@@ -0,0 +1,54 @@
+"""
+Cancel the work of an HTTP request when its client goes away or its deadline passes.
+
+The conversation runs as a task inside a CancelScope. On disconnect or deadline the scope
+cancels the queries running in worker threads on the server and the task is cancelled, which
+cancels its awaited asyncpg queries and LLM calls.
+"""
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+from starlette.requests import Request
+
+from src.db.statement_timeout import cancel_scope
+
+T = TypeVar("T")
+
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class RequestCancelled(Exception):
+    def __init__(self, reason: str, timed_out: bool = False):
+        self.reason = reason
+        self.timed_out = timed_out
+        super().__init__(reason)
+
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def run_cancellable(request: Request, work: Awaitable[T], timeout_seconds: Optional[float]) -> T:
+    """Await work; raises RequestCancelled once the client disconnected or timeout_seconds passed."""
+    with cancel_scope() as scope:
+        # Created inside the scope so the task, and the threads it starts, see it
+        task = asyncio.ensure_future(work)
+        watcher = asyncio.create_task(_wait_for_disconnect(request))
+        try:
+            done, _ = await asyncio.wait({task, watcher}, timeout=timeout_seconds,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if task in done:
+                return task.result()
+            timed_out = watcher not in done
+            reason = f"request deadline of {timeout_seconds:g}s passed" if timed_out else "client disconnected"
+            scope.cancel(reason)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise RequestCancelled(reason, timed_out=timed_out)
+        finally:
+            watcher.cancel()
+            if not task.done():
+                # The endpoint itself was cancelled, e.g. on shutdown
+                scope.cancel("request cancelled")
+                task.cancel()
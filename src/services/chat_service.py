@@ -1,50 +1,33 @@
 from src.configs.settings import settings
 from src.agent.agent import ChatAgent
+from src.agent.tools.sql_toolkit import SQLDatabaseToolkit
 from langchain_community.utilities import SQLDatabase
 from langchain.chat_models import init_chat_model
 from src.schemas.chat_request import ChatRequest
 from src.db.db import Database
-from src.agent.prompts.templates import prompt_template
-from src.data_dictionary.extract import explanations
-import sqlite3
-from langgraph.checkpoint.sqlite import SqliteSaver
-
-data_dictionary = explanations()
-
-import os
-import sqlite3
-from datetime import datetime
-
-class SingletonSQLiteConnection:
-    _instance = None
-    _conn = None
-
-    def __new__(cls, db_path=None):
-        if cls._instance is None:
-            # If no path is provided, create a timestamped one
-            if db_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                base_dir = f"db-agent/history/{timestamp}"
-                os.makedirs(base_dir, exist_ok=True)
-                db_path = os.path.join(base_dir, f"agent_checkpoints_{timestamp}.sqlite")
-            
-            cls._instance = super(SingletonSQLiteConnection, cls).__new__(cls)
-            cls._conn = sqlite3.connect(db_path, check_same_thread=False)
-            print(f"Created new SQLite connection at {db_path}")
-        else:
-            print("Reusing existing SQLite connection")
-        return cls._instance
-
-    def get_connection(self):
-        return self._conn
+from src.db.schema_snapshot import load_snapshot
+from src.agent.prompts.templates import default_few_shot_example, prompt_template
+from src.agent.tools.example_store import ExampleStore, SQLExample
+from src.agent.prompts.system_prompt import SystemPrompt
+from src.data_dictionary.index import dictionary_index
+from src.services.checkpoint_store import CheckpointCompactor, PooledSqliteSaver
 
+import asyncio
+import threading
 
 
 class ComponentFactory:
     _db_instance = None
     _sql_db = None
+    _schema_snapshot = None
     _llm = None
     _memory = None
+    _compactor = None
+    _example_store = None
+    _system_message = None
+    _tools = None
+    _chat_agent = None
+    _build_lock = threading.Lock()
 
     @classmethod
     def get_db_engine(cls):
@@ -58,14 +41,24 @@ class ComponentFactory:
         if cls._sql_db is None:
             engine = cls.get_db_engine()
             print("\nConnecting to SQLDatabase")
+            cls._schema_snapshot = load_snapshot(engine)
+            # With a snapshot the reflected MetaData comes from disk and SQLDatabase skips reflection
             cls._sql_db = SQLDatabase(
                 engine=engine,
+                metadata=cls._schema_snapshot.metadata if cls._schema_snapshot else None,
+                lazy_table_reflection=cls._schema_snapshot is not None,
                 sample_rows_in_table_info=3,
                 include_tables=settings.INCLUDE_TABLES,
             )
             print("Connected...")
         return cls._sql_db
 
+    @classmethod
+    def get_schema_snapshot(cls):
+        """Snapshot the SQLDatabase was built from, or None when it reflected from the catalog."""
+        cls.get_sql_database()
+        return cls._schema_snapshot
+
     @classmethod
     def get_llm(cls, with_guard_rails=False):
         if cls._llm is None:
@@ -104,51 +97,115 @@ class ComponentFactory:
 
     @classmethod
     def get_memory(cls):
+        """Checkpointer shared by the sync and async paths; persists across restarts."""
         if cls._memory is None:
-            conn = SingletonSQLiteConnection().get_connection()
-            cls._memory = SqliteSaver(conn=conn)
+            with cls._build_lock:
+                if cls._memory is None:
+                    cls._memory = PooledSqliteSaver(settings.CHECKPOINT_DB_PATH)
         return cls._memory
 
+    @classmethod
+    def get_checkpoint_compactor(cls):
+        if cls._compactor is None:
+            cls._compactor = CheckpointCompactor(cls.get_memory())
+        return cls._compactor
+
     @classmethod
     def get_sqlite_conn(cls):
-        return SingletonSQLiteConnection().get_connection()
+        return cls.get_memory().conn
 
+    @classmethod
+    def get_example_store(cls):
+        """Few-shot examples, loaded once; None when disabled."""
+        if cls._example_store is None and settings.EXAMPLES_ENABLED:
+            cls._example_store = ExampleStore(default=SQLExample(**default_few_shot_example, source="builtin")).load()
+        return cls._example_store
 
-class ChatService:
-    def __init__(self, payload: ChatRequest):
-        print("Paylod passed to chatserivce")
-        self.payload = payload
-        self.agent = self._create_agent()
-        print("agent created ..._create_agent() completed.")
+    @classmethod
+    def get_system_message(cls):
+        """System prompt for the database agent; the data dictionary section is retrieved per question."""
+        if cls._system_message is None:
+            sql_db = cls.get_sql_database()
+            cls._system_message = SystemPrompt(
+                prompt_template,
+                dictionary_index(),
+                examples=cls.get_example_store(),
+                dialect=settings.DIALECT,
+                top_k=settings.TOP_K,
+                table_names=sql_db.get_usable_table_names(),
+            )
+        return cls._system_message
+
+    @classmethod
+    def get_tools(cls):
+        if cls._tools is None:
+            cls._tools = SQLDatabaseToolkit(db=cls.get_sql_database(), 
+                                            llm=cls.get_llm(with_guard_rails=False)).get_tools()
+        return cls._tools
 
-    def _create_agent(self):
+    @classmethod
+    def _build_chat_agent(cls, memory):
         print("Initializing agent components")
-        sql_db = ComponentFactory.get_sql_database()
-        
+        sql_db = cls.get_sql_database()
         print("Database initialized...")
-        llm = ComponentFactory.get_llm(with_guard_rails=False)
-        # non_guard_rail_llm = ComponentFactory.get_llm(with_guard_rails=False)
-        # guard_rail_llm = ComponentFactory.get_llm(with_guard_rails=True)
+        llm = cls.get_llm(with_guard_rails=False)
         print("LLM initialized..")
-        memory = ComponentFactory.get_memory()
-        conn = ComponentFactory.get_sqlite_conn()
-        print("Conversational chat history memory initialized...")
-
-        system_message = prompt_template.format(
-            dialect=settings.DIALECT,
-            top_k=settings.TOP_K,
-            table_names=sql_db.get_usable_table_names(),
-            data_dictionary=data_dictionary,
-        )
-        
         return ChatAgent(llm=llm, 
                          sql_db=sql_db, 
-                         system_message=system_message,
-                         payload=self.payload, 
+                         system_message=cls.get_system_message(),
                          memory=memory, 
-                         conn=conn)
+                         conn=cls.get_sqlite_conn(),
+                         tools=cls.get_tools())
 
-        # return ChatAgent(non_guard_rail_llm, guard_rail_llm, sql_db, system_message, self.payload, memory, conn)
+    @classmethod
+    def get_chat_agent(cls):
+        """Process-wide agent (compiled graph, tools, classifier)."""
+        if cls._chat_agent is None:
+            memory = cls.get_memory()
+            with cls._build_lock:
+                if cls._chat_agent is None:
+                    cls._chat_agent = cls._build_chat_agent(memory)
+        return cls._chat_agent
+
+    @classmethod
+    def rebuild_agent(cls):
+        """Re-render the system prompt and recompile the agent, e.g. after a schema change.
+        Requests already running keep the agent they started with."""
+        memory = cls.get_memory()
+        with cls._build_lock:
+            cls._system_message = None
+            cls._chat_agent = cls._build_chat_agent(memory)
+        return cls._chat_agent
+
+    @classmethod
+    async def aget_chat_agent(cls):
+        """Same agent as get_chat_agent; the checkpointer implements both sync and async methods."""
+        if cls._chat_agent is None:
+            # Construction is blocking (schema reflection, graph compilation)
+            await asyncio.to_thread(cls.get_chat_agent)
+        return cls._chat_agent
+
+    @classmethod
+    def close(cls):
+        if cls._compactor is not None:
+            cls._compactor.wait_idle()
+        if cls._memory is not None:
+            cls._memory.close()
+
+
+class ChatService:
+    """Per-request handle: only the payload (session_id -> thread_id, user query) is request specific."""
+
+    def __init__(self, payload: ChatRequest, agent=None):
+        self.payload = payload
+        self.agent = agent or ComponentFactory.get_chat_agent()
+
+    @classmethod
+    async def create(cls, payload: ChatRequest):
+        return cls(payload=payload, agent=await ComponentFactory.aget_chat_agent())
 
     def converse(self):
-        return self.agent.converse(self.payload.user_query)
+        return self.agent.converse(self.payload.user_query, session_id=self.payload.session_id)
+
+    async def aconverse(self):
+        return await self.agent.aconverse(self.payload.user_query, session_id=self.payload.session_id)
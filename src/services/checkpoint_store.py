@@ -0,0 +1,305 @@
+"""
+Concurrent-safe SQLite checkpoint store for the LangGraph agents.
+
+SqliteSaver serializes every call on one connection behind a global lock. PooledSqliteSaver
+keeps the same tables and serialization but gives each worker thread its own connection:
+WAL lets readers run alongside the single writer, busy_timeout covers other processes
+writing the same file, and synchronous=NORMAL turns each commit into a WAL append that is
+fsynced at checkpoint time, so the per-step commits of a run are effectively batched.
+
+The async methods run the sync ones on the default executor, so a single saver (and a single
+compiled graph) serves both the sync and async request paths.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.base.id import UUID
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.configs.settings import settings
+
+
+class PooledSqliteSaver(SqliteSaver):
+
+    def __init__(self, db_path: str, busy_timeout_ms: Optional[int] = None):
+        self.db_path = db_path
+        self.busy_timeout_ms = settings.CHECKPOINT_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._setup_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(conn=self._connect())
+        print(f"Checkpoint store at {db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False only because list() may be resumed from another thread
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @conn.setter
+    def conn(self, value: sqlite3.Connection):
+        self._local.conn = value
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        with self._setup_lock:
+            if not self.is_setup:
+                conn = self.conn
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    # Required by the compactor's incremental vacuum; converting an existing file needs one VACUUM
+                    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    conn.execute("VACUUM")
+                super().setup()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        """
+        Cursor on the calling thread's connection.
+        Reads never lock. Writes take an in-process lock: SQLite admits one writer at a time anyway,
+        and queueing here avoids the sleep-and-retry backoff of its busy handler.
+        """
+        self.setup()
+        conn = self.conn
+        cur = conn.cursor()
+        if not transaction:
+            try:
+                yield cur
+            finally:
+                cur.close()
+            return
+        with self._write_lock:
+            try:
+                yield cur
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass   # owned by a thread that already closed it
+        self._local = threading.local()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+
+# Offset between the UUID epoch (1582-10-15) and the Unix epoch, in 100 ns ticks
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_timestamp(checkpoint_id: str) -> Optional[float]:
+    """Unix time a checkpoint was created, decoded from its uuid6 id."""
+    try:
+        ticks = UUID(checkpoint_id).time
+    except (ValueError, TypeError):
+        return None
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+@dataclass
+class CompactionReport:
+    started_at: float
+    duration_ms: float = 0.0
+    threads_expired: int = 0
+    checkpoints_deleted: int = 0
+    writes_deleted: int = 0
+    pages_vacuumed: int = 0
+    reclaimed_bytes: int = 0
+    file_bytes: int = 0
+    checkpoints_per_thread: Dict[str, int] = field(default_factory=dict)
+
+
+class CheckpointCompactor:
+    """
+    Retention for the checkpoint store.
+
+    Each pass deletes threads idle for longer than ttl_seconds, trims every remaining thread
+    to its keep_latest newest checkpoints (plus their pending writes) and returns up to
+    vacuum_pages free pages to the file system. Deletes run in small batches under the saver's
+    write lock so agent steps are never blocked for long.
+    """
+
+    BATCH_THREADS = 100
+
+    def __init__(self, saver: PooledSqliteSaver, keep_latest: Optional[int] = None, ttl_seconds: Optional[int] = None,
+                 interval_seconds: Optional[int] = None, vacuum_pages: Optional[int] = None):
+        self.saver = saver
+        self.keep_latest = settings.CHECKPOINT_KEEP_LATEST if keep_latest is None else keep_latest
+        self.ttl_seconds = settings.CHECKPOINT_THREAD_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.interval_seconds = settings.CHECKPOINT_COMPACT_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.vacuum_pages = settings.CHECKPOINT_VACUUM_PAGES if vacuum_pages is None else vacuum_pages
+        self.last_report: Optional[CompactionReport] = None
+        self._lock = threading.Lock()
+
+    def _thread_stats(self) -> List[Tuple[str, int, Optional[float]]]:
+        """(thread_id, checkpoint count, last activity) per thread."""
+        with self.saver.cursor(transaction=False) as cur:
+            cur.execute("SELECT thread_id, COUNT(*), MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id")
+            return [(thread_id, count, checkpoint_timestamp(latest)) for thread_id, count, latest in cur.fetchall()]
+
+    @staticmethod
+    def _placeholders(values) -> str:
+        return ",".join("?" * len(values))
+
+    def _delete_threads(self, thread_ids: List[str], report: CompactionReport):
+        for i in range(0, len(thread_ids), self.BATCH_THREADS):
+            batch = thread_ids[i:i + self.BATCH_THREADS]
+            marks = self._placeholders(batch)
+            with self.saver.cursor() as cur:
+                cur.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({marks})", batch)
+                report.checkpoints_deleted += cur.rowcount
+                cur.execute(f"DELETE FROM writes WHERE thread_id IN ({marks})", batch)
+                report.writes_deleted += cur.rowcount
+
+    def _trim_threads(self, thread_ids: List[str], report: CompactionReport):
+        for i in range(0, len(thread_ids), self.BATCH_THREADS):
+            batch = thread_ids[i:i + self.BATCH_THREADS]
+            marks = self._placeholders(batch)
+            with self.saver.cursor() as cur:
+                cur.execute(
+                    f"""DELETE FROM checkpoints WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, ROW_NUMBER() OVER (
+                                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+                            FROM checkpoints WHERE thread_id IN ({marks})
+                        ) WHERE position > ?)""",
+                    [*batch, self.keep_latest],
+                )
+                report.checkpoints_deleted += cur.rowcount
+                cur.execute(
+                    f"""DELETE FROM writes WHERE thread_id IN ({marks}) AND NOT EXISTS (
+                        SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id
+                        AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)""",
+                    batch,
+                )
+                report.writes_deleted += cur.rowcount
+
+    def _vacuum(self, report: CompactionReport):
+        with self.saver.cursor() as cur:
+            page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+            before = cur.execute("PRAGMA page_count").fetchone()[0]
+            # executescript steps the pragma to completion; execute() would free a single page
+            cur.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+            after = cur.execute("PRAGMA page_count").fetchone()[0]
+        # Lets the shrunken main file be written back without waiting for readers
+        with self.saver.cursor(transaction=False) as cur:
+            cur.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        report.pages_vacuumed = before - after
+        report.reclaimed_bytes = (before - after) * page_size
+        report.file_bytes = after * page_size
+
+    def compact(self) -> CompactionReport:
+        """Run one compaction pass."""
+        with self._lock:
+            self.saver.setup()
+            start = time.perf_counter()
+            report = CompactionReport(started_at=time.time())
+            stats = self._thread_stats()
+
+            cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else None
+            expired = [t for t, _, last_seen in stats if cutoff and last_seen is not None and last_seen < cutoff]
+            self._delete_threads(expired, report)
+            report.threads_expired = len(expired)
+
+            expired_set = set(expired)
+            oversized = [t for t, count, _ in stats if t not in expired_set and count > self.keep_latest]
+            if self.keep_latest > 0:
+                self._trim_threads(oversized, report)
+
+            self._vacuum(report)
+            report.checkpoints_per_thread = {t: count for t, count, _ in self._thread_stats()}
+            report.duration_ms = (time.perf_counter() - start) * 1000
+            self.last_report = report
+            print(f"Checkpoint compaction: expired {report.threads_expired} threads, deleted "
+                  f"{report.checkpoints_deleted} checkpoints and {report.writes_deleted} writes, "
+                  f"reclaimed {report.reclaimed_bytes} bytes in {report.duration_ms:.1f} ms")
+            return report
+
+    async def run_periodically(self):
+        """Background loop started from the FastAPI lifespan."""
+        while True:
+            try:
+                await asyncio.to_thread(self.compact)
+            except Exception as e:
+                print(f"Checkpoint compaction failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def wait_idle(self):
+        """Block until a pass running in a worker thread has finished."""
+        with self._lock:
+            pass
+
+    def stats(self) -> dict:
+        if self.last_report is None:
+            return {"last_report": None}
+        report = asdict(self.last_report)
+        counts = sorted(report.pop("checkpoints_per_thread").items(), key=lambda item: item[1], reverse=True)
+        report["threads"] = len(counts)
+        report["largest_threads"] = dict(counts[:20])
+        return {"last_report": report}
+
@@ -0,0 +1,179 @@
+"""
+Process metrics in the Prometheus text exposition format, served by GET /metrics.
+
+Counters and histograms are updated where things happen (query execution, pool checkout,
+requests). Values that components already keep, such as cache hit counters and pool sizes,
+are read on every scrape through collectors that the components register with
+register_collector. This module imports nothing from the application, so any layer can use it.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[Tuple[str, str], ...]
+# (name, type, help, [(labels, value), ...]) as produced by a collector
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+
+def _labels(labels: Dict[str, str]) -> LabelValues:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(labels)} {_format_value(value)}" for labels, value in values]
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DURATION_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}   # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, values in series:
+            for bound, count in zip(self.buckets + (math.inf,), values[:len(self.buckets)] + [values[-1]]):
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} "
+                             f"{_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(values[-1])}")
+        return lines
+
+
+_metrics: List = []
+_collectors: List[Callable[[], Iterable[Family]]] = []
+
+
+def counter(name: str, help: str) -> Counter:
+    metric = Counter(name, help)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, help: str, buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+    metric = Histogram(name, help, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]):
+    """collector() is called on every scrape and returns (name, type, help, samples) families."""
+    _collectors.append(collector)
+
+
+def _render_family(name: str, kind: str, help: str, samples) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_format_labels(_labels(labels))} {_format_value(value)}" for labels, value in samples]
+    return lines
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines += metric.render()
+    families: Dict[str, Tuple[str, str, list]] = {}
+    for collector in _collectors:
+        try:
+            for name, kind, help, samples in collector():
+                # Several collectors may contribute samples to one family, e.g. per cache
+                families.setdefault(name, (kind, help, []))[2].extend(samples)
+        except Exception as e:
+            print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+    for name, (kind, help, samples) in families.items():
+        lines += _render_family(name, kind, help, samples)
+    return "\n".join(lines) + "\n"
+
+
+def cache_families(cache: str, stats: Dict) -> List[Family]:
+    """Hit/miss counters and hit ratio of a cache from its stats() snapshot."""
+    hits = stats.get("hits", 0) + stats.get("near_hits", 0)
+    misses = stats.get("misses", 0)
+    return [
+        ("cache_hits_total", "counter", "Cache lookups answered from the cache.", [({"cache": cache}, hits)]),
+        ("cache_misses_total", "counter", "Cache lookups that had to load.", [({"cache": cache}, misses)]),
+        ("cache_hit_ratio", "gauge", "Hits over lookups since start.",
+         [({"cache": cache}, hits / (hits + misses) if hits + misses else 0.0)]),
+        ("cache_entries", "gauge", "Entries currently cached.", [({"cache": cache}, stats.get("entries", 0))]),
+    ]
+
+
+# Shared instruments
+query_duration = histogram("db_query_duration_seconds",
+                           "Execution time of SQL statements, by path (agent, final, export) and driver.")
+query_rows = histogram("db_query_rows", "Rows returned by SQL statements.", ROW_BUCKETS)
+query_errors = counter("db_query_errors_total", "SQL statements that raised, by path and driver.")
+pool_checkout_wait = histogram("db_pool_checkout_wait_seconds",
+                               "Time spent waiting for a pooled connection, including connecting.")
+pool_checkout_timeouts = counter("db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a connection.")
+request_duration = histogram("chat_request_duration_seconds", "Duration of /test_chat requests, by outcome.")
+
+
+class _QueryRecord:
+    rows = None
+
+
+@contextmanager
+def timed_query(path: str, driver: str):
+    """Time a statement: `with timed_query("final", "psycopg2") as q: rows = ...; q.rows = len(rows)`."""
+    record = _QueryRecord()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        query_errors.inc(path=path, driver=driver)
+        raise
+    else:
+        if record.rows is not None:
+            query_rows.observe(record.rows, path=path, driver=driver)
+    finally:
+        query_duration.observe(time.perf_counter() - start, path=path, driver=driver)
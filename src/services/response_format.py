@@ -0,0 +1,72 @@
+"""
+Opt-in compact encodings for the rows of a database answer.
+
+records  - the default list of per-row dicts, returned through FastAPI as before
+rows     - {"columns": [...], "rows": [[...], ...]}, column names sent once
+columnar - {"columns": [...], "values": {column: [...]}}, one array per column
+
+The compact formats are serialized with orjson directly, skipping jsonable_encoder.
+"""
+import datetime
+import decimal
+import uuid
+from typing import Any, Dict, List, Literal
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+ResponseFormat = Literal["records", "rows", "columnar"]
+
+
+def _default(value: Any):
+    """orjson fallback for the driver types it does not encode natively."""
+    if isinstance(value, decimal.Decimal):
+        # Same as FastAPI's decimal_encoder: integral decimals stay ints
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _columns(records: List[Dict[str, Any]]) -> List[str]:
+    return list(records[0].keys()) if records else []
+
+
+def to_rows(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns = _columns(records)
+    return {"columns": columns, "rows": [[record.get(c) for c in columns] for record in records]}
+
+
+def to_columnar(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns = _columns(records)
+    return {"columns": columns, "values": {c: [record.get(c) for record in records] for c in columns}}
+
+
+_ENCODERS = {"rows": to_rows, "columnar": to_columnar}
+
+
+def encode_data(records: List[Dict[str, Any]], response_format: ResponseFormat) -> Any:
+    encoder = _ENCODERS.get(response_format)
+    return encoder(records) if encoder else records
+
+
+def render_response(response: BaseModel, response_format: ResponseFormat) -> Response:
+    """Serialize a chat response with its data re-shaped to response_format."""
+    content = response.model_dump()
+    content["data_format"] = response_format
+    if isinstance(content.get("data"), list):
+        content["data"] = encode_data(content["data"], response_format)
+    return Response(content=dumps(content), media_type="application/json")
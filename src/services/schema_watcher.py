@@ -0,0 +1,171 @@
+"""
+Catalog fingerprint poller.
+
+Every SCHEMA_WATCH_INTERVAL_SECONDS the columns of the watched tables (INCLUDE_TABLES, or every
+table of the schema) are read from information_schema and hashed per table. When a hash
+changes, or a table appears or disappears, the affected tables are re-reflected and their
+entries are dropped from the schema cache and the query result cache, the system prompt and
+agent are rebuilt and the schema snapshot is rewritten. Other components can subscribe with
+add_listener to be told which tables changed.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import inspect, text
+
+from src.agent.tools.database_schema_cache_tool import schema_cache
+from src.configs.settings import settings
+from src.db.db import query_result_cache
+from src.db.schema_snapshot import save_snapshot
+from src.services.chat_service import ComponentFactory
+
+_POSTGRES_COLUMNS = text("""
+    SELECT table_name, column_name, data_type, udt_name, is_nullable, column_default, ordinal_position
+    FROM information_schema.columns
+    WHERE table_schema = COALESCE(:schema, current_schema())
+    ORDER BY table_name, ordinal_position
+""")
+
+
+def _hash(rows) -> str:
+    return hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()
+
+
+def catalog_fingerprint(engine, schema: Optional[str] = None, tables: Optional[List[str]] = None) -> Dict[str, str]:
+    """Hash of the column definitions of every table (or only of tables), keyed by table name."""
+    columns: Dict[str, list] = {}
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            for table, *definition in conn.execute(_POSTGRES_COLUMNS, {"schema": schema}):
+                columns.setdefault(table, []).append(tuple(definition))
+    else:
+        inspector = inspect(engine)
+        for table in inspector.get_table_names(schema=schema):
+            columns[table] = [(c["name"], str(c["type"]), c.get("nullable"), str(c.get("default")))
+                              for c in inspector.get_columns(table, schema=schema)]
+    if tables:
+        wanted = set(tables)
+        columns = {t: c for t, c in columns.items() if t in wanted}
+    return {table: _hash(definition) for table, definition in columns.items()}
+
+
+class SchemaWatcher:
+
+    def __init__(self, interval_seconds: Optional[int] = None):
+        self.interval_seconds = settings.SCHEMA_WATCH_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.fingerprint: Optional[Dict[str, str]] = None
+        self.checks = 0
+        self.changes = 0
+        self.last_checked_at: Optional[float] = None
+        self.last_change: Optional[dict] = None
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[Set[str]], None]):
+        """listener(changed_tables) runs in the watcher thread after the built-in invalidation."""
+        self._listeners.append(listener)
+
+    def current(self) -> Dict[str, str]:
+        sql_db = ComponentFactory.get_sql_database()
+        return catalog_fingerprint(ComponentFactory.get_db_engine(), sql_db._schema, settings.INCLUDE_TABLES)
+
+    def save_snapshot(self, fingerprint: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Write the schema snapshot together with the fingerprint it corresponds to."""
+        sql_db = ComponentFactory.get_sql_database()
+        fingerprint = fingerprint or self.current()
+        with self._lock:
+            self.fingerprint = fingerprint
+        table_info = {t: schema_cache.get_table(sql_db, t) for t in sql_db.get_usable_table_names()}
+        return save_snapshot(ComponentFactory.get_db_engine(), sql_db._metadata, table_info,
+                             schema=sql_db._schema, fingerprint=fingerprint)
+
+    def _baseline(self) -> Dict[str, str]:
+        snapshot = ComponentFactory.get_schema_snapshot()
+        if snapshot and snapshot.fingerprint:
+            # Changes made while the service was down are detected on the first check
+            return snapshot.fingerprint
+        return self.current()
+
+    def check(self) -> Set[str]:
+        """Compare the catalog with the last fingerprint; invalidate and return the changed tables."""
+        with self._lock:
+            previous = self.fingerprint
+        if previous is None:
+            previous = self._baseline()
+        current = self.current()
+        changed = {t for t in previous.keys() | current.keys() if previous.get(t) != current.get(t)}
+        with self._lock:
+            self.fingerprint = current
+            self.checks += 1
+            self.last_checked_at = time.time()
+        if changed:
+            self._apply(changed, current)
+        return changed
+
+    def _apply(self, changed: Set[str], fingerprint: Dict[str, str]):
+        start = time.perf_counter()
+        print(f"Schema change detected for tables {sorted(changed)}")
+        sql_db = ComponentFactory.get_sql_database()
+        engine = ComponentFactory.get_db_engine()
+
+        if not settings.INCLUDE_TABLES:
+            # Tables were added or dropped: the usable table list follows the catalog
+            sql_db._all_tables = set(fingerprint)
+            sql_db._usable_tables = set(fingerprint)
+        metadata = sql_db._metadata
+        for table in changed:
+            key = f"{sql_db._schema}.{table}" if sql_db._schema else table
+            if key in metadata.tables:
+                metadata.remove(metadata.tables[key])
+        present = [t for t in changed if t in fingerprint and t in sql_db._usable_tables]
+        if present:
+            metadata.reflect(bind=engine, only=present, schema=sql_db._schema, views=sql_db._view_support)
+
+        schema_cache.invalidate(changed)
+        dropped_results = query_result_cache.invalidate_tables(changed)
+        ComponentFactory.rebuild_agent()
+        for listener in self._listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                print(f"Schema change listener failed: {e}")
+        try:
+            self.save_snapshot(fingerprint)
+        except Exception as e:
+            print(f"Could not rewrite schema snapshot: {e}")
+
+        with self._lock:
+            self.changes += 1
+            self.last_change = {"at": time.time(), "tables": sorted(changed), "cached_results_dropped": dropped_results,
+                                "duration_ms": (time.perf_counter() - start) * 1000}
+
+    async def run_periodically(self, check_first: bool = False):
+        """
+        Background loop started from the FastAPI lifespan. With check_first the first comparison
+        runs right away; otherwise the warm-up has already made it.
+        """
+        if not check_first:
+            await asyncio.sleep(self.interval_seconds)
+        while True:
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                print(f"Schema fingerprint check failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tables": len(self.fingerprint or {}),
+                "checks": self.checks,
+                "changes": self.changes,
+                "last_checked_at": self.last_checked_at,
+                "last_change": self.last_change,
+                "interval_seconds": self.interval_seconds,
+            }
+
+
+schema_watcher = SchemaWatcher()
@@ -0,0 +1,167 @@
+"""
+Startup warm-up.
+
+Runs from the FastAPI lifespan so the first questions after a deploy do not pay for pool
+connects, schema reflection, sample-row queries, prompt rendering and graph compilation.
+Progress is exposed through GET /ready.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from src.agent.tools.database_schema_cache_tool import schema_cache
+from src.configs.settings import settings
+from src.db.db import async_database
+from src.services.chat_service import ComponentFactory
+from src.services.schema_watcher import schema_watcher
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    status: str = "pending"      # pending, running, done, failed
+    duration_ms: Optional[float] = None
+    detail: str = ""
+
+
+class WarmupProgress:
+    def __init__(self, names: List[str]):
+        self._lock = threading.Lock()
+        self.steps = [WarmupStep(name) for name in names]
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def _step(self, name) -> WarmupStep:
+        return next(step for step in self.steps if step.name == name)
+
+    def update(self, name: str, status: str, duration_ms: Optional[float] = None, detail: str = ""):
+        with self._lock:
+            step = self._step(name)
+            step.status, step.duration_ms, step.detail = status, duration_ms, detail
+
+    def _ready(self) -> bool:
+        # A failed optional step (snapshot, async pool) does not keep the service unready
+        return self.finished_at is not None and all(
+            step.status == "done" for step in self.steps if step.name in REQUIRED_STEPS)
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._ready()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            done = sum(step.status == "done" for step in self.steps)
+            return {
+                "ready": self._ready(),
+                "progress": done / len(self.steps),
+                "elapsed_ms": ((self.finished_at or time.time()) - self.started_at) * 1000 if self.started_at else 0.0,
+                "steps": [vars(step).copy() for step in self.steps],
+            }
+
+
+def _warm_pool() -> str:
+    engine = ComponentFactory.get_db_engine()
+    connections = [engine.connect() for _ in range(settings.WARMUP_POOL_CONNECTIONS)]
+    for conn in connections:
+        conn.close()    # back to the pool, already established
+    return f"{len(connections)} connections"
+
+
+def _reflect() -> str:
+    sql_db = ComponentFactory.get_sql_database()
+    source = "snapshot" if ComponentFactory.get_schema_snapshot() else "catalog"
+    return f"{len(sql_db._metadata.tables)} tables from {source}"
+
+
+def _table_names() -> str:
+    return ", ".join(ComponentFactory.get_sql_database().get_usable_table_names())
+
+
+def _sample_rows() -> str:
+    sql_db = ComponentFactory.get_sql_database()
+    snapshot = ComponentFactory.get_schema_snapshot()
+    if snapshot and snapshot.table_info:
+        schema_cache.seed(sql_db, snapshot.table_info, datetime.fromtimestamp(snapshot.created_at))
+    tables = sql_db.get_usable_table_names()
+    errors = [t for t in tables if schema_cache.get_table(sql_db, t).startswith("Error")]
+    if errors:
+        raise RuntimeError(f"schema unavailable for {errors}")
+    return f"{len(tables)} tables"
+
+
+def _system_prompt() -> str:
+    return f"{len(ComponentFactory.get_system_message().render())} characters with the full data dictionary"
+
+
+def _agent() -> str:
+    ComponentFactory.get_chat_agent()
+    return "compiled"
+
+
+def _snapshot() -> str:
+    if loaded := ComponentFactory.get_schema_snapshot():
+        return f"warmed from snapshot taken {datetime.fromtimestamp(loaded.created_at).isoformat()}"
+    return schema_watcher.save_snapshot() or "disabled"
+
+
+def _schema_check() -> str:
+    if not settings.SCHEMA_WATCH_ENABLED:
+        return "disabled"
+    # A snapshot written before a migration would otherwise be served until the first periodic check
+    changed = schema_watcher.check()
+    return f"changed since snapshot: {sorted(changed)}" if changed else "snapshot matches the catalog"
+
+
+STEPS: List[tuple] = [
+    ("engine_pool", _warm_pool),
+    ("schema_reflection", _reflect),
+    ("table_names", _table_names),
+    ("sample_rows", _sample_rows),
+    ("system_prompt", _system_prompt),
+    ("agent", _agent),
+    ("schema_snapshot", _snapshot),
+    ("schema_check", _schema_check),
+]
+REQUIRED_STEPS = {"engine_pool", "schema_reflection", "table_names", "sample_rows", "system_prompt", "agent"}
+
+progress = WarmupProgress([name for name, _ in STEPS] + ["async_pool"])
+
+
+async def _run_step(name: str, fn: Callable[[], str]) -> bool:
+    progress.update(name, "running")
+    start = time.perf_counter()
+    try:
+        detail = await asyncio.to_thread(fn)
+        progress.update(name, "done", (time.perf_counter() - start) * 1000, detail)
+        return True
+    except Exception as e:
+        progress.update(name, "failed", (time.perf_counter() - start) * 1000, str(e))
+        print(f"Warm-up step {name} failed: {e}")
+        return False
+
+
+async def run_warmup():
+    """Warm every component in dependency order; a failed step stops the steps that depend on it."""
+    progress.started_at = time.time()
+    try:
+        if settings.WARMUP_ENABLED:
+            for name, fn in STEPS:
+                if not await _run_step(name, fn) and name in REQUIRED_STEPS:
+                    break
+            progress.update("async_pool", "running")
+            start = time.perf_counter()
+            try:
+                await async_database.get_pool()
+                progress.update("async_pool", "done", (time.perf_counter() - start) * 1000)
+            except Exception as e:
+                progress.update("async_pool", "failed", (time.perf_counter() - start) * 1000, str(e))
+        else:
+            for step in progress.steps:
+                progress.update(step.name, "done", detail="warm-up disabled")
+    finally:
+        progress.finished_at = time.time()
+        print(f"Warm-up finished: {progress.snapshot()}")
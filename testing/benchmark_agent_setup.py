@@ -0,0 +1,79 @@
+"""
+Per-request setup overhead of the chat pipeline, before and after the process-wide agent registry.
+
+before: what every request used to do - render the system prompt, build the SQL toolkit,
+        the classifier and compile the ReAct graph.
+after:  ChatService(payload), which looks the compiled agent up in ComponentFactory.
+
+Only construction is measured; no LLM call or SQL query is issued after warm-up.
+Run from the repository root with a filled .env:
+
+    python -m testing.benchmark_agent_setup --iterations 50
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+from src.agent.agent import ChatAgent
+from src.agent.prompts.templates import default_few_shot_example, prompt_template
+from src.agent.tools.example_store import SQLExample, render_examples
+from src.configs.settings import settings
+from src.data_dictionary.extract import explanations
+from src.schemas.chat_request import ChatRequest
+from src.services.chat_service import ChatService, ComponentFactory
+
+
+def legacy_setup():
+    sql_db = ComponentFactory.get_sql_database()
+    system_message = prompt_template.format(
+        dialect=settings.DIALECT,
+        top_k=settings.TOP_K,
+        table_names=sql_db.get_usable_table_names(),
+        data_dictionary=explanations(),
+        few_shot_examples=render_examples([SQLExample(**default_few_shot_example)]),
+    )
+    return ChatAgent(llm=ComponentFactory.get_llm(),
+                     sql_db=sql_db,
+                     system_message=system_message,
+                     memory=ComponentFactory.get_memory(),
+                     conn=ComponentFactory.get_sqlite_conn())
+
+
+def registry_setup():
+    payload = ChatRequest(user_query="benchmark", session_id=str(uuid.uuid4()))
+    return ChatService(payload=payload)
+
+
+def measure(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<8} mean={statistics.mean(timings):9.3f} ms  "
+          f"median={statistics.median(timings):9.3f} ms  p95={p95:9.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    # Shared, already-cached components (engine, reflection, LLM client, checkpointer)
+    # are warmed first so only the per-request work is compared.
+    registry_setup()
+    legacy_setup()
+
+    report("before", measure(legacy_setup, args.iterations))
+    report("after", measure(registry_setup, args.iterations))
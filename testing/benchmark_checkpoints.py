@@ -0,0 +1,77 @@
+"""
+Checkpoint write/read latency with many concurrent sessions.
+
+before: SqliteSaver on one shared sqlite3 connection (check_same_thread=False), as the
+        previous SingletonSQLiteConnection setup.
+after:  PooledSqliteSaver (WAL, one connection per worker thread, no global lock).
+
+Every session runs in its own thread and performs --steps agent steps; a step writes a
+checkpoint plus its pending writes and reads the latest checkpoint back, which is what
+LangGraph does per node. Each run uses a fresh temporary file:
+
+    python -m testing.benchmark_checkpoints --sessions 64 --steps 20
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.services.checkpoint_store import PooledSqliteSaver
+
+
+def run_session(saver, steps, payload):
+    thread_id = str(uuid.uuid4())
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    writes, reads = [], []
+    for step in range(steps):
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=step))
+        checkpoint["channel_values"] = {"messages": payload}
+        start = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step, "writes": {}}, {})
+        saver.put_writes(config, [("messages", payload), ("branch:agent", None)], task_id=str(uuid.uuid4()))
+        writes.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+        reads.append((time.perf_counter() - start) * 1000)
+    return writes, reads
+
+
+def run(label, saver, sessions, steps, payload):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda _: run_session(saver, steps, payload), range(sessions)))
+    elapsed = time.perf_counter() - start
+    writes = sorted(t for w, _ in results for t in w)
+    reads = sorted(t for _, r in results for t in r)
+    for kind, timings in (("write", writes), ("read", reads)):
+        p95 = timings[int(len(timings) * 0.95)]
+        print(f"{label:<7}{kind:<6} mean={statistics.mean(timings):8.3f} ms  median={statistics.median(timings):8.3f} ms  "
+              f"p95={p95:8.3f} ms")
+    print(f"{label:<7}total  {sessions * steps / elapsed:8.1f} steps/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--payload-kb", type=int, default=8)
+    args = parser.parse_args()
+    payload = "x" * (args.payload_kb * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = SqliteSaver(sqlite3.connect(os.path.join(tmp, "legacy.sqlite"), check_same_thread=False))
+        run("before", legacy, args.sessions, args.steps, payload)
+        legacy.conn.close()
+
+        pooled = PooledSqliteSaver(os.path.join(tmp, "pooled.sqlite"))
+        run("after", pooled, args.sessions, args.steps, payload)
+        pooled.close()
@@ -0,0 +1,141 @@
+"""
+Prompt tokens spent on the data dictionary: whole file vs the columns retrieved per question.
+
+Measures the system prompt, the classifier prompt and the chart prompt for each question,
+with tokens counted like the chat history budget (tiktoken, or ~4 characters per token).
+The bundled data_dictionary.txt is tiny, so by default a wide synthetic fact table is used;
+every synthetic question targets one column and the recall of that column is reported too.
+
+    python -m testing.benchmark_data_dictionary --columns 300 --questions 200
+    python -m testing.benchmark_data_dictionary --dictionary src/data_dictionary/data_dictionary.txt
+"""
+import argparse
+import random
+import statistics
+import time
+
+from src.agent.prompts.graphing import graph_prompt
+from src.agent.prompts.system_prompt import SystemPrompt
+from src.agent.prompts.templates import prompt_template
+from src.agent.tools.chat_history import count_tokens
+from src.agent.tools.classifier import QueryClassifier
+from src.data_dictionary.extract import explanations
+from src.data_dictionary.index import DataDictionaryIndex
+
+ENTITIES = ["customer", "account", "employee", "merchant", "store", "product", "order", "invoice", "payment",
+            "card", "loan", "branch", "region", "campaign", "discount", "refund", "shipment", "supplier"]
+ATTRIBUTES = [
+    ("id", "String", "A unique identifier of the {e}."),
+    ("name", "String", "The display name of the {e}."),
+    ("type_cd", "String", "Code describing the kind of {e}, for example retail or corporate."),
+    ("status_cd", "String", "Current lifecycle status of the {e}."),
+    ("created_dt", "Date", "Date on which the {e} record was created."),
+    ("updated_ts", "Timestamp", "Time of the last change to the {e} record."),
+    ("amt", "Decimal", "Monetary amount associated with the {e} in the reporting currency."),
+    ("cnt", "Integer", "Number of transactions linked to the {e}."),
+    ("active_fl", "Boolean (0 or 1)", "Indicates whether the {e} is active (1) or inactive (0)."),
+    ("country_cd", "String", "ISO country code of the {e}."),
+    ("risk_score", "Decimal", "Risk score assigned to the {e} by the scoring model."),
+    ("role_name", "String", "Role or job title recorded for the {e}."),
+]
+QUESTION_TEMPLATES = [
+    "What is the total {a} per {e}?",
+    "Show the top 10 {e}s by {a}",
+    "How many {e}s have {a} above the average?",
+    "Plot the {a} of each {e} by month",
+]
+SPOKEN = {"amt": "amount", "cnt": "transaction count", "active_fl": "active flag", "type_cd": "type",
+          "status_cd": "status", "created_dt": "creation date", "updated_ts": "last update time",
+          "country_cd": "country", "risk_score": "risk score", "role_name": "role name", "id": "id", "name": "name"}
+
+
+def synthetic_dictionary(n_columns):
+    random.seed(11)
+    pairs = [(e, a) for e in ENTITIES for a in ATTRIBUTES]
+    random.shuffle(pairs)
+    rows = ["datatype\tcolumn_name\tdescription"]
+    columns = []
+    for entity, (suffix, datatype, description) in pairs[:n_columns]:
+        name = f"{entity}_{suffix}"
+        rows.append(f"{datatype}\t{name}\t\t\t{description.format(e=entity)}")
+        columns.append((entity, suffix, name))
+    text = ("Table_name: fact_transactions\nAbout fact_transactions: one row per card transaction\n\n"
+            "Here's the connected datatype, column name and its description.\n\n" + "\n".join(rows) + "\n")
+    return text, columns
+
+
+def synthetic_questions(columns, n):
+    random.seed(13)
+    questions = []
+    for _ in range(n):
+        entity, suffix, name = random.choice(columns)
+        template = random.choice(QUESTION_TEMPLATES)
+        questions.append((template.format(e=entity, a=SPOKEN[suffix]), name))
+    return questions
+
+
+class _NoLLM:
+    def with_structured_output(self, schema):
+        return self
+
+
+def prompts(system_prompt, classifier, index, question, full):
+    chart = dict(data_sample="[]", sql_query="SELECT ...", graph_type="bar", chat_history="",
+                 latest_user_query=question, column_names=[], agent_response_summary="")
+    data_dictionary = index.text if full else index.render_for(question)
+    classifier_dictionary = index.text if full else index.render_for(question, fallback=index.outline())
+    return {
+        "system": system_prompt.render("" if full else question),
+        "classifier": classifier.prompt_template.format(input=question, chat_history="",
+                                                        data_dictionary=classifier_dictionary),
+        "chart": graph_prompt.format(data_dictionary=data_dictionary, **chart),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dictionary", help="data dictionary file; a synthetic one is generated when omitted")
+    parser.add_argument("--columns", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.dictionary:
+        text, questions = explanations(args.dictionary), [(q, None) for q in (
+            "Which Employee Role Name has the highest number of discounts? Plot a count of these by Role?",
+            "How many accounts are active?", "Show the inactive accounts")]
+    else:
+        text, columns = synthetic_dictionary(args.columns)
+        questions = synthetic_questions(columns, args.questions)
+
+    start = time.perf_counter()
+    index = DataDictionaryIndex(text)
+    print(f"Parsed and indexed {len(index.columns)} columns in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    system_prompt = SystemPrompt(prompt_template, index, dialect="postgresql", top_k=15, table_names=["fact_transactions"])
+    classifier = QueryClassifier(text, "", _NoLLM())   # only its prompt template is used
+
+    totals = {"system": ([], []), "classifier": ([], []), "chart": ([], [])}
+    hits = 0
+    lookup_ms = []
+    for question, target in questions:
+        full = prompts(system_prompt, classifier, index, question, full=True)
+        t = time.perf_counter()
+        retrieved = prompts(system_prompt, classifier, index, question, full=False)
+        lookup_ms.append((time.perf_counter() - t) * 1000)
+        for name in totals:
+            totals[name][0].append(count_tokens(full[name]))
+            totals[name][1].append(count_tokens(retrieved[name]))
+        if target and f"\t{target}\t" in retrieved["system"]:
+            hits += 1
+
+    print(f"{'prompt':<12}{'full tokens':>14}{'retrieved':>12}{'reduction':>12}")
+    for name, (full_tokens, retrieved_tokens) in totals.items():
+        full_mean, retrieved_mean = statistics.mean(full_tokens), statistics.mean(retrieved_tokens)
+        print(f"{name:<12}{full_mean:>14.0f}{retrieved_mean:>12.0f}{1 - retrieved_mean / full_mean:>11.0%}")
+    print(f"retrieval + render: {statistics.mean(lookup_ms):.2f} ms mean per question (three prompts)")
+    if any(target for _, target in questions):
+        print(f"target column included: {hits}/{len(questions)}")
+
+
+if __name__ == "__main__":
+    main()
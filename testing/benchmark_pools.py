@@ -0,0 +1,104 @@
+"""
+Queries per second through the shared asyncpg pool versus the SQLAlchemy QueuePool.
+
+asyncpg: N coroutines on one event loop, each awaiting AsyncDatabase.fetch_data.
+queuepool: N threads, each running the synchronous fetch path on Database().get_engine().
+
+Both paths go through their statement timeout transaction like the application does; the
+result cache and the cost guard are bypassed so every call reaches PostgreSQL. Needs the
+POSTGRES_* settings of a reachable database:
+
+    python -m testing.benchmark_pools --concurrency 1 4 16 64 --seconds 5
+    python -m testing.benchmark_pools --query "SELECT * FROM some_table LIMIT 20"
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.configs.settings import settings
+from src.db.db import AsyncDatabase, Database, _execute_query
+
+
+def percentile(timings, q):
+    return timings[min(len(timings) - 1, int(len(timings) * q))] if timings else 0.0
+
+
+def report(label, concurrency, timings, elapsed, errors):
+    timings.sort()
+    print(f"{label:<10}{concurrency:>6}{len(timings) / elapsed:>12.1f}{statistics.mean(timings) if timings else 0:>11.2f}"
+          f"{percentile(timings, 0.95):>11.2f}{errors:>8}")
+
+
+async def run_asyncpg(database, query, concurrency, seconds):
+    deadline = time.perf_counter() + seconds
+    timings, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await database.fetch_data(query)
+                timings.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report("asyncpg", concurrency, timings, time.perf_counter() - start, errors)
+
+
+def run_queuepool(query, concurrency, seconds):
+    deadline = time.perf_counter() + seconds
+    timings, lock = [], threading.Lock()
+    errors = [0]
+
+    def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                _execute_query(query)
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    timings.append(elapsed)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    report("queuepool", concurrency, timings, time.perf_counter() - start, errors[0])
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--query", default="SELECT 1")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    database = AsyncDatabase()
+    await database.open()
+    Database().get_engine()
+    # Connect both pools before measuring
+    await database.fetch_data(args.query)
+    _execute_query(args.query)
+    print(f"asyncpg pool {settings.ASYNC_POOL_MIN_SIZE}-{settings.ASYNC_POOL_MAX_SIZE}, "
+          f"statement cache {settings.ASYNC_POOL_STATEMENT_CACHE_SIZE}; QueuePool 5 + 30 overflow")
+    print(f"{'path':<10}{'conc':>6}{'queries/s':>12}{'mean ms':>11}{'p95 ms':>11}{'errors':>8}")
+    try:
+        for concurrency in args.concurrency:
+            await run_asyncpg(database, args.query, concurrency, args.seconds)
+            await asyncio.to_thread(run_queuepool, args.query, concurrency, args.seconds)
+    finally:
+        await database.close()
+        Database().disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Serialization time and payload size of the chat response data formats.
+
+before: FastAPI's default path - jsonable_encoder over per-row dicts, then json.dumps.
+after:  the opt-in formats of src.services.response_format, serialized with orjson.
+
+Rows are synthetic but typed like psycopg2 output (Decimal, date, datetime, str, int).
+No database or LLM is needed:
+
+    python -m testing.benchmark_response_format --rows 100 --columns 30 --iterations 200
+"""
+import argparse
+import datetime
+import decimal
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from src.schemas.chat_response import ResponseSchemaMod
+from src.services.response_format import render_response
+
+
+def make_rows(n_rows, n_columns):
+    random.seed(7)
+    base = datetime.datetime(2024, 1, 1)
+    makers = [
+        lambda i: decimal.Decimal(random.randint(0, 10_000_000)) / 100,
+        lambda i: (base + datetime.timedelta(days=i)).date(),
+        lambda i: base + datetime.timedelta(minutes=37 * i),
+        lambda i: f"category_{i % 17}",
+        lambda i: i,
+    ]
+    return [{f"column_{c:02d}": makers[c % len(makers)](r) for c in range(n_columns)} for r in range(n_rows)]
+
+
+def make_response(rows):
+    return ResponseSchemaMod(sql_query="SELECT ...", suggested_visualization_type=[{"graph_type": "table", "args": None}],
+                             answer="Here are the rows.", query_type="database", model_error=False, data=rows)
+
+
+def fastapi_default(response):
+    # What FastAPI does for a returned model without a response_model
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def measure(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, len(body)
+
+
+def report(label, timings, size):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<10} mean={statistics.mean(timings):8.3f} ms  median={statistics.median(timings):8.3f} ms  "
+          f"p95={p95:8.3f} ms  size={size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    response = make_response(make_rows(args.rows, args.columns))
+    report("before", *measure(lambda: fastapi_default(response), args.iterations))
+    for response_format in ("records", "rows", "columnar"):
+        report(response_format, *measure(lambda: render_response(response, response_format).body, args.iterations))
@@ -0,0 +1,52 @@
+"""Matching rules of the question-to-answer cache."""
+import pytest
+
+from src.agent.tools.answer_cache import AnswerCache, is_follow_up
+
+RESPONSE = {"answer": "...", "sql_query": "SELECT region, SUM(amount) FROM orders GROUP BY region"}
+
+
+@pytest.fixture
+def cache():
+    cache = AnswerCache(ttl_seconds=60, similarity=0.8, max_entries=10, enabled=True)
+    cache.put("total sales amount per region for 2023", RESPONSE)
+    return cache
+
+
+def test_exact_and_reworded_questions_hit(cache):
+    assert cache.lookup("Total sales amount per region for 2023?") == RESPONSE
+    assert cache.lookup("please show total sales amount per region for 2023") == RESPONSE
+    assert cache.lookup("total sales amount per region for 2023 in euros") == RESPONSE
+    assert cache.stats()["hits"] == 2 and cache.stats()["near_hits"] == 1
+
+
+@pytest.mark.parametrize("question", [
+    "total sales amount per region for 2024",        # numbers must be identical
+    "top 5 total sales amount per region for 2023",   # ordering words must be identical
+    "total sales amount not per region for 2023",     # negation
+    "region per amount sales total for 2023",         # reordered: word pairs differ
+])
+def test_critical_differences_miss(cache, question):
+    assert cache.lookup(question) is None
+
+
+@pytest.mark.parametrize("question", ["plot it as a bar chart", "same for 2024", "show those again"])
+def test_follow_ups_are_neither_cached_nor_looked_up(cache, question):
+    assert is_follow_up(question)
+    assert cache.lookup(question) is None
+    cache.put(question, RESPONSE)
+    assert cache.stats()["entries"] == 1
+
+
+def test_relative_time_words_are_not_anaphora():
+    assert not is_follow_up("orders this month")
+    assert is_follow_up("orders for this")
+
+
+def test_expired_and_invalidated_entries_are_dropped(cache):
+    assert cache.invalidate_tables({"customers"}) == 0
+    assert cache.invalidate_tables({"ORDERS"}) == 1
+    assert cache.lookup("total sales amount per region for 2023") is None
+    expired = AnswerCache(ttl_seconds=0, similarity=0.6, max_entries=10, enabled=True)
+    expired.put("total sales amount per region for 2023", RESPONSE)
+    assert expired.lookup("total sales amount per region for 2023") is None
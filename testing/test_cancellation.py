@@ -0,0 +1,100 @@
+"""Request-scoped cancellation: CancelScope and run_cancellable."""
+import asyncio
+
+import pytest
+
+from src.db.statement_timeout import CancelScope, QueryCancelled, cancel_scope, current_scope, timeout_statement
+from src.services import cancellation
+from src.services.cancellation import RequestCancelled, run_cancellable
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cancelled = 0
+
+    def cancel(self):
+        self.cancelled += 1
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after=None):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.disconnect_after is not None and self.polls > self.disconnect_after
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(cancellation, "DISCONNECT_POLL_SECONDS", 0.01)
+
+
+def test_cancel_interrupts_running_queries_and_blocks_new_ones():
+    scope, running, finished = CancelScope(), FakeConnection(), FakeConnection()
+    with scope.track(finished):
+        pass
+    with scope.track(running):
+        assert scope.cancel("client disconnected") == 1
+    assert (running.cancelled, finished.cancelled) == (1, 0)
+    with pytest.raises(QueryCancelled, match="client disconnected"):
+        with scope.track(FakeConnection()):
+            pass
+
+
+def test_scope_is_visible_in_worker_threads_and_reset_afterwards():
+    async def scenario():
+        with cancel_scope() as scope:
+            assert await asyncio.to_thread(current_scope) is scope
+        assert current_scope() is None
+
+    asyncio.run(scenario())
+
+
+def test_completed_work_returns_its_result():
+    async def work():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    assert asyncio.run(run_cancellable(FakeRequest(), work(), timeout_seconds=1)) == "answer"
+
+
+@pytest.mark.parametrize("request_, timeout, timed_out", [
+    (FakeRequest(), 0.05, True),                        # deadline
+    (FakeRequest(disconnect_after=2), 5, False),         # client went away
+])
+def test_deadline_and_disconnect_cancel_the_work_and_its_queries(request_, timeout, timed_out):
+    connection, state = FakeConnection(), {}
+
+    async def work():
+        scope = current_scope()
+        with scope.track(connection):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+    async def scenario():
+        with pytest.raises(RequestCancelled) as raised:
+            await run_cancellable(request_, work(), timeout_seconds=timeout)
+        return raised.value
+
+    error = asyncio.run(scenario())
+    assert error.timed_out is timed_out
+    assert connection.cancelled == 1 and state["cancelled"]
+
+
+def test_errors_of_the_work_propagate():
+    async def work():
+        raise ValueError("bad sql")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_cancellable(FakeRequest(), work(), timeout_seconds=1))
+
+
+def test_timeouts_are_transaction_scoped_postgres_only():
+    assert timeout_statement("postgresql", 1500) == "SET LOCAL statement_timeout = 1500"
+    assert timeout_statement("mysql", 1500) is None
+    assert timeout_statement("sqlite", 1500) is None
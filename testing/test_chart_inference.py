@@ -0,0 +1,60 @@
+"""Column profiling and rule-based chart arguments."""
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from src.agent.tools.chart_inference import MAX_SERIES, infer_chart_args, profile_columns
+from src.agent.tools.graph_parser import _infer_locally
+
+
+def kinds(rows):
+    return {p.name: p.kind for p in profile_columns(rows)}
+
+
+def test_profile_kinds():
+    rows = [{"order_date": datetime.date(2024, 1, d), "year": 2024, "customer_id": str(d), "region": "north",
+             "amount": Decimal("10.5") * d, "shipped_dt": f"2024-01-{d:02d}"} for d in range(1, 6)]
+    assert kinds(rows) == {"order_date": "temporal", "year": "temporal", "customer_id": "categorical",
+                           "region": "categorical", "amount": "numeric", "shipped_dt": "temporal"}
+
+
+def test_profile_counts_nulls_and_uniqueness():
+    profile = {p.name: p for p in profile_columns([{"a": 1}, {"a": None}, {"a": 1}])}["a"]
+    assert (profile.nulls, profile.cardinality, profile.unique, profile.non_negative) == (1, 1, False, True)
+
+
+def test_single_and_multi_line():
+    rows = [{"month": f"2024-{m:02d}-01", "revenue": m * 10} for m in range(1, 13)]
+    assert infer_chart_args("line", rows)["line_type"] == "single"
+    rows = [{"month": f"2024-{m:02d}-01", "region": r, "revenue": m} for m in range(1, 13) for r in ("n", "s")]
+    args = infer_chart_args("line", rows)
+    assert (args["line_type"], args["group_by"], args["x_axis"]) == ("multi-line", "region", "month")
+
+
+def test_bar_and_pie():
+    rows = [{"region": r, "revenue": i + 1} for i, r in enumerate("abcd")]
+    assert infer_chart_args("bar", rows)["x_axis"] == "region"
+    assert infer_chart_args("pie", rows)["label"] == "region"
+    negative = [{"region": "a", "revenue": -1}, {"region": "b", "revenue": 2}]
+    assert infer_chart_args("pie", negative) is None
+
+
+def test_ambiguous_shapes_go_to_the_llm():
+    assert infer_chart_args("bar", [{"a": 1, "b": 2}]) is None                         # no dimension
+    assert infer_chart_args("line", [{"region": "a", "revenue": 1}]) is None           # no time axis
+    assert infer_chart_args("table", [{"region": "a", "revenue": 1}]) is None
+
+
+def test_series_count_is_judged_on_every_row():
+    # The first 15 rows hold two regions; the whole result has MAX_SERIES + 10
+    rows = [{"month": f"2024-{m:02d}-01", "region": f"r{r}", "revenue": m}
+            for r in range(MAX_SERIES + 10) for m in range(1, 13)]
+    assert infer_chart_args("line", rows[:15]) is not None
+    assert infer_chart_args("line", rows) is None
+    assert _infer_locally(rows, ["line", "bar"]) == {}
+
+
+@pytest.mark.parametrize("graph_type", ["line", "bar", "pie"])
+def test_empty_result(graph_type):
+    assert infer_chart_args(graph_type, []) is None
@@ -0,0 +1,60 @@
+"""Token-budgeted chat history and its per-thread cache."""
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agent.tools.chat_history import ChatHistoryBuilder, count_tokens, get_chat_history, summarize_query_output
+
+
+def turn(n, rows=50):
+    sql = f"SELECT * FROM orders WHERE id > {n}"
+    result = {"row_count": rows, "rows": [[i, "x" * 20] for i in range(rows)]}
+    return [
+        HumanMessage(content=f"question {n}", id=f"h{n}"),
+        AIMessage(content="", id=f"a{n}"),
+        ToolMessage(content=json.dumps({"sql_query": sql, "result": result}), name="sql_db_query",
+                    tool_call_id=f"c{n}", id=f"t{n}"),
+    ]
+
+
+def conversation(turns):
+    return [msg for n in range(turns) for msg in turn(n)]
+
+
+def test_summary_keeps_sql_and_row_count():
+    content = json.dumps({"sql_query": "SELECT 1", "result": {"row_count": 7, "rows": [[1]]}})
+    assert summarize_query_output(content) == "\nSQL Query (returned 7 rows):\nSELECT 1"
+    assert "failed" in summarize_query_output(json.dumps({"sql_query": "SELECT x", "result": "Error: boom"}))
+    # A truncated tool message still yields its SQL
+    assert "SELECT 2" in summarize_query_output('{"sql_query": "SELECT 2", "result": [[1, 2], [3')
+
+
+def test_recent_turns_verbatim_older_compact():
+    history = get_chat_history(conversation(4), token_budget=10_000, verbatim_turns=1)
+    assert history.count("Data Extracted") == 1
+    assert history.count("returned 50 rows") == 3
+    assert history.index("question 0") < history.index("question 3")
+
+
+def test_budget_drops_the_oldest_turns_first():
+    messages = conversation(30)
+    history = get_chat_history(messages, token_budget=300, verbatim_turns=2)
+    assert count_tokens(history) <= 300
+    assert "question 29" in history and "question 0\n" not in history
+
+
+def test_builder_matches_uncached_rendering_as_the_thread_grows():
+    builder = ChatHistoryBuilder(token_budget=2_000, verbatim_turns=2, max_threads=10)
+    messages = []
+    for n in range(6):
+        messages += turn(n)
+        assert builder.render("thread", messages) == get_chat_history(messages, 2_000, 2)
+
+
+def test_builder_detects_a_reset_thread_and_evicts_old_threads():
+    builder = ChatHistoryBuilder(token_budget=2_000, verbatim_turns=2, max_threads=1)
+    builder.render("a", conversation(3))
+    replaced = turn(9)
+    assert builder.render("a", replaced + turn(10)) == get_chat_history(replaced + turn(10), 2_000, 2)
+    builder.render("b", conversation(1))
+    assert list(builder._threads) == ["b"]
@@ -0,0 +1,74 @@
+"""Retention rules of the checkpoint compactor on a temporary store."""
+import time
+import uuid
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from src.services.checkpoint_store import CheckpointCompactor, PooledSqliteSaver, checkpoint_timestamp
+
+
+def checkpoint_id(at: float, seq: int) -> str:
+    """A uuid6 checkpoint id created at unix time `at`, laid out like langgraph's uuid6."""
+    timestamp = int(at * 1e7) + 0x01B21DD213814000 + seq
+    value = ((timestamp >> 12) & 0xFFFFFFFFFFFF) << 80 | 0x6 << 76 | (timestamp & 0x0FFF) << 64
+    value |= 0x8000 << 48 | seq
+    return str(uuid.UUID(int=value))
+
+
+def write_thread(saver, thread_id, steps, started_at):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step in range(steps):
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = checkpoint_id(started_at + step, step)
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step, "writes": {}}, {})
+        saver.put_writes(config, [("messages", f"step {step}")], task_id=str(uuid.uuid4()))
+
+
+def counts(saver, table):
+    with saver.cursor(transaction=False) as cur:
+        cur.execute(f"SELECT thread_id, COUNT(*) FROM {table} GROUP BY thread_id")
+        return dict(cur.fetchall())
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = PooledSqliteSaver(str(tmp_path / "checkpoints.sqlite"))
+    saver.setup()
+    return saver
+
+
+def test_checkpoint_id_round_trip():
+    assert checkpoint_timestamp(checkpoint_id(1_700_000_000, 0)) == pytest.approx(1_700_000_000, abs=1e-3)
+
+
+def test_trims_long_threads_and_expires_idle_ones(saver):
+    now = time.time()
+    write_thread(saver, "long", 12, now - 60)
+    write_thread(saver, "short", 2, now - 60)
+    write_thread(saver, "idle", 3, now - 30 * 24 * 3600)
+
+    report = CheckpointCompactor(saver, keep_latest=5, ttl_seconds=7 * 24 * 3600, vacuum_pages=0).compact()
+
+    assert counts(saver, "checkpoints") == {"long": 5, "short": 2}
+    # Pending writes go with their checkpoints
+    assert counts(saver, "writes") == {"long": 5, "short": 2}
+    assert report.threads_expired == 1
+    assert report.checkpoints_deleted == 7 + 3
+    assert report.checkpoints_per_thread == {"long": 5, "short": 2}
+
+
+def test_newest_checkpoints_survive(saver):
+    now = time.time()
+    write_thread(saver, "t", 6, now - 60)
+    CheckpointCompactor(saver, keep_latest=2, ttl_seconds=0, vacuum_pages=0).compact()
+    latest = saver.get_tuple({"configurable": {"thread_id": "t", "checkpoint_ns": ""}})
+    assert latest.checkpoint["id"] == checkpoint_id(now - 60 + 5, 5)
+    assert len(list(saver.list({"configurable": {"thread_id": "t"}}))) == 2
+
+
+def test_zero_ttl_and_keep_latest_disable_retention(saver):
+    write_thread(saver, "old", 4, time.time() - 365 * 24 * 3600)
+    report = CheckpointCompactor(saver, keep_latest=0, ttl_seconds=0, vacuum_pages=0).compact()
+    assert counts(saver, "checkpoints") == {"old": 4}
+    assert report.checkpoints_deleted == 0
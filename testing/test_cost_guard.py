@@ -0,0 +1,76 @@
+"""Decisions of the EXPLAIN cost guard, without a database."""
+import json
+
+import pytest
+
+from src.db.cost_guard import CostGuard, QueryPlan, parse_plan
+
+
+def guard(**overrides):
+    limits = dict(max_cost=1000, max_rows=500, limit_rows=100, export_max_cost=10_000, enabled=True)
+    return CostGuard(**{**limits, **overrides})
+
+
+def plan(cost, rows):
+    return QueryPlan(total_cost=cost, rows=rows, node="Seq Scan")
+
+
+def test_within_limits_runs_unchanged():
+    decision = guard()._decide("select 1", plan(10, 10), allow_export=False)
+    assert (decision.action, decision.query) == ("run", "select 1")
+
+
+def test_unknown_plan_runs():
+    assert guard()._decide("select 1", None, allow_export=False).action == "run"
+
+
+def test_large_result_is_bounded_when_the_bound_is_cheap():
+    decision = guard()._decide("select * from t", plan(5000, 100_000), allow_export=False,
+                               bounded_plan=plan(50, 100), bounded="bounded sql")
+    assert (decision.action, decision.query) == ("limit", "bounded sql")
+    assert "100,000 rows" in decision.reason
+
+
+def test_bound_that_stays_expensive_is_refused():
+    decision = guard()._decide("select * from t", plan(5000, 100_000), allow_export=False,
+                               bounded_plan=plan(5000, 100), bounded="bounded sql")
+    assert decision.refused
+    assert "cost of 5,000" in decision.reason
+
+
+def test_expensive_small_result_is_refused_not_bounded():
+    # Bounding only helps when the result has more rows than the bound
+    decision = guard()._decide("select count(*) from a, b", plan(5000, 1), allow_export=False,
+                               bounded_plan=plan(10, 1), bounded="bounded sql")
+    assert decision.refused
+    assert "rows (limit" not in decision.reason
+
+
+@pytest.mark.parametrize("rows, action", [(100_000, "export"), (50, "run")])
+def test_export_budget(rows, action):
+    decision = guard()._decide("select * from t", plan(5000, rows), allow_export=True)
+    assert decision.action == action
+
+
+def test_over_export_budget_is_refused():
+    assert guard()._decide("select * from t", plan(50_000, 100_000), allow_export=True).refused
+
+
+def test_check_caches_plans_and_respects_enabled():
+    calls = []
+
+    def explain(sql):
+        calls.append(sql)
+        return json.dumps([{"Plan": {"Node Type": "Seq Scan", "Total Cost": 10, "Plan Rows": 5}}])
+
+    cost_guard = guard()
+    assert cost_guard.check("select a from t", explain).action == "run"
+    assert cost_guard.check("SELECT a FROM t;", explain).action == "run"
+    assert len(calls) == 1
+    assert guard(enabled=False).check("select a from t", explain).action == "run"
+    assert len(calls) == 1
+
+
+def test_parse_plan_rejects_malformed_output():
+    assert parse_plan("not json") is None
+    assert parse_plan([{"Plan": {"Total Cost": 1.5, "Plan Rows": 2}}]) == QueryPlan(1.5, 2, "")
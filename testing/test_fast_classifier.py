@@ -0,0 +1,69 @@
+"""Decision rules of the lexical first-stage classifier."""
+import pytest
+
+from src.agent.tools.fast_classifier import LocalQueryClassifier, classifier_stats, parse_schema_terms
+
+DICTIONARY = """Table_name: sales_orders
+About sales_orders: one row per order
+
+datatype\tcolumn_name\tdescription
+String\torder_id\tIdentifier of the order.
+String\tcustomer_name\tName of the customer.
+Decimal\tdiscount_amt\tDiscount granted on the order.
+Date\tshipment_dt\tDate the order shipped.
+"""
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return LocalQueryClassifier(DICTIONARY, threshold=0.8)
+
+
+def test_schema_terms_skip_generic_parts():
+    tables, columns, parts = parse_schema_terms(DICTIONARY)
+    assert tables == {"sales_orders"}
+    assert "discount_amt" in columns
+    assert "discount" in parts and "amt" not in parts and "id" not in parts
+
+
+@pytest.mark.parametrize("question", [
+    "total discount_amt per customer_name",
+    "average discount per customer last month",
+    "SELECT customer_name FROM sales_orders WHERE discount_amt > 0",
+])
+def test_database_questions_are_decided_locally(classifier, question):
+    assert classifier.classify(question).query_type == "database"
+
+
+@pytest.mark.parametrize("question", ["hello there!", "thanks a lot", "who are you?"])
+def test_greetings_are_chitchat(classifier, question):
+    result = classifier.classify(question)
+    assert result.query_type == "chitchat" and result.confidence >= 0.8
+
+
+@pytest.mark.parametrize("question", [
+    "what is the capital of france",
+    "hi, what can you tell me about quantum physics",
+    "",
+])
+def test_no_signal_falls_back_to_the_llm(classifier, question):
+    assert classifier.classify(question).query_type is None
+
+
+@pytest.mark.parametrize("question", ["plot it as a pie chart", "give me this as csv", "show that as a bar chart"])
+def test_output_follow_ups_need_history(classifier, question):
+    assert classifier.classify(question, chat_history="Human: discount per customer").query_type == "database"
+    assert classifier.classify(question).query_type is None
+
+
+@pytest.mark.parametrize("question", ["what's the best bar in town?", "draw a line under that", "export"])
+def test_ambiguous_output_words_fall_back_even_with_history(classifier, question):
+    result = classifier.classify(question, chat_history="Human: discount per customer")
+    assert result.query_type is None and result.confidence < classifier.threshold
+
+
+def test_results_below_threshold_are_recorded():
+    classifier_stats.reset()
+    LocalQueryClassifier(DICTIONARY, threshold=0.99).classify("average discount per customer")
+    snapshot = classifier_stats.snapshot()
+    assert snapshot["total"] == 1 and snapshot["local_hits"]["database"] == 0
@@ -0,0 +1,43 @@
+"""Reuse of the sql_db_query tool's rows for the final answer."""
+from src.agent.tools.query_capture import QueryCapture
+
+ROWS = [{"id": i} for i in range(10)]
+
+
+def capture_of(sql, rows):
+    capture = QueryCapture()
+    capture.record(sql, rows)
+    return capture
+
+
+def test_exact_match_ignores_formatting():
+    capture = capture_of("SELECT id FROM t -- ids\n;", ROWS)
+    assert capture.match("select id\nfrom t") == ROWS
+
+
+def test_smaller_limit_is_sliced_from_a_bounded_capture():
+    capture = capture_of("select id from t limit 10", ROWS)
+    assert capture.match("select id from t limit 3") == ROWS[:3]
+    assert capture.match("select id from t fetch first 10 rows only") == ROWS
+
+
+def test_larger_limit_needs_a_complete_capture():
+    # Ten rows for LIMIT 10 may have been cut off: LIMIT 20 or no limit cannot be answered
+    capture = capture_of("select id from t limit 10", ROWS)
+    assert capture.match("select id from t limit 20") is None
+    assert capture.match("select id from t") is None
+    # Fewer rows than the limit means the capture holds the whole result
+    capture = capture_of("select id from t limit 50", ROWS)
+    assert capture.match("select id from t limit 20") == ROWS
+    assert capture.match("select id from t") == ROWS
+
+
+def test_different_query_is_not_matched():
+    capture = capture_of("select id from t where id > 1", ROWS)
+    assert capture.match("select id from t where id > 2") is None
+
+
+def test_latest_capture_wins():
+    capture = capture_of("select id from t", ROWS)
+    capture.record("select id from t", ROWS[:2])
+    assert capture.match("select id from t") == ROWS[:2]
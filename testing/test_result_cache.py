@@ -0,0 +1,46 @@
+"""Single-flight behaviour of the query result cache."""
+import asyncio
+
+import pytest
+
+from src.db.db import QueryResultCache
+
+
+def test_cancelled_owner_does_not_fail_coalesced_waiters():
+    async def scenario():
+        cache = QueryResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return [{"a": 1}]
+
+        owner = asyncio.create_task(cache.aget_or_load("select a from t", load))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.aget_or_load("SELECT a FROM t", load))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        assert await waiter == [{"a": 1}]
+        assert owner.cancelled() and len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_query_errors_reach_every_waiter():
+    async def scenario():
+        cache = QueryResultCache(max_bytes=10 ** 6, ttl_seconds=60)
+
+        async def load():
+            await asyncio.sleep(0.02)
+            raise ValueError("relation does not exist")
+
+        owner = asyncio.create_task(cache.aget_or_load("select a from t", load))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.aget_or_load("select a from t", load))
+        for task in (owner, waiter):
+            with pytest.raises(ValueError):
+                await task
+        assert cache.stats()["coalesced"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+"""Compact, token-bounded previews of sql_db_query results."""
+import datetime
+import json
+from decimal import Decimal
+
+from src.agent.tools.chat_history import count_tokens
+from src.agent.tools.result_preview import column_summary, json_safe, preview_result
+
+
+def test_json_safe_values():
+    assert json_safe(Decimal("12")) == 12 and json_safe(Decimal("1.5")) == 1.5
+    assert json_safe(datetime.date(2024, 1, 2)) == "2024-01-02"
+    assert json_safe(datetime.timedelta(minutes=1)) == 60.0
+    assert json_safe(b"\x01\xff") == "01ff"
+    assert len(json_safe("word " * 100, max_string_length=20)) <= 23
+
+
+def test_column_summary_over_every_row():
+    summary = column_summary("amount", [Decimal("3"), None, Decimal("1.5"), Decimal("10")], 300)
+    assert summary == {"name": "amount", "type": "number", "nulls": 1, "min": 1.5, "max": 10}
+    assert column_summary("empty", [None, None], 300) == {"name": "empty", "type": "unknown", "nulls": 2}
+    assert column_summary("mixed", [1, "a"], 300)["type"] == "mixed"
+
+
+def test_small_results_are_returned_whole():
+    rows = [{"region": "north", "total": Decimal("10.5")}, {"region": "south", "total": Decimal("7")}]
+    preview = preview_result(rows, max_rows=20, max_tokens=1000)
+    assert preview["row_count"] == 2 and "rows_omitted" not in preview
+    assert preview["rows"] == [["north", 10.5], ["south", 7]]
+    assert [c["name"] for c in preview["columns"]] == ["region", "total"]
+    json.dumps(preview)     # real JSON, not a Python repr
+
+
+def test_large_results_are_cut_to_the_token_budget():
+    rows = [{"id": i, "created": datetime.date(2024, 1, 1) + datetime.timedelta(days=i), "note": "x" * 40}
+            for i in range(5000)]
+    preview = preview_result(rows, max_rows=50, max_tokens=400)
+    assert preview["row_count"] == 5000
+    assert len(preview["rows"]) + preview["rows_omitted"] == 5000
+    assert count_tokens(json.dumps(preview, ensure_ascii=False)) <= 400
+    created = preview["columns"][1]
+    assert (created["min"], created["max"]) == ("2024-01-01", "2037-09-08")
+
+
+def test_budget_too_small_for_any_row_keeps_the_summary():
+    rows = [{"text": "word " * 200} for _ in range(3)]
+    preview = preview_result(rows, max_rows=3, max_tokens=10)
+    assert preview["rows"] == [] and preview["rows_omitted"] == 3 and preview["row_count"] == 3
+
+
+def test_empty_result():
+    assert preview_result([], max_rows=5, max_tokens=100) == {"row_count": 0, "columns": [], "rows": []}
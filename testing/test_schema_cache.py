@@ -0,0 +1,85 @@
+"""Stale-while-revalidate behaviour of the per-table schema cache."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.agent.tools.database_schema_cache_tool import SchemaCache
+
+
+class FakeDatabase:
+    """Stands in for SQLDatabase: counts loads and can hold them until released."""
+
+    def __init__(self):
+        self._engine = SimpleNamespace(url="postgresql://test/db")
+        self.loads = []
+        self.version = 1
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_table_info_no_throw(self, tables):
+        self.release.wait(5)
+        self.loads.append(tables[0])
+        if tables[0] == "missing":
+            return "Error: table not found"
+        return f"CREATE TABLE {tables[0]} v{self.version}"
+
+
+def cache(refresh_seconds=60, stale_seconds=600):
+    return SchemaCache(refresh_after=timedelta(seconds=refresh_seconds), max_stale=timedelta(seconds=stale_seconds))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_fresh_entries_are_served_from_the_cache():
+    db, schema = FakeDatabase(), cache()
+    assert schema.get(db, ["orders", "customers", "orders"]) == "CREATE TABLE orders v1\n\nCREATE TABLE customers v1"
+    schema.get_table(db, "orders")
+    assert db.loads == ["orders", "customers"]
+    assert schema.stats() == {"entries": 2, "hits": 1, "stale_hits": 0, "misses": 2}
+
+
+def test_concurrent_misses_load_a_table_once():
+    db, schema = FakeDatabase(), cache()
+    db.release.clear()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(schema.get_table, db, "orders") for _ in range(8)]
+        time.sleep(0.05)
+        db.release.set()
+        assert {f.result() for f in futures} == {"CREATE TABLE orders v1"}
+    assert db.loads == ["orders"]
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    db, schema = FakeDatabase(), cache()
+    schema.seed(db, {"orders": "CREATE TABLE orders v0"}, datetime.now() - timedelta(seconds=120))
+    db.release.clear()
+    # Both requests get the stale text immediately; only one background refresh is scheduled
+    assert schema.get_table(db, "orders") == "CREATE TABLE orders v0"
+    assert schema.get_table(db, "orders") == "CREATE TABLE orders v0"
+    db.release.set()
+    assert wait_for(lambda: schema.get_table(db, "orders") == "CREATE TABLE orders v1")
+    assert db.loads == ["orders"]
+    assert schema.stats()["stale_hits"] >= 2
+
+
+def test_entries_past_max_stale_reload_in_the_request():
+    db, schema = FakeDatabase(), cache()
+    schema.seed(db, {"orders": "CREATE TABLE orders v0"}, datetime.now() - timedelta(hours=1))
+    assert schema.get_table(db, "orders") == "CREATE TABLE orders v1"
+    assert schema.stats()["misses"] == 1
+
+
+def test_errors_are_not_cached_and_invalidate_drops_tables():
+    db, schema = FakeDatabase(), cache()
+    assert schema.get(db, ["orders", "missing"]) == "Error: table not found"
+    assert schema.cached_tables() == ["orders"]
+    schema.invalidate(["orders"])
+    db.version = 2
+    assert schema.get_table(db, "orders") == "CREATE TABLE orders v2"
@@ -0,0 +1,69 @@
+"""
+SQL rewriting helpers shared by the result cache, the plan cache and the answer cache.
+
+    python -m pytest -q testing
+"""
+import pytest
+
+from src.db.sql_utils import (
+    count_query,
+    normalize_sql,
+    sql_fingerprint,
+    strip_trailing_limit,
+    strip_trailing_noise,
+    wrap_with_limit,
+)
+
+
+@pytest.mark.parametrize("variant", [
+    "select a from t limit 5",
+    "SELECT a FROM t LIMIT 5;",
+    "select a from t -- trailing comment\nlimit 5",
+    "select /* inline */ a from t limit 5",
+    "select a\n\tfrom   t\nlimit 5 ;  -- done",
+    "select a from t /* a */ /* b */ limit 5",
+])
+def test_fingerprint_ignores_comments_case_and_whitespace(variant):
+    assert normalize_sql(variant) == "select a from t limit 5"
+    assert sql_fingerprint(variant) == sql_fingerprint("select a from t limit 5")
+
+
+def test_normalize_keeps_literals_and_quoted_identifiers():
+    sql = "SELECT \"Mixed Col\" FROM t WHERE name = 'A  b -- not a comment'"
+    assert normalize_sql(sql) == "select \"Mixed Col\" from t where name = 'A  b -- not a comment'"
+    assert sql_fingerprint("select a from t where x = 'A'") != sql_fingerprint("select a from t where x = 'a'")
+
+
+def test_normalize_punctuation_spacing():
+    assert normalize_sql("select count( * ) , b from t group by b") == "select count(*),b from t group by b"
+
+
+@pytest.mark.parametrize("sql, base, limit", [
+    ("select a from t limit 10", "select a from t", 10),
+    ("select a from t LIMIT ALL", "select a from t", None),
+    ("select a from t fetch first 3 rows only", "select a from t", 3),
+    ("select a from t fetch first row only", "select a from t", 1),
+    ("select a from t limit 10; -- comment", "select a from t", 10),
+    ("select a from t", "select a from t", None),
+    ("select 'limit 5' from t", "select 'limit 5' from t", None),
+    ("select a from t limit 5 offset 10", "select a from t limit 5 offset 10", None),
+])
+def test_strip_trailing_limit(sql, base, limit):
+    assert strip_trailing_limit(sql) == (base, limit)
+
+
+@pytest.mark.parametrize("sql", [
+    "select a from t",
+    "with x as (select 1 as a) select a from x",
+    "select a from t -- last line comment",
+    "select a from t limit 5 offset 10",
+])
+def test_wrap_with_limit_round_trips(sql):
+    wrapped = wrap_with_limit(sql, 25)
+    assert strip_trailing_limit(wrapped) == (strip_trailing_noise(sql), 25)
+
+
+def test_wrapped_trailing_comment_does_not_swallow_parenthesis():
+    wrapped = wrap_with_limit("select a from t -- comment", 5)
+    assert wrapped.endswith("\n) AS _bounded LIMIT 5")
+    assert count_query("select a from t;").endswith("\n) AS _counted")
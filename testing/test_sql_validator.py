@@ -0,0 +1,101 @@
+"""Local SQL validation against a reflected schema (SQLite stands in for PostgreSQL)."""
+import pytest
+from langchain_community.utilities.sql_database import SQLDatabase
+from sqlalchemy import create_engine, text
+
+from src.agent.tools.sql_validator import read_only_errors, validate_sql
+
+
+@pytest.fixture(scope="module")
+def db():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE orders (id INTEGER, customer_id INTEGER, amount NUMERIC, created_at DATE)"))
+        conn.execute(text("CREATE TABLE customers (id INTEGER, name TEXT)"))
+        conn.execute(text('CREATE TABLE "order" (id INTEGER)'))
+    return SQLDatabase(engine, sample_rows_in_table_info=0)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT o.id, c.name FROM orders o JOIN customers AS c ON c.id = o.customer_id",
+    "WITH big AS (SELECT customer_id, SUM(amount) AS total FROM orders GROUP BY customer_id) "
+    "SELECT b.total, c.name FROM big b JOIN customers c ON c.id = b.customer_id ORDER BY total DESC",
+    "WITH t (cid) AS (SELECT customer_id FROM orders) SELECT cid FROM t",
+    "SELECT x.n FROM (SELECT COUNT(*) AS n FROM orders) x",
+    "SELECT EXTRACT(YEAR FROM created_at) AS y, COUNT(*) FROM orders GROUP BY y",
+    "SELECT id FROM orders WHERE customer_id IS DISTINCT FROM NULL",
+    'SELECT id FROM "order"',
+    "SELECT id FROM orders; ",
+])
+def test_valid_queries(db, sql):
+    assert validate_sql(sql, db).errors == []
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT key, value FROM orders, json_each_text(id::text::json)",
+    "SELECT count FROM (SELECT COUNT(*) FROM orders) x",
+    "SELECT total FROM (SELECT SUM(amount) AS total FROM orders) x",
+    "SELECT k FROM orders, json_each_text(id::text::json) AS e(k, v)",
+    "WITH c AS (SELECT * FROM orders) SELECT anything FROM c",
+    "SELECT v FROM (SELECT id::text FROM orders) s (v)",
+])
+def test_columns_of_functions_and_subqueries_are_accepted(db, sql):
+    assert validate_sql(sql, db).errors == []
+
+
+def test_unknown_column_next_to_collected_subquery_columns(db):
+    errors = validate_sql("SELECT totl FROM (SELECT SUM(amount) AS total FROM orders) x", db).errors
+    assert len(errors) == 1 and "subqueries" in errors[0] and "Did you mean: total" in errors[0]
+    errors = validate_sql("SELECT bogus FROM orders, json_each_text(id::text::json) AS e(k, v)", db).errors
+    assert errors == ['Column "bogus" does not exist in orders.']
+
+
+def test_reserved_word_table_is_reported(db):
+    errors = validate_sql("SELECT * FROM order", db).errors
+    assert len(errors) == 1 and 'Table "order" does not exist' in errors[0] and "double-quoted" in errors[0]
+    errors = validate_sql("SELECT * FROM orders o JOIN user u ON u.id = o.customer_id", db).errors
+    assert any('Table "user" does not exist' in error for error in errors)
+
+
+def test_unknown_table_and_column_get_suggestions(db):
+    assert "Did you mean: orders" in validate_sql("SELECT id FROM ordrs", db).errors[0]
+    errors = validate_sql("SELECT o.amout FROM orders o", db).errors
+    assert errors and "amount" in errors[0]
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM orders",
+    "SELECT * INTO backup FROM orders",
+    "SELECT * FROM orders FOR UPDATE",
+    "SELECT pg_sleep(10)",
+    "SELECT 1; SELECT 2",
+    "SELECT (1",
+])
+def test_read_only_violations(sql):
+    assert read_only_errors(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "WITH d AS (DELETE FROM orders RETURNING *) SELECT * FROM d",
+    "WITH x AS MATERIALIZED (SELECT 1) UPDATE orders SET amount = 0",
+    "SELECT * FROM orders FOR NO KEY UPDATE",
+    "SELECT * FROM orders FOR SHARE",
+    "SELECT pg_catalog.pg_sleep(1)",
+])
+def test_write_clauses_after_ctes_and_locks(sql):
+    assert read_only_errors(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id AS copy FROM orders",
+    "SELECT 'a' AS call FROM orders",
+    'SELECT "update", o.refresh FROM orders o',
+    "SELECT amount::text AS share, update_count FROM orders",
+    "SELECT id, SUM(amount) OVER w FROM orders WINDOW w AS (PARTITION BY id)",
+])
+def test_write_keywords_used_as_names_are_read_only(sql):
+    assert read_only_errors(sql) == []
+
+
+def test_keywords_inside_literals_and_comments_are_ignored():
+    assert read_only_errors("SELECT 'delete from orders' AS s -- drop table orders") == []